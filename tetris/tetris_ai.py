@@ -0,0 +1,410 @@
+"""俄羅斯方塊自動玩家
+
+TetrisAI 針對當前方塊（以及儲存方塊與預覽佇列）列舉所有可到達的最終
+落點，再以可替換的評估函式挑選最佳落點，回傳一串 TetrisEngine 動作。
+評估函式預設為特徵加權和（總高度、洞數、凹凸度、消除行數）；沒有消行
+的落點由上一層的欄高與洞數增量計算特徵，不必重新掃描整個遊戲區域。
+
+可在 Qt 視窗中即時遊玩（TetrisBoard 按 A 切換），也可作為
+tetris_selfplay 的無頭策略（aiPolicy）。
+"""
+from tetris_engine import (SRS_WALL_KICKS, SHAPE_TYPES, SHAPE_ROW_MASKS,
+                           SHAPE_BOUNDS, SHAPE_CELLS, SPAWN_X, SPAWN_Y,
+                           placeColumnFeatures, ACTION_LEFT, ACTION_RIGHT, ACTION_DOWN,
+                           ACTION_ROTATE_CW, ACTION_ROTATE_CCW, ACTION_DROP,
+                           ACTION_HOLD)
+
+# 預設特徵權重
+DEFAULT_WEIGHTS = {
+    'aggregateHeight': -0.510066,
+    'lines': 0.760666,
+    'holes': -0.35663,
+    'bumpiness': -0.184483,
+}
+
+# 會導致遊戲結束的落點的評分
+TOP_OUT_SCORE = -1e9
+
+# 落點快取的最大項目數，超過時整個清空
+PLACEMENT_CACHE_SIZE = 4096
+
+
+def boardFeatures(rows, width, lines=0):
+    """完整掃描行遮罩列表計算遊戲區域的評估特徵（內容同 heightFeatures）"""
+    height = len(rows)
+    full = (1 << width) - 1
+    heights = [0] * width
+    seen = 0
+    holes = 0
+
+    for y, row in enumerate(rows):
+        if not seen and not row:
+            continue
+
+        new = row & ~seen
+        if new:
+            column_height = height - y
+            while new:
+                low = new & -new
+                heights[low.bit_length() - 1] = column_height
+                new ^= low
+            seen |= row
+
+        holes += (seen & ~row & full).bit_count()
+
+    return heightFeatures(rows, heights, holes, lines)
+
+
+def heightFeatures(rows, heights, holes, lines=0):
+    """由各欄高度與洞數組成評估特徵
+
+    回傳 dict：aggregateHeight（各欄高度總和）、maxHeight、holes（方塊下方
+    的空格數）、bumpiness（相鄰欄高度差總和）、lines（本次消除行數），
+    以及供自訂評估函式使用的 heights 與 rows。
+    """
+    bumpiness = 0
+    for i in range(len(heights) - 1):
+        bumpiness += abs(heights[i] - heights[i + 1])
+
+    return {
+        'aggregateHeight': sum(heights),
+        'maxHeight': max(heights),
+        'holes': holes,
+        'bumpiness': bumpiness,
+        'lines': lines,
+        'heights': heights,
+        'rows': rows,
+    }
+
+
+def weightedHeuristic(weights):
+    """建立特徵加權和的評估函式 heuristic(features)"""
+    items = tuple(weights.items())
+
+    def heuristic(features):
+        return sum(weight * features[name] for name, weight in items)
+
+    return heuristic
+
+
+def placeRows(rows, width, shape, rotation, x, y):
+    """將方塊固定到行遮罩列表的副本並消行，回傳 (新行遮罩列表, 消除行數)"""
+    new_rows = list(rows)
+    for i, mask in SHAPE_ROW_MASKS[shape][rotation]:
+        row = y + i
+        if row >= 0:
+            new_rows[row] |= mask << x if x >= 0 else mask >> -x
+
+    full = (1 << width) - 1
+    kept = [row for row in new_rows if row != full]
+    lines = len(new_rows) - len(kept)
+    if lines:
+        kept = [0] * lines + kept
+    return kept, lines
+
+
+# 搜尋狀態的座標範圍：x 最小為 -3，y 最小為 -4（牆踢可能把方塊往上推）
+X_OFFSET = 3
+Y_OFFSET = 4
+
+# 各寬度的位移行遮罩表快取
+_SHIFTED_MASKS_CACHE = {}
+
+# 每種旋轉狀態下各欄最底部格子的列偏移：[shape][rotation] -> ((欄偏移, 列偏移), ...)
+COLUMN_BOTTOMS = tuple(
+    tuple(
+        tuple(sorted({j: max(i for i, cj in cells if cj == j) for _, j in cells}.items()))
+        for cells in rotations)
+    for rotations in SHAPE_CELLS)
+
+
+def shiftedMasks(width):
+    """預先位移的行遮罩表，以 [shape][rotation][x + X_OFFSET] 索引
+
+    內容為 ((列偏移, 已位移遮罩), ...)，方塊超出左右邊界的 x 則為 None。
+    """
+    table = _SHIFTED_MASKS_CACHE.get(width)
+    if table is not None:
+        return table
+
+    table = []
+    for shape in range(len(SHAPE_ROW_MASKS)):
+        rotations = []
+        for rotation in range(4):
+            min_col, _, max_col, _ = SHAPE_BOUNDS[shape][rotation]
+            per_x = []
+            for x in range(-X_OFFSET, width):
+                if x + min_col < 0 or x + max_col >= width:
+                    per_x.append(None)
+                else:
+                    per_x.append(tuple((i, mask << x if x >= 0 else mask >> -x)
+                                       for i, mask in SHAPE_ROW_MASKS[shape][rotation]))
+            rotations.append(tuple(per_x))
+        table.append(tuple(rotations))
+
+    table = tuple(table)
+    _SHIFTED_MASKS_CACHE[width] = table
+    return table
+
+
+def reachablePlacements(rows, width, shape, x=SPAWN_X, y=SPAWN_Y, rotation=0):
+    """以廣度優先搜尋列舉方塊所有可到達的最終落點
+
+    搜尋的移動包括左右移動、SRS 順/逆時針旋轉（牆踢與 TetrisEngine.tryMove
+    相同）以及加速下落；加速下落一次直接滑到落地的高度（路徑中展開為
+    多個 ACTION_DOWN），避免在空中逐格展開大量狀態，落地後仍可繼續
+    移動與旋轉，因此能找到滑入與旋入的落點。每個 (x, y, rotation) 狀態以
+    visited 位元組陣列去重，只展開一次。
+
+    回傳 [(rotation, x, landing_y, actions), ...]，actions 為從目前狀態到達
+    該落點的最短動作列表（結尾為直接落下），佔據相同格子的落點只保留一個。
+    """
+    height = len(rows)
+    masks = shiftedMasks(width)[shape]
+    cols = width + X_OFFSET
+    plane = (height + Y_OFFSET) * cols
+
+    def fits(fx, fy, fr):
+        if fx < -X_OFFSET or fx >= width or fy < -Y_OFFSET:
+            return False
+        shifted = masks[fr][fx + X_OFFSET]
+        if shifted is None:
+            return False
+        for i, mask in shifted:
+            row = fy + i
+            if row >= height:
+                return False
+            if row >= 0 and rows[row] & mask:
+                return False
+        return True
+
+    if not shape or not fits(x, y, rotation):
+        return []
+
+    # 各欄最上方方塊的列索引：方塊完全在這些方塊上方時，可直接算出落地高度
+    tops = [height] * width
+    remaining = (1 << width) - 1
+    for row_index, row in enumerate(rows):
+        found = row & remaining
+        while found:
+            low = found & -found
+            tops[low.bit_length() - 1] = row_index
+            found ^= low
+        remaining &= ~row
+        if not remaining:
+            break
+
+    bottoms = COLUMN_BOTTOMS[shape]
+    kicks = SRS_WALL_KICKS[SHAPE_TYPES[shape]]
+    visited = bytearray(4 * plane)
+    parent = {}
+    start = rotation * plane + (y + Y_OFFSET) * cols + x + X_OFFSET
+    visited[start] = 1
+    queue = [(x, y, rotation, start)]
+    landings = {}
+
+    for cur_x, cur_y, cur_rotation, index in queue:
+        moves = []
+        if fits(cur_x - 1, cur_y, cur_rotation):
+            moves.append((ACTION_LEFT, cur_x - 1, cur_y, cur_rotation))
+        if fits(cur_x + 1, cur_y, cur_rotation):
+            moves.append((ACTION_RIGHT, cur_x + 1, cur_y, cur_rotation))
+
+        landing_y = height
+        for j, i in bottoms[cur_rotation]:
+            top = tops[cur_x + j]
+            if cur_y + i >= top:
+                # 方塊在某欄的懸空方塊下方，逐格檢查
+                landing_y = cur_y
+                while fits(cur_x, landing_y + 1, cur_rotation):
+                    landing_y += 1
+                break
+            if top - 1 - i < landing_y:
+                landing_y = top - 1 - i
+        can_fall = landing_y != cur_y
+        if can_fall:
+            moves.append((ACTION_DOWN, cur_x, landing_y, cur_rotation))
+
+        for action, direction, new_rotation in (
+                (ACTION_ROTATE_CW, 0, (cur_rotation + 1) % 4),
+                (ACTION_ROTATE_CCW, 1, (cur_rotation + 3) % 4)):
+            # 與引擎相同：使用第一個有效的牆踢位置
+            for kick_x, kick_y in kicks[direction][cur_rotation]:
+                if fits(cur_x + kick_x, cur_y + kick_y, new_rotation):
+                    moves.append((action, cur_x + kick_x, cur_y + kick_y, new_rotation))
+                    break
+
+        for action, new_x, new_y, new_rotation in moves:
+            new_index = new_rotation * plane + (new_y + Y_OFFSET) * cols + new_x + X_OFFSET
+            if visited[new_index]:
+                continue
+            visited[new_index] = 1
+            parent[new_index] = (index, action, new_y - cur_y)
+            queue.append((new_x, new_y, new_rotation, new_index))
+
+        if not can_fall:
+            # 無法再下落：這是一個落點，以佔據的格子去重（BFS 保證先找到的路徑最短）
+            key = tuple((cur_y + i, mask) for i, mask in masks[cur_rotation][cur_x + X_OFFSET])
+            if key not in landings:
+                landings[key] = (cur_rotation, cur_x, cur_y, index)
+
+    placements = []
+    for place_rotation, place_x, place_y, index in landings.values():
+        actions = []
+        while index != start:
+            index, action, dy = parent[index]
+            if action == ACTION_DOWN:
+                actions.extend([ACTION_DOWN] * dy)
+            else:
+                actions.append(action)
+        actions.reverse()
+
+        # 結尾連續的加速下落可由直接落下取代
+        while actions and actions[-1] == ACTION_DOWN:
+            actions.pop()
+        actions.append(ACTION_DROP)
+        placements.append((place_rotation, place_x, place_y, actions))
+
+    return placements
+
+
+class TetrisAI:
+    """以落點搜尋加上可替換評估函式的自動玩家
+
+    weights 為 heightFeatures 特徵的權重；heuristic(features) 可直接
+    替換整個評估函式。lookahead 為額外考慮的預覽方塊數（0 或 1），
+    beam_width 為展開預覽方塊時保留的候選落點數，use_hold 表示是否考慮
+    交換儲存方塊。
+
+    落點搜尋結果以 (遊戲區域, 方塊, 起始狀態) 為鍵快取，同一盤面在不同
+    搜尋層（例如上一步的預覽展開與這一步的實際搜尋）中不會重複計算。
+    """
+
+    def __init__(self, weights=None, heuristic=None, lookahead=1,
+                 beam_width=6, use_hold=True):
+        self.heuristic = heuristic or weightedHeuristic(weights or DEFAULT_WEIGHTS)
+        self.lookahead = lookahead
+        self.beam_width = beam_width
+        self.use_hold = use_hold
+        self.placementCache = {}
+
+    def placements(self, rows, width, shape, x=SPAWN_X, y=SPAWN_Y, rotation=0):
+        """取得方塊所有可到達的落點（使用快取）"""
+        key = (tuple(rows), shape, x, y, rotation)
+        placements = self.placementCache.get(key)
+        if placements is None:
+            if len(self.placementCache) >= PLACEMENT_CACHE_SIZE:
+                self.placementCache.clear()
+            placements = reachablePlacements(rows, width, shape, x, y, rotation)
+            self.placementCache[key] = placements
+        return placements
+
+    def evaluate(self, features):
+        """評估一個落點後的遊戲區域"""
+        if features['rows'][2]:
+            return TOP_OUT_SCORE  # 緩衝區下方第一行有方塊時遊戲結束
+        return self.heuristic(features)
+
+    def placementFeatures(self, rows, width, base, shape, rotation, x, y, lines=0):
+        """計算落點後的特徵，base 為 rows 的 (各欄高度, 洞數)
+
+        沒有消行時只更新方塊佔用的欄；有消行時重新掃描整個遊戲區域。
+        """
+        new_rows, new_lines = placeRows(rows, width, shape, rotation, x, y)
+        if new_lines:
+            return boardFeatures(new_rows, width, lines + new_lines)
+
+        heights = list(base[0])
+        holes = base[1] + placeColumnFeatures(heights, len(rows), shape, rotation, x, y)
+        return heightFeatures(new_rows, heights, holes, lines)
+
+    def bestPlacement(self, rows, width, shape, x, y, rotation, preview, base=None):
+        """搜尋單一方塊（加上預覽方塊）的最佳落點，回傳 (評分, 動作列表)
+
+        base 為 rows 的 (各欄高度, 洞數)，省略時完整掃描計算。
+        """
+        if base is None:
+            features = boardFeatures(rows, width)
+            base = (features['heights'], features['holes'])
+
+        candidates = []
+        for place_rotation, place_x, place_y, actions in self.placements(
+                rows, width, shape, x, y, rotation):
+            features = self.placementFeatures(rows, width, base, shape,
+                                              place_rotation, place_x, place_y)
+            candidates.append((self.evaluate(features), features, actions))
+
+        if not candidates:
+            return TOP_OUT_SCORE, None
+
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        if not preview or self.lookahead <= 0:
+            return candidates[0][0], candidates[0][2]
+
+        # 只展開評分最高的幾個候選，以預覽方塊的最佳落點作為評分
+        next_shape = preview[0]
+        best_score, best_actions = TOP_OUT_SCORE, candidates[0][2]
+        for score, features, actions in candidates[:self.beam_width]:
+            if score <= TOP_OUT_SCORE:
+                continue
+            new_rows = features['rows']
+            next_base = (features['heights'], features['holes'])
+            next_score = TOP_OUT_SCORE
+            for place_rotation, place_x, place_y, _ in self.placements(new_rows, width, next_shape):
+                next_features = self.placementFeatures(new_rows, width, next_base, next_shape,
+                                                       place_rotation, place_x, place_y,
+                                                       features['lines'])
+                next_score = max(next_score, self.evaluate(next_features))
+            if next_score > best_score:
+                best_score, best_actions = next_score, actions
+
+        return best_score, best_actions
+
+    def bestMove(self, engine):
+        """為引擎的當前方塊計算最佳動作列表（無法放置時回傳空列表）"""
+        piece = engine.curPiece
+        if not engine.isStarted or piece.shape == 0:
+            return []
+
+        board = engine.board
+        rows = board.rowMasks()
+        width = engine.BOARD_WIDTH
+        preview = [next_piece.shape for next_piece in engine.nextPieces]
+        # 遊戲區域已增量維護欄高與洞數，直接讀取
+        base = (board.heights, board.holes)
+
+        best_score, best_actions = self.bestPlacement(
+            rows, width, piece.shape, piece.x, piece.y, piece.rotation, preview, base)
+
+        if self.use_hold and not engine.hasSwapped:
+            # 交換後的方塊：儲存區的方塊，或儲存區為空時的下一個方塊
+            if engine.holdPiece.shape:
+                hold_shape, hold_preview = engine.holdPiece.shape, preview
+            else:
+                hold_shape, hold_preview = preview[0], preview[1:]
+
+            hold_score, hold_actions = self.bestPlacement(
+                rows, width, hold_shape, SPAWN_X, SPAWN_Y, 0, hold_preview, base)
+            if hold_actions is not None and hold_score > best_score:
+                best_score, best_actions = hold_score, [ACTION_HOLD] + hold_actions
+
+        return best_actions or []
+
+    def play(self, engine):
+        """為引擎執行一步最佳動作，回傳是否有執行動作"""
+        actions = self.bestMove(engine)
+        for action in actions:
+            engine.step(action)
+        return bool(actions)
+
+
+# tetris_selfplay 使用的預設自動玩家
+_DEFAULT_AI = None
+
+
+def aiPolicy(engine, rng):
+    """供 tetris_selfplay 使用的自動玩家策略"""
+    global _DEFAULT_AI
+    if _DEFAULT_AI is None:
+        _DEFAULT_AI = TetrisAI()
+    return _DEFAULT_AI.bestMove(engine)
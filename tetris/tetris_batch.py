@@ -0,0 +1,283 @@
+"""以 NumPy 同時模擬大量俄羅斯方塊遊戲
+
+BatchTetris 以 (N, 22) 的整數行遮罩陣列保存 N 個遊戲區域，重力、移動、
+放置、消行、計分（LINE_SCORES）與級別（同 TetrisEngine.checkLevel）都以
+向量化運算一次套用到所有遊戲，用於調整參數與大量評估，不需要逐一
+建立 TetrisEngine。規則與 TetrisEngine 相同，但不支援儲存方塊，也不保存
+繪製用的顏色資訊。
+
+需要 numpy：pip install numpy
+"""
+import numpy as np
+
+from tetris_engine import (TetrisEngine, SHAPE_ROW_MASKS, SHAPE_BOUNDS,
+                           SRS_WALL_KICKS, SHAPE_TYPES, LINE_SCORES,
+                           ACTION_LEFT, ACTION_RIGHT, ACTION_DOWN,
+                           ACTION_ROTATE_CW, ACTION_ROTATE_CCW, ACTION_DROP)
+
+BOARD_WIDTH = TetrisEngine.BOARD_WIDTH
+BOARD_HEIGHT = TetrisEngine.BOARD_HEIGHT
+INITIAL_SPEED = TetrisEngine.INITIAL_SPEED
+FULL_MASK = (1 << BOARD_WIDTH) - 1
+
+# 遮罩位移的偏移量，讓 x 為負數時仍可用左移計算（x 最小為 -3）
+_SHIFT_PAD = 3
+
+# 以 [shape, rotation, 列偏移] 索引的行遮罩表（該列沒有格子時為 0）
+_MASKS = np.zeros((8, 4, 4), dtype=np.int32)
+# 以 [shape, rotation] 索引的最小欄與最大欄
+_MIN_COL = np.zeros((8, 4), dtype=np.int32)
+_MAX_COL = np.zeros((8, 4), dtype=np.int32)
+# 以 [shape, 方向, 原旋轉狀態, 測試編號] 索引的牆踢偏移 (x, y)，不足 5 個時以 (0, 0) 補齊
+_KICKS = np.zeros((8, 2, 4, 5, 2), dtype=np.int32)
+
+for _shape in range(8):
+    for _rotation in range(4):
+        for _i, _mask in SHAPE_ROW_MASKS[_shape][_rotation]:
+            _MASKS[_shape, _rotation, _i] = _mask
+        _MIN_COL[_shape, _rotation] = SHAPE_BOUNDS[_shape][_rotation][0]
+        _MAX_COL[_shape, _rotation] = SHAPE_BOUNDS[_shape][_rotation][2]
+    if _shape:
+        for _direction in range(2):
+            for _rotation in range(4):
+                _tests = SRS_WALL_KICKS[SHAPE_TYPES[_shape]][_direction][_rotation]
+                for _k, _kick in enumerate(_tests):
+                    _KICKS[_shape, _direction, _rotation, _k] = _kick
+
+_LINE_SCORES = np.array(LINE_SCORES, dtype=np.int64)
+
+
+class BatchTetris:
+    """同時進行 N 個遊戲的向量化模擬器
+
+    所有狀態都是長度為 N 的陣列：rows (N, 22) 行遮罩、shape/x/y/rotation
+    為當前方塊、nextPieces (N, 3) 為預覽佇列，score/linesCleared/level/speed
+    為遊戲數據，alive 表示遊戲是否仍在進行。已結束的遊戲不再變動。
+    """
+
+    def __init__(self, count, seed=None):
+        self.count = count
+        self.rng = np.random.default_rng(seed)
+
+        self.rows = np.zeros((count, BOARD_HEIGHT), dtype=np.int32)
+        self.shape = self.randomShapes(count)
+        self.x = np.full(count, 3, dtype=np.int32)
+        self.y = np.zeros(count, dtype=np.int32)
+        self.rotation = np.zeros(count, dtype=np.int32)
+        self.nextPieces = self.randomShapes((count, 3))
+
+        self.score = np.zeros(count, dtype=np.int64)
+        self.linesCleared = np.zeros(count, dtype=np.int64)
+        self.level = np.ones(count, dtype=np.int32)
+        self.speed = np.full(count, INITIAL_SPEED, dtype=np.int32)
+        self.pieces = np.zeros(count, dtype=np.int64)  # 已固定的方塊數
+        self.alive = np.ones(count, dtype=bool)
+
+        # advance() 使用的重力計時器（毫秒）
+        self.elapsed = np.zeros(count, dtype=np.int64)
+
+    def randomShapes(self, size):
+        """產生隨機方塊形狀（1~7）"""
+        return self.rng.integers(1, 8, size=size, dtype=np.int32)
+
+    @property
+    def done(self):
+        """是否所有遊戲都已結束"""
+        return not self.alive.any()
+
+    def collides(self, idx, shape, rotation, x, y):
+        """檢查遊戲 idx 的方塊放在 (x, y) 是否會碰撞（回傳布林陣列）"""
+        hit = (x + _MIN_COL[shape, rotation] < 0) | (x + _MAX_COL[shape, rotation] >= BOARD_WIDTH)
+        safe_x = np.clip(x, -_SHIFT_PAD, BOARD_WIDTH - 1) + _SHIFT_PAD
+        rows = self.rows[idx]
+
+        for i in range(4):
+            mask = (_MASKS[shape, rotation, i] << safe_x) >> _SHIFT_PAD
+            row = y + i
+            below = row >= BOARD_HEIGHT
+            inside = (row >= 0) & ~below
+            board_row = np.take_along_axis(
+                rows, np.clip(row, 0, BOARD_HEIGHT - 1)[:, None], axis=1)[:, 0]
+            hit |= (mask != 0) & (below | (inside & ((board_row & mask) != 0)))
+
+        return hit
+
+    def tryMove(self, idx, x, y, rotation):
+        """嘗試將遊戲 idx 的方塊移到新位置，回傳成功的布林陣列"""
+        ok = ~self.collides(idx, self.shape[idx], rotation, x, y)
+        moved = idx[ok]
+        self.x[moved] = x[ok]
+        self.y[moved] = y[ok]
+        self.rotation[moved] = rotation[ok]
+        return ok
+
+    def tryRotate(self, idx, direction):
+        """以 SRS 牆踢嘗試旋轉遊戲 idx 的方塊（direction 0=順時針、1=逆時針）"""
+        shape = self.shape[idx]
+        old_rotation = self.rotation[idx]
+        new_rotation = (old_rotation + (1 if direction == 0 else 3)) % 4
+        kicks = _KICKS[shape, direction, old_rotation]
+
+        ok = np.zeros(len(idx), dtype=bool)
+        for k in range(kicks.shape[1]):
+            pending = ~ok
+            if not pending.any():
+                break
+            sub = np.flatnonzero(pending)
+            ok[sub] = self.tryMove(idx[sub],
+                                   self.x[idx[sub]] + kicks[sub, k, 0],
+                                   self.y[idx[sub]] + kicks[sub, k, 1],
+                                   new_rotation[sub])
+        return ok
+
+    def step(self, actions):
+        """對每個遊戲執行一個動作（長度為 N 的 ACTION_* 陣列）"""
+        actions = np.asarray(actions)
+        alive = self.alive
+
+        for action, dx, dy in ((ACTION_LEFT, -1, 0), (ACTION_RIGHT, 1, 0), (ACTION_DOWN, 0, 1)):
+            idx = np.flatnonzero(alive & (actions == action))
+            if len(idx):
+                self.tryMove(idx, self.x[idx] + dx, self.y[idx] + dy, self.rotation[idx])
+
+        for action, direction in ((ACTION_ROTATE_CW, 0), (ACTION_ROTATE_CCW, 1)):
+            idx = np.flatnonzero(alive & (actions == action))
+            if len(idx):
+                self.tryRotate(idx, direction)
+
+        idx = np.flatnonzero(alive & (actions == ACTION_DROP))
+        if len(idx):
+            self.dropDown(idx)
+
+    def tick(self):
+        """所有進行中的遊戲重力下落一格，無法下落者固定方塊"""
+        idx = np.flatnonzero(self.alive)
+        if not len(idx):
+            return
+        ok = self.tryMove(idx, self.x[idx], self.y[idx] + 1, self.rotation[idx])
+        self.pieceDropped(idx[~ok])
+
+    def advance(self, ms):
+        """經過 ms 毫秒，依各遊戲自己的速度套用重力"""
+        self.elapsed[self.alive] += ms
+        while True:
+            due = np.flatnonzero(self.alive & (self.elapsed >= self.speed))
+            if not len(due):
+                break
+            self.elapsed[due] -= self.speed[due]
+            ok = self.tryMove(due, self.x[due], self.y[due] + 1, self.rotation[due])
+            self.pieceDropped(due[~ok])
+
+    def dropY(self, idx):
+        """計算遊戲 idx 的方塊直接落下後的 y 座標"""
+        shape = self.shape[idx]
+        rotation = self.rotation[idx]
+        x = self.x[idx]
+        y = self.y[idx].copy()
+
+        falling = np.ones(len(idx), dtype=bool)
+        for _ in range(BOARD_HEIGHT):
+            sub = np.flatnonzero(falling)
+            if not len(sub):
+                break
+            blocked = self.collides(idx[sub], shape[sub], rotation[sub], x[sub], y[sub] + 1)
+            y[sub[~blocked]] += 1
+            falling[sub[blocked]] = False
+        return y
+
+    def dropDown(self, idx):
+        """遊戲 idx 的方塊直接落到底部並固定"""
+        self.y[idx] = self.dropY(idx)
+        self.pieceDropped(idx)
+
+    def place(self, rotation, x):
+        """將每個進行中遊戲的方塊以指定旋轉狀態與 x 座標直接落下並固定
+
+        放置位置在出生列就已碰撞的遊戲不會變動；回傳成功放置的布林陣列。
+        """
+        rotation = np.asarray(rotation, dtype=np.int32)
+        x = np.asarray(x, dtype=np.int32)
+        idx = np.flatnonzero(self.alive)
+        ok = np.zeros(self.count, dtype=bool)
+        if not len(idx):
+            return ok
+
+        valid = ~self.collides(idx, self.shape[idx], rotation[idx], x[idx], self.y[idx])
+        idx = idx[valid]
+        self.rotation[idx] = rotation[idx]
+        self.x[idx] = x[idx]
+        self.dropDown(idx)
+        ok[idx] = True
+        return ok
+
+    def pieceDropped(self, idx):
+        """將遊戲 idx 的方塊固定到遊戲區域、消行計分並生成新方塊"""
+        if not len(idx):
+            return
+
+        shape = self.shape[idx]
+        rotation = self.rotation[idx]
+        safe_x = self.x[idx] + _SHIFT_PAD
+        y = self.y[idx]
+        for i in range(4):
+            mask = (_MASKS[shape, rotation, i] << safe_x) >> _SHIFT_PAD
+            row = y + i
+            sel = (mask != 0) & (row >= 0) & (row < BOARD_HEIGHT)
+            self.rows[idx[sel], row[sel]] |= mask[sel]
+        self.pieces[idx] += 1
+
+        self.removeFullLines(idx)
+        self.newPiece(idx)
+
+    def removeFullLines(self, idx):
+        """移除遊戲 idx 中所有已填滿的行並計分"""
+        rows = self.rows[idx]
+        full = rows == FULL_MASK
+        counts = full.sum(axis=1)
+        cleared = counts > 0
+        if not cleared.any():
+            return
+
+        sub = np.flatnonzero(cleared)
+        # 穩定排序讓滿行移到最上方、其餘行保持原本順序，再將最上方 counts 行清空
+        order = np.argsort(~full[sub], axis=1, kind='stable')
+        compacted = np.take_along_axis(rows[sub], order, axis=1)
+        compacted[np.arange(BOARD_HEIGHT)[None, :] < counts[sub, None]] = 0
+        self.rows[idx[sub]] = compacted
+
+        games = idx[sub]
+        self.score[games] += _LINE_SCORES[np.minimum(counts[sub], 4)]
+        self.linesCleared[games] += counts[sub]
+        self.checkLevel(games)
+
+    def checkLevel(self, idx):
+        """檢查並更新遊戲 idx 的難度級別（每 10 行一級，最高 10 級）"""
+        new_level = np.minimum(10, 1 + self.linesCleared[idx] // 10).astype(np.int32)
+        self.level[idx] = np.maximum(self.level[idx], new_level)
+        self.speed[idx] = np.maximum(100, INITIAL_SPEED - (self.level[idx] - 1) * 50)
+
+    def newPiece(self, idx):
+        """為遊戲 idx 生成新方塊並檢查遊戲是否結束"""
+        self.shape[idx] = self.nextPieces[idx, 0]
+        self.nextPieces[idx, :-1] = self.nextPieces[idx, 1:]
+        self.nextPieces[idx, -1] = self.randomShapes(len(idx))
+        self.x[idx] = 3
+        self.y[idx] = 0
+        self.rotation[idx] = 0
+
+        # 新方塊無法放置，或緩衝區下方第一行已有方塊時遊戲結束
+        over = self.collides(idx, self.shape[idx], self.rotation[idx], self.x[idx], self.y[idx])
+        over |= self.rows[idx, 2] != 0
+        ended = idx[over]
+        self.alive[ended] = False
+        self.shape[ended] = 0
+
+    def results(self):
+        """回傳所有遊戲的統計數據"""
+        return {
+            'score': self.score.copy(),
+            'lines': self.linesCleared.copy(),
+            'level': self.level.copy(),
+            'pieces': self.pieces.copy(),
+            'alive': self.alive.copy(),
+        }
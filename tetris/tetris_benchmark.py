@@ -0,0 +1,315 @@
+"""引擎熱點路徑的無頭效能測試
+
+以固定種子產生的盤面（隨機策略自我對弈途中每個方塊出現時的狀態）測量
+TetrisEngine 的熱點操作，每項結果為每次操作的平均時間（奈秒）：
+
+    tryMove.move      左右與向下移動
+    tryMove.rotate    順時針與逆時針旋轉（含 SRS 牆踢）
+    checkPosition     檢查當前方塊的位置
+    ghostY            計算幽靈方塊位置（不使用快取）
+    pieceDropped      固定方塊、檢查滿行並生成新方塊
+    removeFullLines   移除滿行（盤面最下面預先填滿 1 到 4 行）
+    game              以隨機策略連續遊玩（另外回報每秒方塊數）
+
+結果以 JSON 輸出，可以儲存為基準，之後與基準比較：任何一項比基準慢超過
+容許比例時結束碼為 1，發佈新版 tetris_v4 之前先確認沒有效能退步。
+
+用法：
+    python tetris_benchmark.py
+    python tetris_benchmark.py --save baseline.json
+    python tetris_benchmark.py --baseline baseline.json --tolerance 0.1
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import time
+
+from tetris_engine import TetrisEngine, ListBoard, BitBoard, ACTION_DROP
+from tetris_selfplay import randomPolicy
+
+# 可由命令列選擇的遊戲區域後端
+BOARDS = {
+    'list': ListBoard,
+    'bit': BitBoard,
+}
+
+DEFAULT_STATES = 200  # 測試用的盤面數
+DEFAULT_REPEAT = 5  # 每項重複次數，取最快的一次
+DEFAULT_GAME_PIECES = 2000  # 整局吞吐量測試放置的方塊數
+DEFAULT_TOLERANCE = 0.10  # 比較基準時容許變慢的比例
+
+# 每個盤面上重複便宜操作的次數（減少計時本身的誤差）
+INNER_LOOPS = 20
+
+
+def buildStates(board_class, seed, count):
+    """以隨機策略自我對弈，記錄每個方塊出現時的狀態，遊戲結束時重新開始"""
+    engine = TetrisEngine(board_class=board_class, seed=seed)
+    rng = random.Random(f'benchmark:{seed}')
+    engine.start()
+
+    states = []
+    while len(states) < count:
+        if not engine.isStarted:
+            engine.start()
+        states.append(engine.snapshot())
+        for action in randomPolicy(engine, rng):
+            engine.step(action)
+    return states
+
+
+def makeCases(board_class, seed, states):
+    """為每個狀態建立一個已還原該狀態的引擎，回傳 (引擎, 狀態) 列表
+
+    狀態必須來自以相同 seed 建立的引擎（restore() 以種子還原方塊序列）。
+    """
+    cases = []
+    for state in states:
+        engine = TetrisEngine(board_class=board_class, seed=seed)
+        engine.restore(state)
+        cases.append((engine, state))
+    return cases
+
+
+def benchCalls(cases, make_candidates):
+    """在每個引擎上重複嘗試移動到候選位置（每次嘗試後放回原位），回傳 (秒數, 次數)"""
+    elapsed = 0.0
+    ops = 0
+    for engine, _ in cases:
+        piece = engine.curPiece
+        candidates = make_candidates(piece)
+        try_move = engine.tryMove
+        start = time.perf_counter()
+        for _ in range(INNER_LOOPS):
+            for candidate in candidates:
+                try_move(candidate)
+                engine.curPiece = piece
+        elapsed += time.perf_counter() - start
+        ops += INNER_LOOPS * len(candidates)
+    return elapsed, ops
+
+
+def benchMove(cases):
+    """tryMove：左移、右移、下移"""
+    return benchCalls(cases, lambda piece: (piece.moved(dx=-1), piece.moved(dx=1),
+                                            piece.moved(dy=1)))
+
+
+def benchRotate(cases):
+    """tryMove：順時針與逆時針旋轉"""
+    return benchCalls(cases, lambda piece: (piece.moved(drot=1), piece.moved(drot=-1)))
+
+
+def benchCheckPosition(cases):
+    """checkPosition：檢查當前位置"""
+    elapsed = 0.0
+    for engine, _ in cases:
+        check = engine.checkPosition
+        start = time.perf_counter()
+        for _ in range(INNER_LOOPS):
+            check()
+        elapsed += time.perf_counter() - start
+    return elapsed, INNER_LOOPS * len(cases)
+
+
+def benchGhost(cases):
+    """ghostY：每次都清除快取重新計算"""
+    elapsed = 0.0
+    for engine, _ in cases:
+        ghost_y = engine.ghostY
+        start = time.perf_counter()
+        for _ in range(INNER_LOOPS):
+            engine.ghostCache = None
+            ghost_y()
+        elapsed += time.perf_counter() - start
+    return elapsed, INNER_LOOPS * len(cases)
+
+
+def benchPieceDropped(cases):
+    """pieceDropped：方塊已在落地位置，計時固定、消行與生成新方塊"""
+    elapsed = 0.0
+    for engine, state in cases:
+        engine.restore(state)
+        piece = engine.curPiece
+        engine.curPiece = piece.moved(dy=engine.ghostY() - piece.y)
+        start = time.perf_counter()
+        engine.pieceDropped()
+        elapsed += time.perf_counter() - start
+    return elapsed, len(cases)
+
+
+def fullLineStates(states):
+    """把每個狀態的遊戲區域最下面 1 到 4 行填滿（依序輪流）"""
+    filled = []
+    for i, state in enumerate(states):
+        state = dict(state)
+        cells = [list(row) for row in state['cells']]
+        for row in cells[len(cells) - 1 - i % 4:]:
+            row[:] = [cell or x % 7 + 1 for x, cell in enumerate(row)]
+        state['cells'] = cells
+        filled.append(state)
+    return filled
+
+
+def benchRemoveFullLines(cases):
+    """removeFullLines：檢查所有行並移除滿行（含計分與升級檢查）"""
+    elapsed = 0.0
+    for engine, state in cases:
+        engine.restore(state)
+        start = time.perf_counter()
+        engine.removeFullLines()
+        elapsed += time.perf_counter() - start
+    return elapsed, len(cases)
+
+
+def playPieces(board_class, seed, pieces):
+    """以隨機策略放置 pieces 個方塊（遊戲結束時重新開始），回傳 (秒數, 方塊數)"""
+    engine = TetrisEngine(board_class=board_class, seed=seed)
+    rng = random.Random(f'benchmark:{seed}')
+    locked = [0]
+    engine.connect('pieceLocked', lambda: locked.__setitem__(0, locked[0] + 1))
+
+    start = time.perf_counter()
+    engine.start()
+    while locked[0] < pieces:
+        if not engine.isStarted:
+            engine.start()
+        before = locked[0]
+        for action in randomPolicy(engine, rng):
+            engine.step(action)
+            if not engine.isStarted:
+                break
+        if engine.isStarted and locked[0] == before:
+            engine.step(ACTION_DROP)
+    return time.perf_counter() - start, locked[0]
+
+
+# 以盤面測試的項目：名稱 -> (測試函式, 是否使用填滿行的盤面)
+CASE_BENCHMARKS = {
+    'tryMove.move': (benchMove, False),
+    'tryMove.rotate': (benchRotate, False),
+    'checkPosition': (benchCheckPosition, False),
+    'ghostY': (benchGhost, False),
+    'pieceDropped': (benchPieceDropped, False),
+    'removeFullLines': (benchRemoveFullLines, True),
+}
+BENCHMARKS = list(CASE_BENCHMARKS) + ['game']
+
+
+def best(run, repeat):
+    """執行 run() repeat 次（期間停用垃圾回收），回傳每次操作最快的奈秒數與操作次數"""
+    results = []
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            elapsed, ops = run()
+            results.append((elapsed / ops * 1e9, ops))
+    finally:
+        if enabled:
+            gc.enable()
+    return min(results)
+
+
+def runBenchmarks(boards=None, names=None, seed=0, states=DEFAULT_STATES,
+                  repeat=DEFAULT_REPEAT, game_pieces=DEFAULT_GAME_PIECES):
+    """執行效能測試，回傳 {"後端/項目": {"ns": 每次操作奈秒數, "ops": 操作次數}}
+
+    boards 為 BOARDS 的名稱列表，names 為 BENCHMARKS 的項目列表，省略時全部執行。
+    """
+    results = {}
+    for board_name in boards or list(BOARDS):
+        board_class = BOARDS[board_name]
+        base_states = buildStates(board_class, seed, states)
+        filled_states = None
+
+        for name in names or BENCHMARKS:
+            key = f'{board_name}/{name}'
+            if name == 'game':
+                ns, ops = best(lambda: playPieces(board_class, seed, game_pieces), repeat)
+                results[key] = {'ns': ns, 'ops': ops, 'piecesPerSecond': 1e9 / ns}
+                continue
+
+            bench, full_lines = CASE_BENCHMARKS[name]
+            if full_lines:
+                if filled_states is None:
+                    filled_states = fullLineStates(base_states)
+                cases = makeCases(board_class, seed, filled_states)
+            else:
+                cases = makeCases(board_class, seed, base_states)
+            ns, ops = best(lambda: bench(cases), repeat)
+            results[key] = {'ns': ns, 'ops': ops}
+    return results
+
+
+def compareResults(results, baseline, tolerance=DEFAULT_TOLERANCE, metric='ns'):
+    """與基準比較，回傳 {"後端/項目": {baseline、current、ratio、regression}}
+
+    只比較兩邊都有的項目；ratio 為目前時間（各項目的 metric 欄位）除以
+    基準時間，超過 1 + tolerance 時視為退步。
+    """
+    comparison = {}
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        base_time = baseline[key][metric]
+        ratio = result[metric] / base_time if base_time else float('inf')
+        comparison[key] = {
+            'baseline': base_time,
+            'current': result[metric],
+            'ratio': ratio,
+            'regression': ratio > 1 + tolerance,
+        }
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description='俄羅斯方塊引擎效能測試')
+    parser.add_argument('--board', choices=sorted(BOARDS), action='append',
+                        help='遊戲區域後端（可重複指定，預設全部）')
+    parser.add_argument('--only', choices=BENCHMARKS, action='append',
+                        help='只執行指定項目（可重複指定）')
+    parser.add_argument('--seed', type=int, default=0, help='產生盤面的種子')
+    parser.add_argument('--states', type=int, default=DEFAULT_STATES, help='測試用的盤面數')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='每項重複次數')
+    parser.add_argument('--game-pieces', type=int, default=DEFAULT_GAME_PIECES,
+                        help='整局吞吐量測試放置的方塊數')
+    parser.add_argument('--save', help='將結果寫入 JSON 檔案（作為之後比較的基準）')
+    parser.add_argument('--baseline', help='與此 JSON 基準檔比較')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='比較時容許變慢的比例')
+    args = parser.parse_args()
+
+    report = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'seed': args.seed,
+        'states': args.states,
+        'repeat': args.repeat,
+        'results': runBenchmarks(args.board, args.only, args.seed, args.states,
+                                 args.repeat, args.game_pieces),
+    }
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison = compareResults(report['results'], baseline['results'], args.tolerance)
+        report['comparison'] = comparison
+        regressions = [key for key, item in comparison.items() if item['regression']]
+        report['regressions'] = regressions
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
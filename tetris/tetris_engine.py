@@ -0,0 +1,1254 @@
+"""俄羅斯方塊遊戲引擎
+
+不依賴 Qt 的純 Python 遊戲狀態與規則，可以在無頭環境（CI、伺服器、AI 模擬）
+中大量執行。TetrisBoard 只負責包裝此引擎、驅動計時器並進行繪製。
+"""
+import random
+from collections import deque, namedtuple
+
+from tetris_randomizer import makeGenerator
+
+# 方塊形狀定義
+SHAPES = [
+    [[0, 0, 0, 0],  # 空白
+     [0, 0, 0, 0],
+     [0, 0, 0, 0],
+     [0, 0, 0, 0]],
+
+    [[0, 0, 0, 0],  # Z形方塊
+     [0, 1, 1, 0],
+     [0, 0, 1, 1],
+     [0, 0, 0, 0]],
+
+    [[0, 0, 0, 0],  # S形方塊
+     [0, 0, 2, 2],
+     [0, 2, 2, 0],
+     [0, 0, 0, 0]],
+
+    [[0, 0, 0, 0],  # J形方塊
+     [0, 3, 0, 0],
+     [0, 3, 3, 3],
+     [0, 0, 0, 0]],
+
+    [[0, 0, 0, 0],  # O形方塊
+     [0, 4, 4, 0],
+     [0, 4, 4, 0],
+     [0, 0, 0, 0]],
+
+    [[0, 0, 0, 0],  # T形方塊
+     [0, 0, 5, 0],
+     [0, 5, 5, 5],
+     [0, 0, 0, 0]],
+
+    [[0, 0, 0, 0],  # I形方塊
+     [0, 0, 0, 0],
+     [6, 6, 6, 6],
+     [0, 0, 0, 0]],
+
+    [[0, 0, 0, 0],  # L形方塊
+     [0, 0, 0, 7],
+     [0, 7, 7, 7],
+     [0, 0, 0, 0]]
+]
+
+# Super Rotation System (SRS) 牆踢數據
+# 每種方塊的旋轉測試點，除了 O 形方塊
+# 格式: [順時針旋轉測試點, 逆時針旋轉測試點]
+# 每個旋轉測試點包含 5 個可能的位置偏移 (x, y)
+SRS_WALL_KICKS = {
+    # JLSTZ 形方塊的牆踢數據
+    'JLSTZ': [
+        # 0>>1, 1>>2, 2>>3, 3>>0 (順時針旋轉)
+        [
+            [(0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2)],  # 0>>1
+            [(0, 0), (1, 0), (1, 1), (0, -2), (1, -2)],    # 1>>2
+            [(0, 0), (1, 0), (1, -1), (0, 2), (1, 2)],     # 2>>3
+            [(0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2)]  # 3>>0
+        ],
+        # 0>>3, 3>>2, 2>>1, 1>>0 (逆時針旋轉)
+        [
+            [(0, 0), (1, 0), (1, -1), (0, 2), (1, 2)],     # 0>>3
+            [(0, 0), (1, 0), (1, 1), (0, -2), (1, -2)],    # 3>>2
+            [(0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2)],  # 2>>1
+            [(0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2)]  # 1>>0
+        ]
+    ],
+    # I 形方塊的牆踢數據
+    'I': [
+        # 0>>1, 1>>2, 2>>3, 3>>0 (順時針旋轉)
+        [
+            [(0, 0), (-2, 0), (1, 0), (-2, 1), (1, -2)],   # 0>>1
+            [(0, 0), (-1, 0), (2, 0), (-1, -2), (2, 1)],   # 1>>2
+            [(0, 0), (2, 0), (-1, 0), (2, -1), (-1, 2)],   # 2>>3
+            [(0, 0), (1, 0), (-2, 0), (1, 2), (-2, -1)]    # 3>>0
+        ],
+        # 0>>3, 3>>2, 2>>1, 1>>0 (逆時針旋轉)
+        [
+            [(0, 0), (-1, 0), (2, 0), (-1, -2), (2, 1)],   # 0>>3
+            [(0, 0), (2, 0), (-1, 0), (2, -1), (-1, 2)],   # 3>>2
+            [(0, 0), (1, 0), (-2, 0), (1, 2), (-2, -1)],   # 2>>1
+            [(0, 0), (-2, 0), (1, 0), (-2, 1), (1, -2)]    # 1>>0
+        ]
+    ],
+    # O 形方塊不需要牆踢
+    'O': [
+        [[(0, 0)], [(0, 0)], [(0, 0)], [(0, 0)]],
+        [[(0, 0)], [(0, 0)], [(0, 0)], [(0, 0)]]
+    ]
+}
+
+# 方塊類型映射
+SHAPE_TYPES = {
+    1: 'JLSTZ',  # Z
+    2: 'JLSTZ',  # S
+    3: 'JLSTZ',  # J
+    4: 'O',      # O
+    5: 'JLSTZ',  # T
+    6: 'I',      # I
+    7: 'JLSTZ'   # L
+}
+
+# 玩家動作定義（用於 TetrisEngine.step）
+ACTION_NONE = 0
+ACTION_LEFT = 1          # 左移
+ACTION_RIGHT = 2         # 右移
+ACTION_DOWN = 3          # 加速下落一格
+ACTION_ROTATE_CW = 4     # 順時針旋轉
+ACTION_ROTATE_CCW = 5    # 逆時針旋轉
+ACTION_DROP = 6          # 直接落下
+ACTION_HOLD = 7          # 儲存/交換方塊
+
+# 消除行數對應的得分：1行=100，2行=300，3行=600，4行=1000
+LINE_SCORES = [0, 100, 300, 600, 1000]
+
+# 一行全滿時的位元遮罩（10 欄，第 x 位代表第 x 欄）
+FULL_ROW = 0x3FF
+
+# 方塊出生位置
+SPAWN_X = 3
+SPAWN_Y = 0
+
+
+class Piece(namedtuple('Piece', ('shape', 'x', 'y', 'rotation'))):
+    """不可變的方塊狀態：形狀、位置與旋轉
+
+    以 tuple 儲存（沒有 __dict__），可以雜湊與比較，適合作為搜尋狀態或
+    快取鍵；移動或旋轉時以 moved() 產生新的狀態。
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def spawn(cls, shape):
+        """在出生位置、未旋轉的方塊"""
+        return cls(shape, SPAWN_X, SPAWN_Y, 0)
+
+    def moved(self, dx=0, dy=0, drot=0):
+        """平移 (dx, dy) 並旋轉 drot 次（正數為順時針）後的新狀態"""
+        shape, x, y, rotation = self
+        # 略過 namedtuple 的 __new__（位於最常呼叫的路徑上）
+        return _tuple_new(Piece, (shape, x + dx, y + dy, (rotation + drot) % 4))
+
+
+_tuple_new = tuple.__new__
+
+
+# 沒有方塊（遊戲結束或儲存區為空）
+EMPTY_PIECE = Piece.spawn(0)
+
+
+def rotateMatrix(matrix):
+    """順時針旋轉矩陣 90 度"""
+    return tuple(tuple(matrix[3 - j][i] for j in range(4)) for i in range(4))
+
+
+def _buildShapeTables():
+    """預先計算所有方塊 4 種旋轉狀態的形狀表（匯入時執行一次）"""
+    rotated_shapes = []
+    shape_cells = []
+    shape_row_masks = []
+    shape_bounds = []
+    shape_columns = []
+
+    for shape in range(len(SHAPES)):
+        matrix = tuple(tuple(row) for row in SHAPES[shape])
+        matrices, cells_list, masks_list, bounds_list, columns_list = [], [], [], [], []
+
+        for _ in range(4):
+            cells = tuple((i, j) for i in range(4) for j in range(4) if matrix[i][j])
+
+            row_masks = []
+            for i in range(4):
+                mask = 0
+                for j in range(4):
+                    if matrix[i][j]:
+                        mask |= 1 << j
+                if mask:
+                    row_masks.append((i, mask))
+
+            if cells:
+                rows = [i for i, _ in cells]
+                cols = [j for _, j in cells]
+                bounds = (min(cols), min(rows), max(cols), max(rows))
+            else:
+                bounds = (0, 0, 0, 0)
+
+            columns = tuple((j, tuple(i for i, col in cells if col == j))
+                            for j in sorted({col for _, col in cells}))
+
+            matrices.append(matrix)
+            cells_list.append(cells)
+            masks_list.append(tuple(row_masks))
+            bounds_list.append(bounds)
+            columns_list.append(columns)
+            matrix = rotateMatrix(matrix)
+
+        rotated_shapes.append(tuple(matrices))
+        shape_cells.append(tuple(cells_list))
+        shape_row_masks.append(tuple(masks_list))
+        shape_bounds.append(tuple(bounds_list))
+        shape_columns.append(tuple(columns_list))
+
+    return (tuple(rotated_shapes), tuple(shape_cells),
+            tuple(shape_row_masks), tuple(shape_bounds), tuple(shape_columns))
+
+
+# 預先計算的形狀表，以 [shape][rotation] 索引，內容皆為不可變的 tuple：
+# ROTATED_SHAPES  旋轉後的 4x4 矩陣
+# SHAPE_CELLS     (列偏移, 欄偏移) 格子列表
+# SHAPE_ROW_MASKS (列偏移, 遮罩) 列表，遮罩以 4x4 矩陣第 0 欄為第 0 位
+# SHAPE_BOUNDS    邊界框 (最小欄, 最小列, 最大欄, 最大列)
+# SHAPE_COLUMNS   (欄偏移, 該欄由上而下的列偏移) 列表
+(ROTATED_SHAPES, SHAPE_CELLS, SHAPE_ROW_MASKS, SHAPE_BOUNDS,
+ SHAPE_COLUMNS) = _buildShapeTables()
+
+
+# Zobrist 雜湊：以固定種子產生的 64 位元亂數鍵，相同的狀態在任何執行中都得到
+# 相同的雜湊。遊戲區域每格 (y, x) 一個鍵，狀態的雜湊為所有已填格子的鍵 XOR，
+# 因此固定方塊或消行時只需要 XOR 進出改變的格子（見 BaseBoard.hash）。
+ZOBRIST_SEED = 0x7E7815
+ZOBRIST_CHUNK = 5  # 行遮罩分成 5 位元一段查表
+ZOBRIST_QUEUE_DEPTH = 32  # 雜湊涵蓋的預覽方塊數上限
+
+# 各遊戲區域大小的查表快取
+_ZOBRIST_ROWS_CACHE = {}
+
+
+def zobristRowTables(width, height):
+    """遊戲區域各行的 Zobrist 查表，以 [y][段] 索引
+
+    每段為該段 2^ZOBRIST_CHUNK 種遮罩對應的雜湊（段內已填格子的鍵 XOR），
+    所以一行的雜湊只需要 ceil(width / ZOBRIST_CHUNK) 次查表。
+    """
+    tables = _ZOBRIST_ROWS_CACHE.get((width, height))
+    if tables is not None:
+        return tables
+
+    rng = random.Random(f'{ZOBRIST_SEED}:{width}x{height}')
+    tables = []
+    for _ in range(height):
+        cell_keys = [rng.getrandbits(64) for _ in range(width)]
+        chunks = []
+        for start in range(0, width, ZOBRIST_CHUNK):
+            keys = cell_keys[start:start + ZOBRIST_CHUNK]
+            table = [0] * (1 << len(keys))
+            for mask in range(1, len(table)):
+                low = mask & -mask
+                table[mask] = table[mask ^ low] ^ keys[low.bit_length() - 1]
+            chunks.append(tuple(table))
+        tables.append(tuple(chunks))
+
+    tables = tuple(tables)
+    _ZOBRIST_ROWS_CACHE[(width, height)] = tables
+    return tables
+
+
+def rowZobrist(chunks, mask):
+    """以 zobristRowTables() 的一行查表計算行遮罩的雜湊"""
+    h = 0
+    for table in chunks:
+        h ^= table[mask & ((1 << ZOBRIST_CHUNK) - 1)]
+        mask >>= ZOBRIST_CHUNK
+    return h
+
+
+def _buildZobristKeys():
+    """產生方塊狀態的 Zobrist 鍵（匯入時執行一次）"""
+    rng = random.Random(ZOBRIST_SEED)
+
+    def keys(count):
+        return tuple(rng.getrandbits(64) for _ in range(count))
+
+    shape_count = len(SHAPES)
+    # 座標以低 5 位元索引（x 介於 -3 到 寬度，y 介於 -4 到 高度，不會重疊）
+    piece_keys = (keys(shape_count), keys(32), keys(32), keys(4))
+    hold_keys = keys(shape_count)
+    queue_keys = tuple(keys(shape_count) for _ in range(ZOBRIST_QUEUE_DEPTH))
+    swapped_key = rng.getrandbits(64)
+    return piece_keys, hold_keys, queue_keys, swapped_key
+
+
+# 方塊狀態的 Zobrist 鍵：
+# ZOBRIST_PIECE    當前方塊的 (形狀, x, y, 旋轉) 鍵，以 [欄位][數值] 索引
+# ZOBRIST_HOLD     儲存方塊的形狀鍵
+# ZOBRIST_QUEUE    預覽佇列的鍵，以 [位置][形狀] 索引
+# ZOBRIST_SWAPPED  本次下落已交換過儲存方塊
+ZOBRIST_PIECE, ZOBRIST_HOLD, ZOBRIST_QUEUE, ZOBRIST_SWAPPED = _buildZobristKeys()
+
+
+def rowsFit(rows, width, shape, rotation, x, y):
+    """檢查方塊放在以行遮罩表示的遊戲區域 (x, y) 是否有效"""
+    min_col, _, max_col, _ = SHAPE_BOUNDS[shape][rotation]
+    if x + min_col < 0 or x + max_col >= width:
+        return False
+
+    height = len(rows)
+    for i, mask in SHAPE_ROW_MASKS[shape][rotation]:
+        row = y + i
+        if row >= height:
+            return False
+        if row < 0:
+            continue
+        if rows[row] & (mask << x if x >= 0 else mask >> -x):
+            return False
+
+    return True
+
+
+def rowsDropY(rows, width, shape, rotation, x, y):
+    """計算方塊在以行遮罩表示的遊戲區域中從 (x, y) 直接落下後的 y 座標"""
+    min_col, _, max_col, _ = SHAPE_BOUNDS[shape][rotation]
+    if x + min_col < 0 or x + max_col >= width:
+        return y
+
+    shifted = [(i, mask << x if x >= 0 else mask >> -x)
+               for i, mask in SHAPE_ROW_MASKS[shape][rotation]]
+    height = len(rows)
+    while True:
+        next_y = y + 1
+        for i, mask in shifted:
+            row = next_y + i
+            if row >= height or (row >= 0 and rows[row] & mask):
+                return y
+        y = next_y
+
+
+def placeColumnFeatures(heights, height, shape, rotation, x, y, column_holes=None):
+    """方塊固定到 (x, y) 後（消行前）就地更新各欄高度（與各欄洞數），回傳洞數總和的變化量
+
+    只處理方塊佔用的欄：新方塊頂端與原欄頂之間的空格成為洞，
+    填入原欄頂下方的格子則減少洞。
+    """
+    delta = 0
+    for j, offsets in SHAPE_COLUMNS[shape][rotation]:
+        col = x + j
+        top = height - heights[col]
+        highest = None
+        above = below = 0
+        for i in offsets:
+            row = y + i
+            if row < 0:
+                continue
+            if highest is None:
+                highest = row
+            if row < top:
+                above += 1
+            else:
+                below += 1
+
+        if highest is None:
+            continue
+
+        change = -below
+        if highest < top:
+            change += top - highest - above
+            heights[col] = height - highest
+        if column_holes is not None:
+            column_holes[col] += change
+        delta += change
+
+    return delta
+
+
+def compactRows(items, removed):
+    """就地移除 items 中索引在 removed 裡的項目，上方的項目往下移
+
+    只從最下面的移除行往上走一次；被移除的項目依序放回頂端並回傳，
+    由呼叫者清空後重複使用，不必建立新的列表。
+    """
+    write = max(removed)
+    taken = []
+    for read in range(write, -1, -1):
+        item = items[read]
+        if read in removed:
+            taken.append(item)
+        else:
+            items[write] = item
+            write -= 1
+
+    for i, item in enumerate(taken):
+        items[i] = item
+    return taken
+
+
+class BaseBoard:
+    """遊戲區域後端的共用部分：增量維護評估用的特徵
+
+    固定方塊與消行時只更新受影響的欄與行，因此以下特徵都可以 O(1) 讀取：
+    heights（各欄高度）、columnHoles（各欄的洞數）、holes（洞數總和）、
+    rowCounts（每行已填的格數）、rowBits（每行的整數遮罩）與 hash（已填
+    格子的 64 位元 Zobrist 雜湊）。子類別需實作 isFilled(y, x)，並在
+    clear()、placePiece()、removeRows() 中呼叫對應的 track 方法。
+
+    version 在格子內容每次改變時遞增，供快取（例如幽靈方塊位置）判斷是否失效。
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.version = 0
+        self.heights = []
+        self.columnHoles = []
+        self.holes = 0
+        self.rowCounts = []
+        self.rowBits = []
+        self.hash = 0
+        self.zobristRows = zobristRowTables(width, height)
+
+    def resetFeatures(self):
+        """清空遊戲區域後重設所有特徵"""
+        self.version += 1
+        self.heights = [0] * self.width
+        self.columnHoles = [0] * self.width
+        self.holes = 0
+        self.rowCounts = [0] * self.height
+        self.rowBits = [0] * self.height
+        self.hash = 0
+
+    def recomputeFeatures(self):
+        """完整掃描遊戲區域重新計算特徵（直接修改格子內容後使用）"""
+        self.version += 1
+        self.rowCounts = [sum(1 for x in range(self.width) if self.isFilled(y, x))
+                          for y in range(self.height)]
+        self.heights = [0] * self.width
+        self.columnHoles = [0] * self.width
+        for x in range(self.width):
+            self.rescanColumn(x)
+        self.holes = sum(self.columnHoles)
+
+        self.rowBits = [sum(1 << x for x in range(self.width) if self.isFilled(y, x))
+                        for y in range(self.height)]
+        self.hash = 0
+        for chunks, bits in zip(self.zobristRows, self.rowBits):
+            self.hash ^= rowZobrist(chunks, bits)
+
+    def rescanColumn(self, x):
+        """重新計算單一欄的高度與洞數"""
+        top = self.height
+        holes = 0
+        for y in range(self.height):
+            if self.isFilled(y, x):
+                if top == self.height:
+                    top = y
+            elif top < self.height:
+                holes += 1
+        self.heights[x] = self.height - top
+        self.columnHoles[x] = holes
+
+    def trackPlace(self, shape, rotation, x, y):
+        """固定方塊後更新特徵，回傳方塊佔用的行（由下而上）"""
+        self.version += 1
+        self.holes += placeColumnFeatures(self.heights, self.height, shape, rotation,
+                                          x, y, self.columnHoles)
+        touched = []
+        counts = self.rowCounts
+        bits = self.rowBits
+        zobrist = self.zobristRows
+        h = self.hash
+        for i, mask in SHAPE_ROW_MASKS[shape][rotation]:
+            row = y + i
+            if row < 0:
+                continue
+            counts[row] += bin(mask).count('1')
+            shifted = mask << x if x >= 0 else mask >> -x
+            bits[row] |= shifted
+            h ^= rowZobrist(zobrist[row], shifted)  # 新填的格子原本是空的
+            touched.append(row)
+        self.hash = h
+        touched.reverse()
+        return touched
+
+    def trackRemove(self, rows):
+        """移除 rows 之後更新特徵（格子內容必須已經移除）
+
+        滿行裡每一欄都有方塊，所以欄頂在最上面的消除行之上的欄，
+        洞數不變、高度減少消除的行數；欄頂正好被消除的欄才重新掃描。
+        雜湊只重新計算最下面的消除行以上、有方塊的行（它們換了位置）。
+        """
+        if not rows:
+            return
+        self.version += 1
+        count = len(rows)
+        topmost = min(rows)
+        bottom = max(rows)
+        counts = self.rowCounts
+        compactRows(counts, rows)
+        for y in range(count):
+            counts[y] = 0
+
+        bits = self.rowBits
+        zobrist = self.zobristRows
+        h = self.hash
+        for y in range(bottom + 1):
+            if bits[y]:
+                h ^= rowZobrist(zobrist[y], bits[y])
+        compactRows(bits, rows)
+        for y in range(count):
+            bits[y] = 0
+        for y in range(count, bottom + 1):
+            if bits[y]:
+                h ^= rowZobrist(zobrist[y], bits[y])
+        self.hash = h
+
+        for x in range(self.width):
+            if self.height - self.heights[x] < topmost:
+                self.heights[x] -= count
+            else:
+                self.holes -= self.columnHoles[x]
+                self.rescanColumn(x)
+                self.holes += self.columnHoles[x]
+
+    def dropY(self, shape, rotation, x, y):
+        """計算方塊從 (x, y) 直接落下後的 y 座標
+
+        方塊完全在各欄最上方方塊的上方時，直接由欄高算出落地高度；
+        方塊在懸空方塊下方時才交給子類別的 scanDropY 逐行檢查。
+        """
+        min_col, _, max_col, _ = SHAPE_BOUNDS[shape][rotation]
+        if x + min_col < 0 or x + max_col >= self.width:
+            return y
+
+        heights = self.heights
+        landing = self.height
+        for j, offsets in SHAPE_COLUMNS[shape][rotation]:
+            top = self.height - heights[x + j]
+            bottom = offsets[-1]
+            if y + bottom >= top:
+                return self.scanDropY(shape, rotation, x, y)
+            if top - 1 - bottom < landing:
+                landing = top - 1 - bottom
+        return landing
+
+    def isRowFull(self, y):
+        """檢查某一行是否已填滿"""
+        return self.rowCounts[y] == self.width
+
+    def isRowEmpty(self, y):
+        """檢查某一行是否為空"""
+        return self.rowCounts[y] == 0
+
+    def fullRows(self, rows=None):
+        """由下而上列出已填滿的行；指定 rows 時只檢查這些行"""
+        if rows is None:
+            rows = range(self.height - 1, -1, -1)
+        full = self.width
+        counts = self.rowCounts
+        return [y for y in rows if counts[y] == full]
+
+    def maxHeight(self):
+        """最高欄的高度"""
+        return max(self.heights)
+
+    def aggregateHeight(self):
+        """所有欄的高度總和"""
+        return sum(self.heights)
+
+    def bumpiness(self):
+        """相鄰欄高度差的總和"""
+        heights = self.heights
+        return sum(abs(heights[x] - heights[x + 1]) for x in range(self.width - 1))
+
+
+class ListBoard(BaseBoard):
+    """以 22x10 二維列表儲存的遊戲區域（預設後端）
+
+    board[y][x] 為該格的方塊形狀編號，0 表示空格。
+    """
+
+    def __init__(self, width, height):
+        super().__init__(width, height)
+        self.blankRow = (0,) * width
+        self.grid = []
+        self.clear()
+
+    def __getitem__(self, y):
+        return self.grid[y]
+
+    def __len__(self):
+        return self.height
+
+    def clear(self):
+        """清空遊戲區域"""
+        self.grid = [[0 for _ in range(self.width)] for _ in range(self.height)]
+        self.resetFeatures()
+
+    def isFilled(self, y, x):
+        """檢查某一格是否有方塊"""
+        return self.grid[y][x] != 0
+
+    def checkPiece(self, shape, rotation, x, y):
+        """檢查方塊放在 (x, y) 是否有效"""
+        for i, j in SHAPE_CELLS[shape][rotation]:
+            col = x + j
+            row = y + i
+
+            if col < 0 or col >= self.width or row >= self.height:
+                return False
+
+            if row < 0:
+                continue
+
+            if self.grid[row][col] != 0:
+                return False
+
+        return True
+
+    def scanDropY(self, shape, rotation, x, y):
+        """逐行檢查計算方塊從 (x, y) 直接落下後的 y 座標"""
+        while self.checkPiece(shape, rotation, x, y + 1):
+            y += 1
+        return y
+
+    def placePiece(self, shape, rotation, x, y):
+        """將方塊固定到遊戲區域，回傳方塊佔用的行（由下而上）"""
+        for i, j in SHAPE_CELLS[shape][rotation]:
+            if y + i < 0:
+                continue
+            self.grid[y + i][x + j] = shape
+        return self.trackPlace(shape, rotation, x, y)
+
+    def rowMasks(self):
+        """以整數行遮罩列表表示目前的遊戲區域（第 x 位代表第 x 欄）"""
+        return list(self.rowBits)
+
+    def loadCells(self, cells):
+        """以二維的方塊形狀編號列表取代整個遊戲區域（還原關鍵幀時使用）"""
+        for row, cell_row in zip(self.grid, cells):
+            row[:] = cell_row
+        self.recomputeFeatures()
+
+    def removeRows(self, rows):
+        """移除指定的行，上方的行往下移（就地搬移，移除的行清空後補到頂端）"""
+        for row in compactRows(self.grid, rows):
+            row[:] = self.blankRow
+        self.trackRemove(rows)
+
+
+class BitBoard(BaseBoard):
+    """以整數行遮罩儲存的遊戲區域
+
+    每一行以 10 位元整數表示（第 x 位代表第 x 欄），碰撞檢查為遮罩 AND，
+    滿行檢查為與 FULL_ROW 比較；另外保留一個平行的顏色陣列供繪製使用，
+    因此 board[y][x] 的讀取方式與 ListBoard 相同。
+    """
+
+    def __init__(self, width, height):
+        super().__init__(width, height)
+        self.fullRow = (1 << width) - 1  # 寬度為 10 時即 FULL_ROW
+        self.blankRow = (0,) * width
+        self.rows = []
+        self.colors = []
+        self.clear()
+
+    def __getitem__(self, y):
+        return self.colors[y]
+
+    def __len__(self):
+        return self.height
+
+    def clear(self):
+        """清空遊戲區域"""
+        self.rows = [0] * self.height
+        self.colors = [[0 for _ in range(self.width)] for _ in range(self.height)]
+        self.resetFeatures()
+
+    def isFilled(self, y, x):
+        """檢查某一格是否有方塊"""
+        return (self.rows[y] >> x) & 1 == 1
+
+    def checkPiece(self, shape, rotation, x, y):
+        """檢查方塊放在 (x, y) 是否有效"""
+        return rowsFit(self.rows, self.width, shape, rotation, x, y)
+
+    def scanDropY(self, shape, rotation, x, y):
+        """逐行檢查計算方塊從 (x, y) 直接落下後的 y 座標"""
+        return rowsDropY(self.rows, self.width, shape, rotation, x, y)
+
+    def placePiece(self, shape, rotation, x, y):
+        """將方塊固定到遊戲區域，回傳方塊佔用的行（由下而上）"""
+        for i, j in SHAPE_CELLS[shape][rotation]:
+            row = y + i
+            if row < 0:
+                continue
+            self.rows[row] |= 1 << (x + j)
+            self.colors[row][x + j] = shape
+        return self.trackPlace(shape, rotation, x, y)
+
+    def rowMasks(self):
+        """以整數行遮罩列表表示目前的遊戲區域（直接回傳會就地更新的內部列表，請勿修改）"""
+        return self.rows
+
+    def loadCells(self, cells):
+        """以二維的方塊形狀編號列表取代整個遊戲區域（還原關鍵幀時使用）"""
+        for y, cell_row in enumerate(cells):
+            self.colors[y][:] = cell_row
+            self.rows[y] = sum(1 << x for x, cell in enumerate(cell_row) if cell)
+        self.recomputeFeatures()
+
+    def removeRows(self, rows):
+        """移除指定的行，上方的行往下移（就地搬移，移除的行清空後補到頂端）"""
+        for y in range(len(compactRows(self.rows, rows))):
+            self.rows[y] = 0
+        for row in compactRows(self.colors, rows):
+            row[:] = self.blankRow
+        self.trackRemove(rows)
+
+
+class TetrisEngine:
+    """俄羅斯方塊的遊戲狀態與規則（不依賴 Qt）
+
+    狀態變更透過 connect() 註冊的回呼通知包裝層，事件名稱如下：
+    nextPieceChanged(deque)、scoreChanged(int)、statusChanged(bool)、
+    levelChanged(int)、holdPieceChanged(Piece)、pieceLocked()、linesRemoved(int)、
+    pieceSpawned(int)；InputHandler 另外透過引擎發出 inputPressed(int)、
+    inputReleased(int) 與 frameStarted()，供錄影使用。
+
+    board_class 指定遊戲區域後端：ListBoard（二維列表）或 BitBoard（整數行遮罩）。
+    seed 指定方塊序列的亂數種子，相同種子與相同操作會得到完全相同的遊戲；
+    省略時隨機選一個種子，並記錄在 self.seed 中。generator 為方塊產生器
+    （tetris_randomizer.GENERATORS 的名稱或 PieceGenerator 子類別），
+    preview_depth 為預覽佇列 nextPieces（deque）的長度。方塊狀態
+    （curPiece、holdPiece 與預覽佇列的項目）都是不可變的 Piece。
+    """
+
+    BOARD_WIDTH = 10
+    BOARD_HEIGHT = 22  # 上面兩行為緩衝區，不顯示
+    INITIAL_SPEED = 500  # 初始速度，毫秒
+    FRAME_MS = 1000 / 60  # 固定時間步長（模擬以 60 Hz 進行）
+    MAX_GRAVITY = 20  # 20G：每幀最多下落 20 行，即直接落到底部
+    DEFAULT_LOCK_RESETS = 15  # 鎖定延遲中移動或旋轉可重新計時的次數上限
+    DEFAULT_PREVIEW_DEPTH = 3  # 預設的預覽方塊數
+
+    def __init__(self, board_class=None, seed=None, generator='uniform', preview_depth=None):
+        # 事件回呼表
+        self.listeners = {}
+
+        # 每個引擎使用獨立的亂數產生器，避免共用全域 random 狀態
+        self.rng = random.Random()
+        self.seed = None
+        self.piecesDrawn = 0  # 設定種子後產生的方塊數（還原亂數狀態用）
+        self.generator = makeGenerator(generator, self.rng)
+        self.previewDepth = preview_depth or self.DEFAULT_PREVIEW_DEPTH
+        self.reseed(seed)
+
+        # 初始化所有屬性
+        self.isStarted = False
+        self.score = 0
+        self.level = 1
+        self.linesCleared = 0
+        self.board = (board_class or ListBoard)(self.BOARD_WIDTH, self.BOARD_HEIGHT)
+        self.curPiece = EMPTY_PIECE
+        self.nextPieces = deque()
+        self.speed = self.INITIAL_SPEED
+
+        # 重力：每幀下落的行數（可為小數），累積到整數行時才實際下落
+        self.gravity = self.FRAME_MS / self.speed
+        self.gravityAccum = 0.0
+        self.frameCount = 0  # 本局遊戲已模擬的幀數
+
+        # 鎖定延遲（毫秒）：0 表示重力無法下落時立即固定（原本的行為）
+        self.lockDelay = 0
+        self.maxLockResets = self.DEFAULT_LOCK_RESETS
+        self.lockTimer = 0.0
+        self.lockResets = 0
+        self.lockLowestY = 0
+
+        # 儲存方塊相關屬性
+        self.holdPiece = EMPTY_PIECE  # 儲存的方塊
+        self.hasSwapped = False  # 是否已經在本次下落中交換過方塊
+
+        # 幽靈方塊位置快取：(shape, rotation, x, 遊戲區域版本, 計算時的 y, 落地 y)
+        self.ghostCache = None
+
+        self.initBoard()
+
+    def connect(self, event, callback):
+        """註冊事件回呼"""
+        self.listeners.setdefault(event, []).append(callback)
+
+    def disconnect(self, event, callback):
+        """取消註冊事件回呼"""
+        callbacks = self.listeners.get(event)
+        if callbacks and callback in callbacks:
+            callbacks.remove(callback)
+
+    def emit(self, event, *args):
+        """通知所有已註冊的回呼"""
+        callbacks = self.listeners.get(event)
+        if callbacks:
+            for callback in callbacks:
+                callback(*args)
+
+    def initBoard(self):
+        """初始化遊戲區域"""
+        self.isStarted = False
+        self.score = 0
+        self.level = 1
+        self.linesCleared = 0
+        self.speed = self.INITIAL_SPEED
+        self.gravity = self.FRAME_MS / self.speed
+        self.gravityAccum = 0.0
+
+        self.clearBoard()
+
+        # 初始化當前和下一個方塊
+        self.curPiece = self.getNewPiece()
+        self.nextPieces = deque(self.getNewPiece() for _ in range(self.previewDepth))
+        self.emit('nextPieceChanged', self.nextPieces)
+
+        # 初始化儲存方塊
+        self.holdPiece = EMPTY_PIECE
+        self.hasSwapped = False
+        self.emit('holdPieceChanged', self.holdPiece)
+
+    def clearBoard(self):
+        """清空遊戲區域"""
+        self.board.clear()
+
+    def reseed(self, seed=None):
+        """重新設定方塊序列的亂數種子（省略時隨機選一個），回傳使用的種子"""
+        if seed is None:
+            seed = random.getrandbits(32)
+        self.seed = seed
+        self.rng.seed(seed)
+        self.generator.reset()
+        self.piecesDrawn = 0
+        return seed
+
+    def setGenerator(self, generator):
+        """更換方塊產生器（名稱或類別），在下次 reseed() 與 start() 之前使用"""
+        self.generator = makeGenerator(generator, self.rng)
+
+    def getNewPiece(self):
+        """由方塊產生器生成一個新方塊"""
+        shape = self.generator.next()
+        self.piecesDrawn += 1
+        return Piece.spawn(shape)
+
+    def start(self):
+        """開始新遊戲"""
+        self.isStarted = True
+        self.clearBoard()
+        self.score = 0
+        self.frameCount = 0
+        self.gravityAccum = 0.0
+        self.emit('scoreChanged', self.score)
+
+        # 初始化當前和預覽方塊
+        self.curPiece = self.getNewPiece()
+        self.nextPieces = deque(self.getNewPiece() for _ in range(self.previewDepth))
+        self.clearLockDelay()
+        self.emit('nextPieceChanged', self.nextPieces)
+        self.emit('pieceSpawned', self.curPiece.shape)
+
+        self.emit('statusChanged', True)
+
+    def snapshot(self):
+        """記錄目前的遊戲狀態（供錄影的關鍵幀使用，可由 restore() 還原）"""
+        board = self.board
+        return {
+            'frame': self.frameCount,
+            'piecesDrawn': self.piecesDrawn,
+            'score': self.score,
+            'level': self.level,
+            'linesCleared': self.linesCleared,
+            'speed': self.speed,
+            'gravity': self.gravity,
+            'gravityAccum': self.gravityAccum,
+            'lockTimer': self.lockTimer,
+            'lockResets': self.lockResets,
+            'lockLowestY': self.lockLowestY,
+            'curPiece': self.curPiece,
+            'nextPieces': [piece.shape for piece in self.nextPieces],
+            'holdShape': self.holdPiece.shape,
+            'hasSwapped': self.hasSwapped,
+            'cells': [list(board[y]) for y in range(board.height)],
+        }
+
+    def restore(self, state):
+        """還原 snapshot() 記錄的遊戲狀態並通知包裝層
+
+        亂數與方塊產生器的狀態不直接保存：以目前的種子重新產生 piecesDrawn
+        個方塊還原，因此必須使用與記錄時相同的種子與產生器。
+        """
+        self.reseed(self.seed)
+        for _ in range(state['piecesDrawn']):
+            self.getNewPiece()
+
+        self.frameCount = state['frame']
+        self.score = state['score']
+        self.level = state['level']
+        self.linesCleared = state['linesCleared']
+        self.speed = state['speed']
+        self.gravity = state['gravity']
+        self.gravityAccum = state['gravityAccum']
+        self.lockTimer = state['lockTimer']
+        self.lockResets = state['lockResets']
+        self.lockLowestY = state['lockLowestY']
+        self.curPiece = state['curPiece']
+        self.nextPieces = deque(Piece.spawn(shape) for shape in state['nextPieces'])
+        self.holdPiece = Piece.spawn(state['holdShape'])
+        self.hasSwapped = state['hasSwapped']
+        self.board.loadCells(state['cells'])
+
+        self.emit('scoreChanged', self.score)
+        self.emit('levelChanged', self.level)
+        self.emit('nextPieceChanged', self.nextPieces)
+        self.emit('holdPieceChanged', self.holdPiece)
+        if not self.isStarted:
+            self.isStarted = True
+            self.emit('statusChanged', True)
+
+    def stateHash(self):
+        """目前狀態的 64 位元 Zobrist 雜湊，O(1) 取得（預覽佇列除外）
+
+        組合遊戲區域（固定方塊與消行時增量維護）、當前方塊、儲存方塊、
+        是否已交換與預覽佇列（前 ZOBRIST_QUEUE_DEPTH 個），可作為搜尋的
+        置換表或快取的鍵，也可以用來偵測重播是否與錄影分歧。分數、計時
+        等數值不包含在內。
+        """
+        shape, x, y, rotation = self.curPiece
+        shape_keys, x_keys, y_keys, rotation_keys = ZOBRIST_PIECE
+        h = (self.board.hash ^ shape_keys[shape] ^ x_keys[x & 31] ^ y_keys[y & 31]
+             ^ rotation_keys[rotation] ^ ZOBRIST_HOLD[self.holdPiece.shape])
+        if self.hasSwapped:
+            h ^= ZOBRIST_SWAPPED
+        for keys, piece in zip(ZOBRIST_QUEUE, self.nextPieces):
+            h ^= keys[piece.shape]
+        return h
+
+    def step(self, action):
+        """執行一個玩家動作，回傳動作是否成功"""
+        piece = self.curPiece
+        if not self.isStarted or piece.shape == 0:
+            return False
+
+        if action == ACTION_LEFT:
+            moved = self.tryMove(piece.moved(dx=-1))
+        elif action == ACTION_RIGHT:
+            moved = self.tryMove(piece.moved(dx=1))
+        elif action == ACTION_DOWN:
+            moved = self.tryMove(piece.moved(dy=1))
+        elif action == ACTION_ROTATE_CW:
+            moved = self.tryMove(piece.moved(drot=1))
+        elif action == ACTION_ROTATE_CCW:
+            moved = self.tryMove(piece.moved(drot=-1))
+        elif action == ACTION_DROP:
+            self.dropDown()
+            return True
+        elif action == ACTION_HOLD:
+            return self.swapHoldPiece()
+        else:
+            return False
+
+        if moved and self.lockDelay > 0:
+            self.resetLockDelay()
+        return moved
+
+    def setLockDelay(self, delay, max_resets=None):
+        """設定鎖定延遲（毫秒）與移動重新計時的次數上限，delay 為 0 時關閉"""
+        self.lockDelay = max(0, delay)
+        if max_resets is not None:
+            self.maxLockResets = max_resets
+
+    def resetLockDelay(self):
+        """方塊移動或旋轉後更新鎖定延遲
+
+        落到比之前更低的位置時計時與次數都歸零；在地面上移動或旋轉時
+        重新計時，但每個方塊最多 maxLockResets 次。
+        """
+        y = self.curPiece.y
+        if y > self.lockLowestY:
+            self.lockLowestY = y
+            self.lockResets = 0
+            self.lockTimer = 0.0
+        elif self.lockTimer > 0 and self.lockResets < self.maxLockResets:
+            self.lockResets += 1
+            self.lockTimer = 0.0
+
+    def clearLockDelay(self):
+        """新方塊出現時重設鎖定延遲狀態"""
+        self.lockTimer = 0.0
+        self.lockResets = 0
+        self.lockLowestY = self.curPiece.y
+
+    def frame(self, gravity_scale=1.0):
+        """推進一個固定時間步（FRAME_MS）：累積重力並讓方塊下落整數行
+
+        gravity_scale 為重力倍率（例如加速下落時的倍率）。沒有鎖定延遲時，
+        下落 n 行等同於連續呼叫 n 次 tick()：途中碰到底部時方塊固定；
+        有鎖定延遲時，方塊在地面上停留 lockDelay 毫秒後才固定。
+        回傳方塊是否有下落或固定（呼叫端據此決定是否需要重繪）。
+        """
+        if not self.isStarted or self.curPiece.shape == 0:
+            return False
+
+        self.frameCount += 1
+        self.gravityAccum += min(self.MAX_GRAVITY, self.gravity * gravity_scale)
+        rows = int(self.gravityAccum)
+        self.gravityAccum -= rows
+
+        piece = self.curPiece
+        ghost_y = self.ghostY()
+
+        if self.lockDelay <= 0:
+            if rows == 0:
+                return False
+            if piece.y + rows <= ghost_y:
+                self.curPiece = piece.moved(dy=rows)
+                return True
+
+            # 重力超過剩餘的距離：落到底部後再下落一格時固定
+            self.curPiece = piece.moved(dy=ghost_y - piece.y)
+            self.pieceDropped()
+            return True
+
+        moved = False
+        if rows and piece.y < ghost_y:
+            self.curPiece = piece = piece.moved(dy=min(rows, ghost_y - piece.y))
+            self.resetLockDelay()
+            moved = True
+
+        if piece.y < ghost_y:
+            return moved
+
+        # 在地面上：累積鎖定延遲，用完重新計時次數後一落地就固定
+        self.lockTimer += self.FRAME_MS
+        if self.lockTimer >= self.lockDelay or self.lockResets >= self.maxLockResets:
+            self.pieceDropped()
+            return True
+        return moved
+
+    def setGravity(self, rows_per_frame):
+        """設定重力（每幀下落的行數），最大為 MAX_GRAVITY（20G）
+
+        下次升級時會依新的速度重新計算。
+        """
+        self.gravity = max(0.0, min(self.MAX_GRAVITY, rows_per_frame))
+
+    def tick(self):
+        """重力下落一格，無法下落時固定方塊；回傳方塊是否已固定"""
+        if not self.isStarted:
+            return False
+
+        if self.tryMove(self.curPiece.moved(dy=1)):
+            return False
+
+        self.pieceDropped()
+        return True
+
+    def rotatedShape(self):
+        """取得當前方塊旋轉後的形狀（查表，不會建立新矩陣）"""
+        return ROTATED_SHAPES[self.curPiece.shape][self.curPiece.rotation]
+
+    def tryMove(self, piece):
+        """嘗試把當前方塊移到 piece（通常由 curPiece.moved() 產生），回傳是否成功
+
+        旋轉時依 SRS 系統依序嘗試牆踢位置，使用第一個有效的位置。
+        """
+        shape, x, y, rotation = piece
+        current_rotation = self.curPiece.rotation
+        check = self.board.checkPiece
+
+        # 如果是旋轉操作，使用 SRS 系統
+        if rotation != current_rotation and shape > 0:
+            # 確定旋轉方向（順時針或逆時針）
+            direction = 0 if (rotation - current_rotation) % 4 == 1 else 1
+
+            # 獲取對應的牆踢數據
+            kick_data = SRS_WALL_KICKS[SHAPE_TYPES[shape]][direction][current_rotation]
+
+            # 嘗試每個可能的牆踢位置
+            for kick_x, kick_y in kick_data:
+                if check(shape, rotation, x + kick_x, y + kick_y):
+                    self.curPiece = _tuple_new(Piece, (shape, x + kick_x, y + kick_y, rotation))
+                    return True
+
+            # 所有牆踢位置都無效，保持原本的狀態
+            return False
+
+        # 非旋轉操作，直接嘗試移動
+        if check(shape, rotation, x, y):
+            self.curPiece = piece
+            return True
+        return False
+
+    def checkPosition(self):
+        """檢查當前位置是否有效"""
+        piece = self.curPiece
+        return self.board.checkPiece(piece.shape, piece.rotation, piece.x, piece.y)
+
+    def isValidPosition(self, shape, x, y, rotation):
+        """檢查指定位置是否有效（用於幽靈方塊計算）"""
+        return self.board.checkPiece(shape, rotation, x, y)
+
+    def ghostY(self):
+        """計算幽靈方塊位置（方塊直接落到底部時的 y 座標）
+
+        結果會快取到方塊左右移動、旋轉、換方塊或遊戲區域改變為止；
+        方塊只是往下移動且尚未越過落地位置時，落地位置不變，直接沿用。
+        """
+        shape, x, y, rotation = self.curPiece
+        version = self.board.version
+
+        cache = self.ghostCache
+        if (cache is not None and cache[0] == shape and cache[1] == rotation
+                and cache[2] == x and cache[3] == version and cache[4] <= y <= cache[5]):
+            return cache[5]
+
+        ghost_y = self.board.dropY(shape, rotation, x, y)
+        self.ghostCache = (shape, rotation, x, version, y, ghost_y)
+        return ghost_y
+
+    def dropDown(self):
+        """方塊直接落到底部（使用幽靈方塊位置，不逐格移動）"""
+        piece = self.curPiece
+        self.curPiece = piece.moved(dy=self.ghostY() - piece.y)
+        self.pieceDropped()
+
+    def pieceDropped(self):
+        """方塊落到底部後，在底部固定並生成新方塊"""
+        # 將當前方塊的形狀添加到遊戲區域
+        piece = self.curPiece
+        touched_rows = self.board.placePiece(piece.shape, piece.rotation, piece.x, piece.y)
+
+        self.emit('pieceLocked')
+
+        # 移除完整的行（只有方塊佔用的行可能變成滿行）
+        self.removeFullLines(touched_rows)
+
+        # 生成新方塊
+        if not self.newPiece():
+            self.isStarted = False
+            self.emit('statusChanged', False)
+        else:
+            # 重置交換標誌，允許在新方塊下落時再次交換
+            self.hasSwapped = False
+
+    def removeFullLines(self, rows=None):
+        """直接移除已填滿的行；指定 rows 時只檢查這些行"""
+        # 從底部向上檢查每一行，找出需要消除的行
+        full_lines = self.board.fullRows(rows)
+
+        if full_lines:
+            self.doRemoveLines(full_lines)
+            return True
+        else:
+            # 沒有滿行，繼續遊戲
+            return False
+
+    def doRemoveLines(self, full_lines=None):
+        """實際移除已填滿的行"""
+        if full_lines is None or not full_lines:
+            return
+
+        num_full_lines = len(full_lines)
+
+        # 一次就地移除所有滿行，上方的行往下移
+        self.board.removeRows(full_lines)
+
+        # 計算得分
+        self.score += LINE_SCORES[min(num_full_lines, 4)]
+        self.emit('scoreChanged', self.score)
+
+        # 更新消除的行數並檢查是否需要提高難度
+        self.linesCleared += num_full_lines
+        self.emit('linesRemoved', num_full_lines)
+        self.checkLevel()
+
+    def checkLevel(self):
+        """檢查並更新遊戲難度級別"""
+        # 每消除10行提高一個級別，最高10級
+        new_level = min(10, 1 + self.linesCleared // 10)
+
+        if new_level > self.level:
+            self.level = new_level
+            # 隨著級別提高，速度增加（速度值減小）
+            self.speed = max(100, self.INITIAL_SPEED - (self.level - 1) * 50)
+            self.gravity = self.FRAME_MS / self.speed
+
+            # 發送級別變更通知（包裝層據此更新顯示）
+            self.emit('levelChanged', self.level)
+
+    def newPiece(self):
+        """生成新方塊"""
+        self.gravityAccum = 0.0
+        self.curPiece = self.nextPieces.popleft()
+        self.nextPieces.append(self.getNewPiece())
+        self.emit('nextPieceChanged', self.nextPieces)
+        self.clearLockDelay()
+        self.emit('pieceSpawned', self.curPiece.shape)
+
+        # 檢查遊戲是否結束
+        # 1. 檢查新方塊是否可以放置
+        if not self.tryMove(Piece.spawn(self.curPiece.shape)):
+            self.curPiece = EMPTY_PIECE
+            return False
+
+        # 2. 檢查頂部區域是否已有方塊（額外的遊戲結束檢查）
+        if not self.board.isRowEmpty(2):  # 檢查緩衝區下方第一行
+            self.curPiece = EMPTY_PIECE
+            return False
+
+        return True
+
+    def swapHoldPiece(self):
+        """儲存當前方塊或與已儲存的方塊交換，回傳是否成功交換"""
+        # 如果已經在本次下落中交換過，則不允許再次交換
+        if self.hasSwapped:
+            return False
+
+        # 保存當前方塊的形狀和旋轉狀態
+        current_shape = self.curPiece.shape
+
+        if self.holdPiece.shape == 0:
+            # 如果儲存區為空，則儲存當前方塊並生成新方塊
+            self.holdPiece = Piece.spawn(current_shape)  # 儲存時重置位置與旋轉狀態
+            self.emit('holdPieceChanged', self.holdPiece)
+
+            # 生成新方塊
+            self.curPiece = self.nextPieces.popleft()
+            self.nextPieces.append(self.getNewPiece())
+            self.emit('nextPieceChanged', self.nextPieces)
+        else:
+            # 如果儲存區有方塊，則交換
+            temp_piece = self.holdPiece
+            self.holdPiece = Piece.spawn(current_shape)  # 儲存時重置位置與旋轉狀態
+            self.emit('holdPieceChanged', self.holdPiece)
+
+            # 設置當前方塊為儲存的方塊
+            self.curPiece = temp_piece
+
+        self.emit('pieceSpawned', self.curPiece.shape)
+
+        # 檢查新位置是否有效
+        if not self.tryMove(Piece.spawn(self.curPiece.shape)):
+            # 如果新位置無效，遊戲結束
+            self.isStarted = False
+            self.emit('statusChanged', False)
+            return False
+
+        # 標記已經交換過
+        self.hasSwapped = True
+        self.clearLockDelay()
+        return True
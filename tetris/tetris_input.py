@@ -0,0 +1,161 @@
+"""由遊戲時鐘驅動的輸入處理
+
+InputHandler 把「按下 / 放開」事件轉換成 TetrisEngine 動作，左右移動的
+自動重複（DAS、ARR）與加速下落都以引擎的固定時間步（FRAME_MS）計時，
+不依賴作業系統的按鍵重複速率。鎖定延遲由引擎負責，InputHandler 只負責
+設定。所有計時都以幀為單位推進，因此相同的按鍵序列一定得到相同的結果，
+可在無頭模式下測試，也可以錄影重播（見 tetris_replay）：
+
+    handler = InputHandler(engine)
+    handler.press(ACTION_LEFT)
+    for _ in range(30):
+        handler.frame()
+    handler.release(ACTION_LEFT)
+"""
+from tetris_engine import (ACTION_LEFT, ACTION_RIGHT, ACTION_DOWN,
+                           ACTION_ROTATE_CW, ACTION_ROTATE_CCW, ACTION_DROP,
+                           ACTION_HOLD)
+
+# 預設值（毫秒），接近常見的標準設定
+DEFAULT_DAS = 167  # 按住後開始自動重複前的延遲
+DEFAULT_ARR = 33  # 自動重複的間隔，0 表示立即移到牆邊
+DEFAULT_SOFT_DROP_FACTOR = 20  # 加速下落時的重力倍率
+DEFAULT_LOCK_DELAY = 500  # 方塊落地後到固定前的時間
+
+# 只觸發一次、不會自動重複的動作
+SINGLE_ACTIONS = (ACTION_ROTATE_CW, ACTION_ROTATE_CCW, ACTION_DROP, ACTION_HOLD)
+
+
+class InputHandler:
+    """以遊戲時鐘處理 DAS、ARR、加速下落倍率與鎖定延遲設定
+
+    das、arr、lock_delay 單位為毫秒；soft_drop_factor 為按住下鍵時的
+    重力倍率（受引擎 MAX_GRAVITY 限制）；lock_resets 為鎖定延遲中移動
+    或旋轉可重新計時的次數上限。每個模擬幀呼叫一次 frame()，它會處理
+    按住的按鍵並推進引擎一幀。
+    """
+
+    def __init__(self, engine, das=DEFAULT_DAS, arr=DEFAULT_ARR,
+                 soft_drop_factor=DEFAULT_SOFT_DROP_FACTOR,
+                 lock_delay=DEFAULT_LOCK_DELAY, lock_resets=None):
+        self.engine = engine
+        self.das = das
+        self.arr = arr
+        self.softDropFactor = soft_drop_factor
+        engine.setLockDelay(lock_delay, lock_resets)
+
+        # 按住的左右方向（最後按下的優先）與各自的計時
+        self.heldDirections = []
+        self.dasTimer = 0.0
+        self.arrTimer = 0.0
+        self.charged = False
+        self.softDropping = False
+
+    def press(self, action):
+        """按下按鍵：立即執行一次動作並開始計時，回傳遊戲狀態是否改變"""
+        self.engine.emit('inputPressed', action)
+
+        if action in (ACTION_LEFT, ACTION_RIGHT):
+            if action in self.heldDirections:
+                return False
+            self.heldDirections.append(action)
+            self.restartRepeat()
+            return self.engine.step(action)
+
+        if action == ACTION_DOWN:
+            self.softDropping = True
+            return self.engine.step(ACTION_DOWN)
+
+        if action in SINGLE_ACTIONS:
+            return self.engine.step(action)
+        return False
+
+    def release(self, action):
+        """放開按鍵；放開目前的方向時改用另一個仍按住的方向並重新計時"""
+        self.engine.emit('inputReleased', action)
+
+        if action == ACTION_DOWN:
+            self.softDropping = False
+        elif action in self.heldDirections:
+            was_active = self.heldDirections[-1] == action
+            self.heldDirections.remove(action)
+            if was_active:
+                self.restartRepeat()
+
+    def tap(self, action):
+        """按下後立即放開（例如自動玩家的動作），回傳遊戲狀態是否改變"""
+        changed = self.press(action)
+        self.release(action)
+        return changed
+
+    def releaseAll(self):
+        """放開所有按鍵（暫停或失去焦點時使用，避免按鍵卡住）"""
+        for action in self.heldDirections[::-1]:
+            self.release(action)
+        if self.softDropping:
+            self.release(ACTION_DOWN)
+
+    def snapshot(self):
+        """記錄按住的按鍵與計時狀態（供錄影的關鍵幀使用）"""
+        return {
+            'heldDirections': list(self.heldDirections),
+            'dasTimer': self.dasTimer,
+            'arrTimer': self.arrTimer,
+            'charged': self.charged,
+            'softDropping': self.softDropping,
+        }
+
+    def restore(self, state):
+        """還原 snapshot() 記錄的狀態"""
+        self.heldDirections = list(state['heldDirections'])
+        self.dasTimer = state['dasTimer']
+        self.arrTimer = state['arrTimer']
+        self.charged = state['charged']
+        self.softDropping = state['softDropping']
+
+    def restartRepeat(self):
+        """重新開始 DAS 計時"""
+        self.dasTimer = 0.0
+        self.arrTimer = 0.0
+        self.charged = False
+
+    def frame(self):
+        """推進一幀：處理按住的方向與加速下落，再推進引擎，回傳遊戲狀態是否改變"""
+        # 幀的邊界：上一幀的輸入都已套用，錄影在此記錄關鍵幀
+        self.engine.emit('frameStarted')
+
+        changed = False
+        frame_ms = self.engine.FRAME_MS
+
+        if self.heldDirections:
+            direction = self.heldDirections[-1]
+            if not self.charged:
+                self.dasTimer += frame_ms
+                if self.dasTimer >= self.das:
+                    # DAS 充滿：立即自動移動一次，之後每 ARR 移動一次
+                    self.charged = True
+                    self.arrTimer = self.dasTimer - self.das
+                    changed |= self.repeatMove(direction, 1)
+            else:
+                self.arrTimer += frame_ms
+                if self.arr <= 0:
+                    changed |= self.repeatMove(direction, None)
+                elif self.arrTimer >= self.arr:
+                    count = int(self.arrTimer // self.arr)
+                    self.arrTimer -= count * self.arr
+                    changed |= self.repeatMove(direction, count)
+
+        scale = self.softDropFactor if self.softDropping else 1.0
+        changed |= self.engine.frame(scale)
+        return changed
+
+    def repeatMove(self, direction, count):
+        """自動重複移動 count 次（None 或 ARR 為 0 時移到不能再移動為止）"""
+        if count is None or self.arr <= 0:
+            count = self.engine.BOARD_WIDTH
+        moved = False
+        for _ in range(count):
+            if not self.engine.step(direction):
+                break
+            moved = True
+        return moved
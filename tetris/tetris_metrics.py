@@ -0,0 +1,91 @@
+"""效能指標記錄：滾動百分位數
+
+MetricsRecorder 以固定長度的視窗保存每項指標最近的樣本（毫秒），隨時可以
+取得 p50、p95、p99，並寫成 JSON 檔案。TetrisWindow 的除錯覆蓋層（F3）用它
+記錄繪製時間、重力下落的計時誤差、按鍵到繪製的延遲與事件迴圈的延遲，
+玩家回報卡頓時可以請對方附上關閉遊戲時寫出的檔案。
+
+不依賴 Qt，也可以用在無頭的測試程式中：
+
+    metrics = MetricsRecorder()
+    metrics.record('paint', 0.8)
+    metrics.summary()['paint']['p95']
+"""
+import json
+from collections import deque
+
+DEFAULT_WINDOW = 1000  # 每項指標保留的最近樣本數
+PERCENTILES = (50, 95, 99)
+
+
+class RollingStats:
+    """單一指標最近 window 個樣本的統計（另外記錄全部樣本的數量、總和與最大值）"""
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, value):
+        """加入一個樣本"""
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+
+    def percentiles(self, percents=PERCENTILES):
+        """視窗內樣本的百分位數（nearest-rank），回傳 {'p50': ...}"""
+        if not self.samples:
+            return {f'p{p}': 0.0 for p in percents}
+        ordered = sorted(self.samples)
+        result = {}
+        for p in percents:
+            rank = -(-p * len(ordered) // 100)  # 無條件進位的 p% × 樣本數
+            result[f'p{p}'] = ordered[max(rank, 1) - 1]
+        return result
+
+    def summary(self):
+        """統計摘要：count、total、max 涵蓋全部樣本，其餘只涵蓋視窗內的樣本"""
+        samples = self.samples
+        summary = {
+            'count': self.count,
+            'total': self.total,
+            'max': self.maximum,
+            'last': samples[-1] if samples else 0.0,
+            'mean': sum(samples) / len(samples) if samples else 0.0,
+        }
+        summary.update(self.percentiles())
+        return summary
+
+
+class MetricsRecorder:
+    """以名稱記錄多項指標的滾動統計"""
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self.metrics = {}
+
+    def record(self, name, value):
+        """記錄一個樣本（第一次使用某個名稱時自動建立）"""
+        stats = self.metrics.get(name)
+        if stats is None:
+            stats = self.metrics[name] = RollingStats(self.window)
+        stats.add(value)
+
+    def stats(self, name):
+        """取得指標的 RollingStats，沒有樣本時回傳 None"""
+        return self.metrics.get(name)
+
+    def summary(self):
+        """所有指標的統計摘要"""
+        return {name: stats.summary() for name, stats in self.metrics.items()}
+
+    def dump(self, path, extra=None):
+        """將統計摘要寫入 JSON 檔案，extra 為附加的環境資訊"""
+        data = dict(extra or {})
+        data['window'] = self.window
+        data['metrics'] = self.summary()
+        with open(path, 'w') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,235 @@
+"""三個顯示元件的離屏繪製效能測試
+
+使用 Qt 的 offscreen 平台（不需要顯示器或 GPU，可在 Linux CI 上執行），以
+QWidget.render() 把 TetrisBoard、NextPieceDisplay、HoldPieceDisplay 的
+paintEvent 繪製到 QImage，回報每幀毫秒數與每幀的繪製呼叫次數。
+
+TetrisBoard 以三種代表性的盤面（empty 空盤面、half 填滿一半、topout 接近
+頂端）與多種方塊大小（square_size）測試兩種情況：
+
+    steady   圖層快取有效，只重畫移動中的方塊與幽靈方塊（一般的幀）
+    locked   已落下方塊的圖層失效後重畫（方塊固定或消行後的幀）
+
+繪製呼叫次數另外以計數用的 QPainter 繪製一次取得，不影響計時。結果格式與
+tetris_benchmark 相同，也可以儲存為基準並與基準比較。
+
+用法：
+    python tetris_paint_benchmark.py
+    python tetris_paint_benchmark.py --sizes 20 30 40 --frames 200
+    python tetris_paint_benchmark.py --baseline paint_baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import time
+from contextlib import contextmanager
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QImage, QPainter, QColor
+from PyQt5.QtCore import QT_VERSION_STR
+
+import tetris_v4
+from tetris_v4 import TetrisBoard, NextPieceDisplay, HoldPieceDisplay
+from tetris_engine import TetrisEngine, Piece
+from tetris_benchmark import best, compareResults, DEFAULT_TOLERANCE
+
+# 代表性盤面：名稱 -> 由下往上填滿的行數（可見區域共 20 行）
+BOARD_FILLS = {
+    'empty': 0,
+    'half': 10,
+    'topout': 16,
+}
+
+DEFAULT_SIZES = (20, 30, 40)  # 預設測試的方塊大小（像素）
+DEFAULT_FRAMES = 100  # 每次計時繪製的幀數
+DEFAULT_REPEAT = 5  # 每項重複次數，取最快的一次
+WARMUP_FRAMES = 3  # 計時前先繪製的幀數（建立圖塊與圖層快取）
+HOLD_SHAPE = 6  # 儲存區顯示的方塊（I 形）
+
+# 計入繪製呼叫的 QPainter 方法
+DRAW_METHODS = ('drawPixmap', 'drawImage', 'drawLine', 'drawLines', 'drawRect',
+                'drawRects', 'fillRect', 'eraseRect', 'drawText', 'drawPolygon',
+                'drawEllipse', 'drawPath', 'fillPath', 'drawPoint', 'drawPoints')
+
+
+class CountingPainter(QPainter):
+    """記錄繪製呼叫次數的 QPainter（只用來計數，計時時使用原本的 QPainter）"""
+
+    calls = 0
+
+
+def _countedMethod(name):
+    method = getattr(QPainter, name)
+
+    def draw(self, *args):
+        CountingPainter.calls += 1
+        return method(self, *args)
+
+    draw.__name__ = name
+    return draw
+
+
+for _name in DRAW_METHODS:
+    setattr(CountingPainter, _name, _countedMethod(_name))
+
+
+@contextmanager
+def countingPainter():
+    """暫時讓 tetris_v4 的繪製程式改用 CountingPainter"""
+    original = tetris_v4.QPainter
+    tetris_v4.QPainter = CountingPainter
+    try:
+        yield CountingPainter
+    finally:
+        tetris_v4.QPainter = original
+
+
+def boardCells(width, height, filled_rows, seed):
+    """由下往上填滿 filled_rows 行的遊戲區域，每行隨機留一個空格（不會消行）"""
+    rng = random.Random(f'paint:{seed}:{filled_rows}')
+    cells = [[0] * width for _ in range(height)]
+    for y in range(height - filled_rows, height):
+        gap = rng.randrange(width)
+        cells[y] = [0 if x == gap else rng.randint(1, 7) for x in range(width)]
+    return cells
+
+
+def makeBoard(fill, square_size, seed):
+    """建立顯示指定盤面的 TetrisBoard，內容區域剛好是 square_size 的整數倍"""
+    board = TetrisBoard(None)
+    engine = board.engine
+    engine.reseed(seed)
+    engine.start()
+    engine.board.loadCells(boardCells(engine.BOARD_WIDTH, engine.BOARD_HEIGHT,
+                                      BOARD_FILLS[fill], seed))
+
+    margin = board.frameWidth() * 2
+    board.resize(square_size * board.BOARD_WIDTH + margin,
+                 square_size * (board.BOARD_HEIGHT - 2) + margin)
+    return board
+
+
+def makeNextDisplay(seed):
+    """建立顯示預覽佇列的 NextPieceDisplay"""
+    display = NextPieceDisplay(None)
+    engine = TetrisEngine(seed=seed, generator=TetrisBoard.PIECE_GENERATOR)
+    engine.start()
+    display.updateNextPieces(engine.nextPieces)
+    return display
+
+
+def makeHoldDisplay():
+    """建立顯示儲存方塊的 HoldPieceDisplay"""
+    display = HoldPieceDisplay(None)
+    display.updateHoldPiece(Piece.spawn(HOLD_SHAPE))
+    return display
+
+
+def renderFrames(widget, image, frames, before_frame=None):
+    """以 widget.render() 繪製 frames 幀到 image，回傳 (秒數, 幀數)
+
+    before_frame 在每幀繪製前呼叫（例如讓快取的圖層失效），也計入時間。
+    """
+    start = time.perf_counter()
+    for _ in range(frames):
+        if before_frame is not None:
+            before_frame()
+        widget.render(image)
+    return time.perf_counter() - start, frames
+
+
+def measureWidget(widget, frames, repeat, before_frame=None):
+    """測量元件每幀的毫秒數與繪製呼叫次數，回傳結果 dict"""
+    image = QImage(widget.size(), QImage.Format_ARGB32_Premultiplied)
+    image.fill(QColor(0, 0, 0))
+    renderFrames(widget, image, WARMUP_FRAMES, before_frame)
+
+    ns, count = best(lambda: renderFrames(widget, image, frames, before_frame), repeat)
+
+    with countingPainter() as painter:
+        painter.calls = 0
+        renderFrames(widget, image, 1, before_frame)
+        calls = painter.calls
+    return {'ms': ns / 1e6, 'frames': count, 'drawCalls': calls}
+
+
+def invalidateStack(board):
+    """讓 TetrisBoard 已落下方塊的圖層失效（模擬方塊固定後的幀）"""
+    def invalidate():
+        board.stackKey = None
+    return invalidate
+
+
+def runPaintBenchmarks(sizes=DEFAULT_SIZES, fills=None, frames=DEFAULT_FRAMES,
+                       repeat=DEFAULT_REPEAT, seed=0):
+    """執行繪製效能測試，回傳 {"元件/盤面/大小/情況": {"ms", "frames", "drawCalls"}}
+
+    必須在建立 QApplication 之後呼叫。
+    """
+    results = {}
+    for fill in fills or list(BOARD_FILLS):
+        for size in sizes:
+            board = makeBoard(fill, size, seed)
+            key = f'board/{fill}/{size}'
+            results[f'{key}/steady'] = measureWidget(board, frames, repeat)
+            results[f'{key}/locked'] = measureWidget(board, frames, repeat,
+                                                     invalidateStack(board))
+
+    results['next'] = measureWidget(makeNextDisplay(seed), frames, repeat)
+    results['hold'] = measureWidget(makeHoldDisplay(), frames, repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='俄羅斯方塊離屏繪製效能測試')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='遊戲區域的方塊大小（像素）')
+    parser.add_argument('--fill', choices=list(BOARD_FILLS), action='append',
+                        help='只測試指定盤面（可重複指定，預設全部）')
+    parser.add_argument('--frames', type=int, default=DEFAULT_FRAMES, help='每次計時繪製的幀數')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='每項重複次數')
+    parser.add_argument('--seed', type=int, default=0, help='產生盤面與方塊的種子')
+    parser.add_argument('--save', help='將結果寫入 JSON 檔案（作為之後比較的基準）')
+    parser.add_argument('--baseline', help='與此 JSON 基準檔比較')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='比較時容許變慢的比例')
+    args = parser.parse_args()
+
+    # 沒有指定平台時使用 offscreen，不需要顯示器
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    app = QApplication([])
+
+    report = {
+        'python': platform.python_version(),
+        'qt': QT_VERSION_STR,
+        'platform': app.platformName(),
+        'machine': platform.machine(),
+        'frames': args.frames,
+        'repeat': args.repeat,
+        'results': runPaintBenchmarks(args.sizes, args.fill, args.frames,
+                                      args.repeat, args.seed),
+    }
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison = compareResults(report['results'], baseline['results'],
+                                    args.tolerance, metric='ms')
+        report['comparison'] = comparison
+        regressions = [key for key, item in comparison.items() if item['regression']]
+        report['regressions'] = regressions
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""引擎各階段的效能掛鉤
+
+Profiler 把計時包裝掛在物件的方法上（以同名的實例屬性遮蔽類別的方法），
+每次呼叫前後通知接收端（sink）。可以掛上的階段為 PHASES：
+
+    keyPressEvent   TetrisBoard 處理按鍵
+    tryMove         移動與旋轉（含 newPiece 放置新方塊時的檢查）
+    pieceDropped    固定方塊（含消行與生成新方塊）
+    doRemoveLines   移除滿行（含計分與升級檢查）
+    checkLevel      升級檢查
+    newPiece        生成新方塊
+
+時間包含巢狀呼叫的階段（例如 pieceDropped 包含 doRemoveLines 與 newPiece）。
+detach() 刪除實例屬性後恢復類別原本的方法，沒有掛上時完全沒有額外成本，
+所以這個模組可以一直留在正式版中。
+
+接收端：
+    MemorySink      在記憶體中統計每個階段的次數、總時間與百分位數
+    JsonLinesSink   每次呼叫寫一行 JSON 到檔案，之後再分析
+    CProfileSink    觸發後以 cProfile 剖析接下來幾次呼叫，寫出 .prof 檔
+
+用法：
+    profiler = Profiler(MemorySink())
+    profiler.attach(engine)
+    ...
+    profiler.detach()
+    profiler.sink.summary()['pieceDropped']['p95']
+
+也可以用 profiler.phase('名稱') 計時任意一段程式碼。遊戲視窗在設定環境變數
+TETRIS_PROFILE=檔名 時一啟動就掛上，依副檔名選擇接收端（見 sinkForPath）。
+"""
+import cProfile
+import json
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from tetris_metrics import MetricsRecorder, DEFAULT_WINDOW
+
+PHASES = ('keyPressEvent', 'tryMove', 'pieceDropped', 'doRemoveLines',
+          'checkLevel', 'newPiece')
+
+DEFAULT_PROFILE_CALLS = 100  # CProfileSink 每次觸發剖析的呼叫次數
+
+
+class ProfileSink:
+    """接收階段事件的介面，子類別覆寫需要的方法"""
+
+    def begin(self, phase):
+        """階段開始前呼叫"""
+
+    def end(self, phase, start, seconds):
+        """階段結束後呼叫，start 為開始時的 time.perf_counter()，seconds 為經過秒數"""
+
+    def close(self):
+        """停止接收事件，釋放資源"""
+
+
+class MemorySink(ProfileSink):
+    """以 MetricsRecorder 統計每個階段的耗時（毫秒），指定 path 時關閉後寫成 JSON"""
+
+    def __init__(self, window=DEFAULT_WINDOW, path=None):
+        self.metrics = MetricsRecorder(window)
+        self.path = path
+
+    def end(self, phase, start, seconds):
+        self.metrics.record(phase, seconds * 1000)
+
+    def summary(self):
+        """每個階段的統計摘要（count、total、max、mean、p50、p95、p99）"""
+        return self.metrics.summary()
+
+    def close(self):
+        if self.path:
+            self.metrics.dump(self.path)
+
+
+class JsonLinesSink(ProfileSink):
+    """每次呼叫寫一行 {"phase", "t", "ms"}，t 為建立接收端後經過的秒數"""
+
+    def __init__(self, path):
+        self.file = open(path, 'w')
+        self.origin = time.perf_counter()
+
+    def end(self, phase, start, seconds):
+        self.file.write(json.dumps({
+            'phase': phase,
+            't': round(start - self.origin, 6),
+            'ms': round(seconds * 1000, 4),
+        }) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+class CProfileSink(ProfileSink):
+    """觸發後以 cProfile 剖析指定階段接下來 calls 次的呼叫，完成後寫入 path
+
+    phases 省略時剖析所有掛上的階段。巢狀的呼叫計入最外層的那一次；
+    剖析完成後停止，可以再呼叫 arm() 重新觸發。建立時 armed=False 則
+    等到 arm() 才開始。寫出的檔案可用 pstats 或 snakeviz 檢視。
+    """
+
+    def __init__(self, path, phases=None, calls=DEFAULT_PROFILE_CALLS, armed=True):
+        self.path = path
+        self.phases = set(phases) if phases else None
+        self.profile = cProfile.Profile()
+        self.remaining = 0
+        self.depth = 0
+        if armed:
+            self.arm(calls)
+
+    def arm(self, calls=DEFAULT_PROFILE_CALLS):
+        """剖析接下來 calls 次的呼叫"""
+        self.remaining = calls
+
+    def begin(self, phase):
+        if self.depth:
+            self.depth += 1
+        elif self.remaining and (self.phases is None or phase in self.phases):
+            self.depth = 1
+            self.profile.enable()
+
+    def end(self, phase, start, seconds):
+        if not self.depth:
+            return
+        self.depth -= 1
+        if self.depth:
+            return
+        self.profile.disable()
+        self.remaining -= 1
+        if not self.remaining:
+            self.profile.dump_stats(self.path)
+
+    def close(self):
+        if self.depth:
+            self.profile.disable()
+            self.depth = 0
+        if self.remaining:
+            # 未完成的剖析也寫出已收集的部分
+            self.remaining = 0
+            self.profile.dump_stats(self.path)
+
+
+def sinkForPath(path):
+    """依副檔名建立寫入 path 的接收端：.prof 用 cProfile、.jsonl 逐筆記錄、其他寫統計摘要"""
+    if path.endswith('.prof'):
+        return CProfileSink(path)
+    if path.endswith('.jsonl'):
+        return JsonLinesSink(path)
+    return MemorySink(path=path)
+
+
+class Profiler:
+    """把 sink 的計時掛在物件的方法上"""
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.hooked = []  # 已掛上的 (物件, 階段)
+
+    def attach(self, target, phases=PHASES):
+        """在 target 上掛上 phases 中 target 具有的方法，回傳掛上的階段列表"""
+        attached = []
+        for phase in phases:
+            method = getattr(target, phase, None)
+            if method is None or phase in vars(target):
+                continue  # 沒有這個方法或已經掛上
+            setattr(target, phase, self.wrap(phase, method))
+            self.hooked.append((target, phase))
+            attached.append(phase)
+        return attached
+
+    def detach(self):
+        """移除所有掛上的計時，恢復類別原本的方法"""
+        for target, phase in self.hooked:
+            delattr(target, phase)
+        self.hooked = []
+
+    def close(self):
+        """移除計時並關閉接收端"""
+        self.detach()
+        self.sink.close()
+
+    def wrap(self, phase, method):
+        """建立呼叫 method 前後通知接收端的包裝函式"""
+        begin = self.sink.begin
+        end = self.sink.end
+        clock = time.perf_counter
+
+        @wraps(method)
+        def profiled(*args, **kwargs):
+            begin(phase)
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                end(phase, start, clock() - start)
+        return profiled
+
+    @contextmanager
+    def phase(self, name):
+        """計時 with 區塊內的程式碼，當作名為 name 的階段"""
+        self.sink.begin(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sink.end(name, start, time.perf_counter() - start)
@@ -0,0 +1,94 @@
+"""方塊產生器（隨機器）
+
+TetrisEngine 透過產生器取得新方塊。所有產生器都使用引擎提供的
+random.Random，因此相同的種子一定產生相同的方塊序列：
+
+    uniform  每次均勻隨機抽一種方塊（原本的行為）
+    7bag     每 7 個方塊為一袋，每種方塊各一個，袋內順序隨機（現代標準）
+    14bag    每袋 14 個方塊，每種方塊各兩個
+    classic  早期 NES 版本：抽到與上一個相同的方塊時重抽一次
+
+自訂產生器繼承 PieceGenerator 並實作 next()；要能錄影重播時需設定
+name 並登錄到 GENERATORS。
+"""
+
+PIECE_COUNT = 7  # 方塊種類數，形狀編號為 1 到 7
+
+
+class PieceGenerator:
+    """方塊產生器的基底類別"""
+
+    name = None
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.reset()
+
+    def reset(self):
+        """清除內部狀態（重新設定種子後由引擎呼叫）"""
+
+    def next(self):
+        """產生下一個方塊的形狀編號"""
+        raise NotImplementedError
+
+
+class UniformGenerator(PieceGenerator):
+    """每次均勻隨機抽一種方塊"""
+
+    name = 'uniform'
+
+    def next(self):
+        return self.rng.randint(1, PIECE_COUNT)
+
+
+class BagGenerator(PieceGenerator):
+    """袋子隨機器：每袋包含每種方塊各 copies 個，抽完再洗下一袋"""
+
+    name = '7bag'
+    copies = 1
+
+    def reset(self):
+        self.bag = []
+
+    def next(self):
+        if not self.bag:
+            self.bag = list(range(1, PIECE_COUNT + 1)) * self.copies
+            self.rng.shuffle(self.bag)
+        return self.bag.pop()
+
+
+class DoubleBagGenerator(BagGenerator):
+    """14 個方塊一袋的袋子隨機器（同種方塊最多連續出現 4 次）"""
+
+    name = '14bag'
+    copies = 2
+
+
+class ClassicGenerator(PieceGenerator):
+    """NES 版本的隨機器：先從 8 個結果中抽，抽到第 8 個或與上一個相同時重抽一次"""
+
+    name = 'classic'
+
+    def reset(self):
+        self.previous = 0
+
+    def next(self):
+        shape = self.rng.randint(1, PIECE_COUNT + 1)
+        if shape > PIECE_COUNT or shape == self.previous:
+            shape = self.rng.randint(1, PIECE_COUNT)
+        self.previous = shape
+        return shape
+
+
+# 可由名稱選擇的產生器
+GENERATORS = {generator.name: generator for generator in
+              (UniformGenerator, BagGenerator, DoubleBagGenerator, ClassicGenerator)}
+
+
+def makeGenerator(generator, rng):
+    """由名稱（GENERATORS 的鍵）或 PieceGenerator 子類別建立產生器"""
+    if isinstance(generator, str):
+        if generator not in GENERATORS:
+            raise ValueError(f'未知的方塊產生器: {generator}')
+        generator = GENERATORS[generator]
+    return generator(rng)
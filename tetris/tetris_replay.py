@@ -0,0 +1,670 @@
+"""遊戲錄影：精簡的二進位格式、錄製與重播
+
+一局遊戲完全由亂數種子、開局狀態、輸入設定與按鍵序列決定，因此錄影只
+需要記錄這些資料。每個事件（按下、放開按鍵，以及用來驗證的方塊出現）
+以「與上一個事件相差的幀數」加上「事件種類與參數」兩個 varint 表示，
+通常每個事件只佔 2 個位元組。
+
+為了能跳到任意位置，每 keyframe_interval 個方塊另外記錄一個關鍵幀（遊戲
+區域、方塊佇列、儲存方塊、分數、級別與按鍵狀態），檔案結尾的索引列出
+各關鍵幀的幀數與位置。跳轉時從目標之前最近的關鍵幀開始重播，最多只需要
+模擬一個關鍵幀間隔，也可以往回跳。
+
+檔案格式：
+    MAGIC、版本 (varint)
+    種子、級別、已消除行數、速度、儲存方塊、是否已交換、鎖定重新計時上限 (varint)
+    預覽方塊數 (varint)、方塊產生器名稱（長度 varint 加 UTF-8，版本 3 起）
+    重力、DAS、ARR、加速下落倍率、鎖定延遲 (5 個 little-endian double)
+    事件：幀差 (varint)、(參數 << 2 | 種類) (varint)，重複到 EVENT_END
+    結果：分數、消除行數、級別、總幀數 (varint)
+    關鍵幀（版本 2 起）：見 writeKeyframe()，版本 4 起結尾加上狀態雜湊
+    索引：關鍵幀數量，每個關鍵幀的幀差與位置差 (varint)
+    索引的位置 (4 位元組 little-endian)
+
+用法：
+    python tetris_replay.py verify game.trpl   # 無頭重播並核對分數與關鍵幀
+    python tetris_replay.py info game.trpl
+"""
+import argparse
+import bisect
+import json
+import struct
+
+from tetris_engine import TetrisEngine, BitBoard, Piece
+from tetris_input import InputHandler
+from tetris_randomizer import GENERATORS
+
+MAGIC = b'TRPL'
+VERSION = 4
+KEYFRAME_VERSION = 2  # 開始包含關鍵幀與索引的版本
+GENERATOR_VERSION = 3  # 開始記錄方塊產生器與預覽方塊數的版本
+HASH_VERSION = 4  # 關鍵幀開始記錄狀態雜湊的版本
+
+DEFAULT_KEYFRAME_INTERVAL = 20  # 每隔多少個方塊記錄一個關鍵幀
+
+# 事件種類（放在第二個 varint 的最低 2 位元）
+EVENT_PRESS = 0
+EVENT_RELEASE = 1
+EVENT_SPAWN = 2
+EVENT_END = 3
+
+_SETTINGS = struct.Struct('<5d')
+_KEYFRAME_TIMERS = struct.Struct('<5d')
+_STATE_HASH = struct.Struct('<Q')
+_INDEX_OFFSET = struct.Struct('<I')
+_CELL_BITS = 3  # 遊戲區域每格的形狀編號 (0-7)
+
+
+class ReplayError(Exception):
+    """錄影檔格式錯誤"""
+
+
+def writeVarint(out, value):
+    """將非負整數以 varint（每位元組 7 位元）附加到 bytearray"""
+    if value < 0:
+        raise ValueError(f'varint 不能是負數: {value}')
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def readVarint(data, pos):
+    """從 data 的 pos 讀取一個 varint，回傳 (數值, 下一個位置)"""
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ReplayError('錄影檔意外結束')
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def writeSignedVarint(out, value):
+    """以 zigzag 編碼寫入可能為負數的整數（例如方塊的 x 座標）"""
+    writeVarint(out, value * 2 if value >= 0 else -value * 2 - 1)
+
+
+def readSignedVarint(data, pos):
+    """讀取 writeSignedVarint() 寫入的整數"""
+    value, pos = readVarint(data, pos)
+    return (value >> 1) ^ -(value & 1), pos
+
+
+def writeKeyframe(out, keyframe):
+    """將關鍵幀附加到 bytearray
+
+    依序為事件索引、幀數、已產生的方塊數、分數、級別、消除行數、速度、
+    鎖定重新計時次數、最低位置、當前方塊 (形狀、x、y、旋轉)、儲存方塊、
+    是否已交換、DAS 是否充滿、是否加速下落 (varint)，預覽方塊與按住的方向
+    （數量加內容），遊戲區域（寬度、行數，每行每格 3 位元打包成一個
+    varint），重力、重力累積、鎖定計時、DAS 與 ARR 計時 (5 個 double)，
+    最後是 TetrisEngine.stateHash() (8 位元組 little-endian)。
+    """
+    state = keyframe['engine']
+    handler = keyframe['input']
+    piece = state['curPiece']
+    for value in (keyframe['eventIndex'], state['frame'], state['piecesDrawn'],
+                  state['score'], state['level'], state['linesCleared'], state['speed'],
+                  state['lockResets']):
+        writeVarint(out, value)
+    writeSignedVarint(out, state['lockLowestY'])
+    writeVarint(out, piece.shape)
+    writeSignedVarint(out, piece.x)
+    writeSignedVarint(out, piece.y)
+    for value in (piece.rotation, state['holdShape'], int(state['hasSwapped']),
+                  int(handler['charged']), int(handler['softDropping'])):
+        writeVarint(out, value)
+
+    for values in (state['nextPieces'], handler['heldDirections']):
+        writeVarint(out, len(values))
+        for value in values:
+            writeVarint(out, value)
+
+    cells = state['cells']
+    writeVarint(out, len(cells[0]) if cells else 0)
+    writeVarint(out, len(cells))
+    for row in cells:
+        packed = 0
+        for x, cell in enumerate(row):
+            packed |= cell << (x * _CELL_BITS)
+        writeVarint(out, packed)
+
+    out += _KEYFRAME_TIMERS.pack(state['gravity'], state['gravityAccum'], state['lockTimer'],
+                                 handler['dasTimer'], handler['arrTimer'])
+    out += _STATE_HASH.pack(keyframe['hash'])
+
+
+def readKeyframe(data, pos, version=VERSION):
+    """從 data 的 pos 讀取一個關鍵幀，回傳 (關鍵幀, 下一個位置)
+
+    version 為錄影檔版本，舊版本的關鍵幀沒有狀態雜湊（hash 為 None）。
+    """
+    values = []
+    for _ in range(8):
+        value, pos = readVarint(data, pos)
+        values.append(value)
+    lock_lowest_y, pos = readSignedVarint(data, pos)
+    shape, pos = readVarint(data, pos)
+    x, pos = readSignedVarint(data, pos)
+    y, pos = readSignedVarint(data, pos)
+    flags = []
+    for _ in range(5):
+        value, pos = readVarint(data, pos)
+        flags.append(value)
+
+    lists = []
+    for _ in range(2):
+        count, pos = readVarint(data, pos)
+        items = []
+        for _ in range(count):
+            value, pos = readVarint(data, pos)
+            items.append(value)
+        lists.append(items)
+
+    width, pos = readVarint(data, pos)
+    height, pos = readVarint(data, pos)
+    cell_mask = (1 << _CELL_BITS) - 1
+    cells = []
+    for _ in range(height):
+        packed, pos = readVarint(data, pos)
+        cells.append([(packed >> (x * _CELL_BITS)) & cell_mask for x in range(width)])
+
+    if pos + _KEYFRAME_TIMERS.size > len(data):
+        raise ReplayError('錄影檔意外結束')
+    gravity, gravity_accum, lock_timer, das_timer, arr_timer = _KEYFRAME_TIMERS.unpack_from(data, pos)
+    pos += _KEYFRAME_TIMERS.size
+
+    state_hash = None
+    if version >= HASH_VERSION:
+        if pos + _STATE_HASH.size > len(data):
+            raise ReplayError('錄影檔意外結束')
+        (state_hash,) = _STATE_HASH.unpack_from(data, pos)
+        pos += _STATE_HASH.size
+
+    state = {
+        'frame': values[1],
+        'piecesDrawn': values[2],
+        'score': values[3],
+        'level': values[4],
+        'linesCleared': values[5],
+        'speed': values[6],
+        'gravity': gravity,
+        'gravityAccum': gravity_accum,
+        'lockTimer': lock_timer,
+        'lockResets': values[7],
+        'lockLowestY': lock_lowest_y,
+        'curPiece': Piece(shape, x, y, flags[0]),
+        'nextPieces': lists[0],
+        'holdShape': flags[1],
+        'hasSwapped': bool(flags[2]),
+        'cells': cells,
+    }
+    handler = {
+        'heldDirections': lists[1],
+        'dasTimer': das_timer,
+        'arrTimer': arr_timer,
+        'charged': bool(flags[3]),
+        'softDropping': bool(flags[4]),
+    }
+    keyframe = {'frame': values[1], 'eventIndex': values[0], 'hash': state_hash,
+                'engine': state, 'input': handler}
+    return keyframe, pos
+
+
+class Replay:
+    """一局遊戲的錄影
+
+    header 為開局狀態（seed、level、linesCleared、speed、gravity、
+    holdShape、hasSwapped、generator、previewDepth），settings 為
+    InputHandler 設定（das、arr、softDropFactor、lockDelay、lockResets），
+    events 為 (幀, 種類, 參數) 列表，result 為結束時的 score、lines、level、frames。keyframes 為依幀數
+    排序的關鍵幀，每個包含 frame、eventIndex（此時已套用的事件數）、
+    hash（TetrisEngine.stateHash()，舊版本為 None）、engine
+    （TetrisEngine.snapshot()）與 input（InputHandler.snapshot()）。
+    """
+
+    def __init__(self, header, settings, events=None, result=None, keyframes=None):
+        self.header = header
+        self.settings = settings
+        self.events = events if events is not None else []
+        self.result = result
+        self.keyframes = keyframes if keyframes is not None else []
+
+    def toBytes(self):
+        """編碼成二進位格式"""
+        header = self.header
+        settings = self.settings
+        out = bytearray(MAGIC)
+        writeVarint(out, VERSION)
+        for value in (header['seed'], header['level'], header['linesCleared'],
+                      header['speed'], header['holdShape'], int(header['hasSwapped']),
+                      settings['lockResets'], header['previewDepth']):
+            writeVarint(out, value)
+        name = header['generator'].encode('utf-8')
+        writeVarint(out, len(name))
+        out += name
+        out += _SETTINGS.pack(header['gravity'], settings['das'], settings['arr'],
+                              settings['softDropFactor'], settings['lockDelay'])
+
+        last_frame = 0
+        for frame, kind, value in self.events:
+            writeVarint(out, frame - last_frame)
+            writeVarint(out, (value << 2) | kind)
+            last_frame = frame
+
+        result = self.result or {'score': 0, 'lines': 0, 'level': 0, 'frames': last_frame}
+        writeVarint(out, result['frames'] - last_frame)
+        writeVarint(out, EVENT_END)
+        for key in ('score', 'lines', 'level', 'frames'):
+            writeVarint(out, result[key])
+
+        offsets = []
+        for keyframe in self.keyframes:
+            offsets.append(len(out))
+            writeKeyframe(out, keyframe)
+
+        index_offset = len(out)
+        writeVarint(out, len(offsets))
+        last_frame = last_offset = 0
+        for keyframe, offset in zip(self.keyframes, offsets):
+            writeVarint(out, keyframe['frame'] - last_frame)
+            writeVarint(out, offset - last_offset)
+            last_frame, last_offset = keyframe['frame'], offset
+        out += _INDEX_OFFSET.pack(index_offset)
+        return bytes(out)
+
+    @classmethod
+    def fromBytes(cls, data):
+        """從二進位格式解碼"""
+        if data[:len(MAGIC)] != MAGIC:
+            raise ReplayError('不是錄影檔')
+        pos = len(MAGIC)
+        version, pos = readVarint(data, pos)
+        if not 1 <= version <= VERSION:
+            raise ReplayError(f'不支援的錄影檔版本: {version}')
+
+        values = []
+        for _ in range(7):
+            value, pos = readVarint(data, pos)
+            values.append(value)
+
+        # 舊版本固定使用均勻隨機與 3 個預覽方塊
+        preview_depth, generator = 3, 'uniform'
+        if version >= GENERATOR_VERSION:
+            preview_depth, pos = readVarint(data, pos)
+            length, pos = readVarint(data, pos)
+            generator = bytes(data[pos:pos + length]).decode('utf-8')
+            pos += length
+            if generator not in GENERATORS:
+                raise ReplayError(f'未知的方塊產生器: {generator}')
+
+        if pos + _SETTINGS.size > len(data):
+            raise ReplayError('錄影檔意外結束')
+        gravity, das, arr, soft_drop_factor, lock_delay = _SETTINGS.unpack_from(data, pos)
+        pos += _SETTINGS.size
+
+        header = {
+            'seed': values[0],
+            'level': values[1],
+            'linesCleared': values[2],
+            'speed': values[3],
+            'holdShape': values[4],
+            'hasSwapped': bool(values[5]),
+            'gravity': gravity,
+            'generator': generator,
+            'previewDepth': preview_depth,
+        }
+        settings = {
+            'das': das,
+            'arr': arr,
+            'softDropFactor': soft_drop_factor,
+            'lockDelay': lock_delay,
+            'lockResets': values[6],
+        }
+
+        events = []
+        frame = 0
+        while True:
+            delta, pos = readVarint(data, pos)
+            code, pos = readVarint(data, pos)
+            frame += delta
+            kind = code & 3
+            if kind == EVENT_END:
+                break
+            events.append((frame, kind, code >> 2))
+
+        result = {}
+        for key in ('score', 'lines', 'level', 'frames'):
+            result[key], pos = readVarint(data, pos)
+
+        keyframes = []
+        if version >= KEYFRAME_VERSION:
+            for offset in cls.readIndex(data):
+                keyframe, _ = readKeyframe(data, offset, version)
+                keyframes.append(keyframe)
+        return cls(header, settings, events, result, keyframes)
+
+    @staticmethod
+    def readIndex(data):
+        """讀取檔案結尾的關鍵幀索引，回傳各關鍵幀的位置"""
+        if len(data) < _INDEX_OFFSET.size:
+            raise ReplayError('錄影檔意外結束')
+        (pos,) = _INDEX_OFFSET.unpack_from(data, len(data) - _INDEX_OFFSET.size)
+        count, pos = readVarint(data, pos)
+        offsets = []
+        offset = 0
+        for _ in range(count):
+            _, pos = readVarint(data, pos)
+            delta, pos = readVarint(data, pos)
+            offset += delta
+            offsets.append(offset)
+        return offsets
+
+    def save(self, path):
+        """寫入錄影檔"""
+        with open(path, 'wb') as f:
+            f.write(self.toBytes())
+
+    @classmethod
+    def load(cls, path):
+        """讀取錄影檔"""
+        with open(path, 'rb') as f:
+            return cls.fromBytes(f.read())
+
+    def spawns(self):
+        """錄影中依序出現的方塊"""
+        return [value for _, kind, value in self.events if kind == EVENT_SPAWN]
+
+
+class ReplayRecorder:
+    """錄製引擎的一局遊戲
+
+    必須在 engine.start() 之前建立（記錄開局狀態與種子），每局遊戲使用
+    一個新的錄製器；遊戲結束或中止時呼叫 finish() 取得 Replay。每出現
+    keyframe_interval 個方塊，在下一個幀的邊界記錄一個關鍵幀。
+    """
+
+    def __init__(self, engine, handler, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL):
+        if not isinstance(engine.seed, int) or engine.seed < 0:
+            raise ValueError('錄影需要非負整數的種子')
+        if GENERATORS.get(engine.generator.name) is not type(engine.generator):
+            raise ValueError('錄影需要已登錄在 GENERATORS 的方塊產生器')
+
+        self.engine = engine
+        self.handler = handler
+        self.keyframeInterval = max(1, keyframe_interval)
+        self.pieces = 0
+        self.keyframeDue = False
+        header = {
+            'seed': engine.seed,
+            'level': engine.level,
+            'linesCleared': engine.linesCleared,
+            'speed': engine.speed,
+            'gravity': engine.gravity,
+            'holdShape': engine.holdPiece.shape,
+            'hasSwapped': engine.hasSwapped,
+            'generator': engine.generator.name,
+            'previewDepth': engine.previewDepth,
+        }
+        settings = {
+            'das': handler.das,
+            'arr': handler.arr,
+            'softDropFactor': handler.softDropFactor,
+            'lockDelay': engine.lockDelay,
+            'lockResets': engine.maxLockResets,
+        }
+        self.replay = Replay(header, settings)
+
+        self.callbacks = {
+            'inputPressed': lambda action: self.record(EVENT_PRESS, action),
+            'inputReleased': lambda action: self.record(EVENT_RELEASE, action),
+            'pieceSpawned': self.onSpawn,
+            'frameStarted': self.onFrameStarted,
+        }
+        for event, callback in self.callbacks.items():
+            engine.connect(event, callback)
+
+    def record(self, kind, value):
+        """記錄一個事件（時間為引擎目前的幀數）"""
+        self.replay.events.append((self.engine.frameCount, kind, value))
+
+    def onSpawn(self, shape):
+        """記錄出現的方塊，每 keyframeInterval 個方塊排定一個關鍵幀"""
+        self.record(EVENT_SPAWN, shape)
+        self.pieces += 1
+        if self.pieces % self.keyframeInterval == 0:
+            self.keyframeDue = True
+
+    def onFrameStarted(self):
+        """在幀的邊界（上一幀的事件都已記錄）記錄排定的關鍵幀"""
+        if not self.keyframeDue or not self.engine.isStarted:
+            return
+        self.keyframeDue = False
+        self.replay.keyframes.append({
+            'frame': self.engine.frameCount,
+            'eventIndex': len(self.replay.events),
+            'hash': self.engine.stateHash(),
+            'engine': self.engine.snapshot(),
+            'input': self.handler.snapshot(),
+        })
+
+    def finish(self):
+        """停止錄製並回傳錄影"""
+        engine = self.engine
+        for event, callback in self.callbacks.items():
+            engine.disconnect(event, callback)
+
+        self.replay.result = {
+            'score': engine.score,
+            'lines': engine.linesCleared,
+            'level': engine.level,
+            'frames': engine.frameCount,
+        }
+        return self.replay
+
+
+class ReplayPlayer:
+    """以錄影驅動引擎重播一局遊戲
+
+    engine 與 handler 省略時建立無頭的 BitBoard 引擎；傳入 TetrisBoard 的
+    引擎即可在視窗中重播。每次 frame() 推進一幀並套用這一幀的按鍵事件，
+    重播中出現的方塊與錄影不符時 mismatch 會記錄第一個不符的位置；到達
+    關鍵幀的幀時比對狀態雜湊，不符時 divergence 記錄第一個分歧的幀。
+    seek() 可以跳到任意幀（包含往回跳）。重播時改用錄影的方塊產生器與
+    預覽方塊數，close() 後恢復引擎原本的設定。
+    """
+
+    def __init__(self, replay, engine=None, handler=None):
+        self.replay = replay
+        self.engine = engine or TetrisEngine(board_class=BitBoard)
+        settings = replay.settings
+        self.handler = handler or InputHandler(self.engine)
+        self.handler.das = settings['das']
+        self.handler.arr = settings['arr']
+        self.handler.softDropFactor = settings['softDropFactor']
+        self.engine.setLockDelay(settings['lockDelay'], settings['lockResets'])
+        self.previousGenerator = (self.engine.generator, self.engine.previewDepth)
+
+        self.expectedSpawns = replay.spawns()
+        self.keyframeFrames = [keyframe['frame'] for keyframe in replay.keyframes]
+        self.keyframeHashes = {keyframe['frame']: keyframe['hash'] for keyframe in replay.keyframes
+                               if keyframe['hash'] is not None}
+        self.spawnCount = 0
+        self.mismatch = None
+        self.divergence = None
+        self.eventIndex = 0
+        self.engine.connect('pieceSpawned', self.onSpawn)
+        self.restart()
+
+    def restart(self):
+        """還原開局狀態後以錄影的種子從頭開始"""
+        header = self.replay.header
+        engine = self.engine
+        self.handler.releaseAll()
+        self.spawnCount = 0
+        self.eventIndex = 0
+        engine.level = header['level']
+        engine.linesCleared = header['linesCleared']
+        engine.speed = header['speed']
+        engine.gravity = header['gravity']
+        engine.holdPiece = Piece.spawn(header['holdShape'])
+        engine.hasSwapped = header['hasSwapped']
+        engine.setGenerator(header['generator'])
+        engine.previewDepth = header['previewDepth']
+        engine.emit('levelChanged', engine.level)
+        engine.emit('holdPieceChanged', engine.holdPiece)
+        engine.reseed(header['seed'])
+        engine.start()
+        self.applyEvents()
+
+    def restoreKeyframe(self, keyframe):
+        """從關鍵幀繼續重播"""
+        self.engine.restore(keyframe['engine'])
+        self.handler.restore(keyframe['input'])
+        self.eventIndex = keyframe['eventIndex']
+        self.spawnCount = sum(1 for _, kind, _ in self.replay.events[:self.eventIndex]
+                              if kind == EVENT_SPAWN)
+
+    def seek(self, frame):
+        """跳到指定的幀：從之前最近的關鍵幀（或開頭）重播到該幀"""
+        engine = self.engine
+        index = bisect.bisect_right(self.keyframeFrames, frame) - 1
+        keyframe = self.replay.keyframes[index] if index >= 0 else None
+
+        if frame < engine.frameCount or (keyframe is not None
+                                         and keyframe['frame'] > engine.frameCount):
+            if keyframe is not None:
+                self.restoreKeyframe(keyframe)
+            else:
+                self.restart()
+
+        while engine.frameCount < frame and not self.finished:
+            self.frame()
+
+    def onSpawn(self, shape):
+        """核對出現的方塊與錄影是否一致"""
+        index = self.spawnCount
+        self.spawnCount += 1
+        if self.mismatch is None and (index >= len(self.expectedSpawns)
+                                      or self.expectedSpawns[index] != shape):
+            self.mismatch = (self.engine.frameCount, index)
+
+    def applyEvents(self):
+        """套用目前這一幀的所有按鍵事件"""
+        events = self.replay.events
+        frame = self.engine.frameCount
+        handler = self.handler
+        while self.eventIndex < len(events) and events[self.eventIndex][0] <= frame:
+            _, kind, value = events[self.eventIndex]
+            self.eventIndex += 1
+            if kind == EVENT_PRESS:
+                handler.press(value)
+            elif kind == EVENT_RELEASE:
+                handler.release(value)
+
+    @property
+    def finished(self):
+        """遊戲已結束或已播放到錄影的最後一幀"""
+        result = self.replay.result
+        return (not self.engine.isStarted
+                or (result is not None and self.engine.frameCount >= result['frames']))
+
+    def frame(self):
+        """推進一幀，回傳遊戲狀態是否改變"""
+        if self.finished:
+            return False
+        self.checkHash()
+        changed = self.handler.frame()
+        self.applyEvents()
+        return changed
+
+    def checkHash(self):
+        """在幀的邊界（與錄製關鍵幀時相同）比對狀態雜湊"""
+        frame = self.engine.frameCount
+        expected = self.keyframeHashes.get(frame)
+        if (expected is not None and self.divergence is None
+                and self.engine.stateHash() != expected):
+            self.divergence = frame
+
+    def run(self):
+        """播放到結束"""
+        while not self.finished:
+            self.frame()
+
+    def close(self):
+        """停止重播、取消註冊引擎事件並恢復原本的方塊產生器"""
+        self.engine.disconnect('pieceSpawned', self.onSpawn)
+        self.engine.generator, self.engine.previewDepth = self.previousGenerator
+
+
+def verifyReplay(replay):
+    """無頭重播整局遊戲，回傳重播結果與錄影結果（包含各關鍵幀）是否一致"""
+    player = ReplayPlayer(replay)
+    engine = player.engine
+    keyframes = replay.keyframes
+    bad_keyframes = []
+    index = 0
+    while True:
+        # 與錄製時相同，在幀的邊界比對關鍵幀
+        while index < len(keyframes) and keyframes[index]['frame'] <= engine.frameCount:
+            keyframe = keyframes[index]
+            if (keyframe['frame'] != engine.frameCount
+                    or keyframe['eventIndex'] != player.eventIndex
+                    or keyframe['engine'] != engine.snapshot()
+                    or keyframe['input'] != player.handler.snapshot()):
+                bad_keyframes.append(keyframe['frame'])
+            index += 1
+        if player.finished:
+            break
+        player.frame()
+    player.close()
+    actual = {
+        'score': engine.score,
+        'lines': engine.linesCleared,
+        'level': engine.level,
+        'frames': engine.frameCount,
+    }
+    bad_keyframes.extend(keyframe['frame'] for keyframe in keyframes[index:])
+    return {
+        'ok': (player.mismatch is None and player.divergence is None
+               and actual == replay.result and not bad_keyframes),
+        'expected': replay.result,
+        'actual': actual,
+        'spawnMismatch': player.mismatch,
+        'divergence': player.divergence,
+        'badKeyframes': bad_keyframes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='俄羅斯方塊錄影工具')
+    parser.add_argument('command', choices=['verify', 'info'], help='verify：重播核對；info：顯示內容')
+    parser.add_argument('path', help='錄影檔路徑')
+    args = parser.parse_args()
+
+    replay = Replay.load(args.path)
+    if args.command == 'info':
+        info = {
+            'header': replay.header,
+            'settings': replay.settings,
+            'events': len(replay.events),
+            'pieces': len(replay.spawns()),
+            'keyframes': [keyframe['frame'] for keyframe in replay.keyframes],
+            'result': replay.result,
+        }
+        print(json.dumps(info, ensure_ascii=False, indent=2))
+        return
+
+    report = verifyReplay(replay)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if not report['ok']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""多行程自我對弈執行器
+
+把大量遊戲分散到 ProcessPoolExecutor 的多個行程中以無頭模式執行，每局
+遊戲使用自己的種子，因此相同的種子列表一定得到完全相同的結果，與行程數
+和執行順序無關。
+
+用法：
+    python tetris_selfplay.py --games 1000 --workers 8
+    python tetris_selfplay.py --games 100 --policy ai
+    python tetris_selfplay.py --games 100 --policy ai --generator 7bag
+"""
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from tetris_engine import (TetrisEngine, BitBoard, ACTION_LEFT, ACTION_RIGHT,
+                           ACTION_ROTATE_CW, ACTION_DROP)
+from tetris_ai import aiPolicy
+from tetris_randomizer import GENERATORS
+
+# 每局遊戲預設最多放置的方塊數，避免策略太好時永遠不結束
+DEFAULT_MAX_PIECES = 1000
+
+
+def randomPolicy(engine, rng):
+    """隨機策略：隨機旋轉並左右移動後直接落下"""
+    actions = [ACTION_ROTATE_CW] * rng.randint(0, 3)
+    shift = rng.randint(-5, 5)
+    actions += [ACTION_LEFT if shift < 0 else ACTION_RIGHT] * abs(shift)
+    actions.append(ACTION_DROP)
+    return actions
+
+
+# 可由命令列選擇的策略
+POLICIES = {
+    'random': randomPolicy,
+    'ai': aiPolicy,
+}
+
+
+def playGame(seed, policy=None, max_pieces=DEFAULT_MAX_PIECES, generator='uniform'):
+    """以指定種子進行一局無頭遊戲並回傳統計數據
+
+    policy(engine, rng) 每個方塊呼叫一次並回傳動作列表；若動作執行完後
+    方塊仍未固定，會自動直接落下。策略使用的 rng 也由 seed 決定。
+    generator 為方塊產生器的名稱。
+    """
+    policy = policy or randomPolicy
+    engine = TetrisEngine(board_class=BitBoard, seed=seed, generator=generator)
+    rng = random.Random(f'policy:{seed}')
+
+    locked = [0]
+    engine.connect('pieceLocked', lambda: locked.__setitem__(0, locked[0] + 1))
+    engine.start()
+
+    while engine.isStarted and locked[0] < max_pieces:
+        before = locked[0]
+        for action in policy(engine, rng):
+            engine.step(action)
+            if not engine.isStarted:
+                break
+        if engine.isStarted and locked[0] == before:
+            engine.step(ACTION_DROP)
+
+    return {
+        'seed': seed,
+        'score': engine.score,
+        'lines': engine.linesCleared,
+        'level': engine.level,
+        'pieces': locked[0],
+        'topOut': not engine.isStarted,
+    }
+
+
+def _playChunk(args):
+    """在工作行程中執行一組種子（減少行程間通訊次數）"""
+    seeds, policy, max_pieces, generator = args
+    return [playGame(seed, policy, max_pieces, generator) for seed in seeds]
+
+
+def runSelfPlay(seeds, policy=None, max_pieces=DEFAULT_MAX_PIECES,
+                workers=None, chunksize=None, generator='uniform'):
+    """將遊戲分散到多個行程執行，回傳與 seeds 順序相同的結果列表
+
+    policy 必須是模組層級的函式，才能傳送到其他行程。workers 為 1 時
+    直接在目前行程執行。
+    """
+    seeds = list(seeds)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(seeds) <= 1:
+        return [playGame(seed, policy, max_pieces, generator) for seed in seeds]
+
+    # 每個工作行程大約分到 4 個區塊，兼顧負載平衡與通訊成本
+    chunksize = chunksize or max(1, len(seeds) // (workers * 4))
+    chunks = [(seeds[i:i + chunksize], policy, max_pieces, generator)
+              for i in range(0, len(seeds), chunksize)]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_results in executor.map(_playChunk, chunks):
+            results.extend(chunk_results)
+    return results
+
+
+def summarize(results):
+    """彙整多局遊戲的分數、消除行數與級別統計"""
+    summary = {'games': len(results)}
+    if not results:
+        return summary
+
+    for key in ('score', 'lines', 'level', 'pieces'):
+        values = [result[key] for result in results]
+        summary[key] = {
+            'mean': sum(values) / len(values),
+            'min': min(values),
+            'max': max(values),
+        }
+    summary['topOuts'] = sum(1 for result in results if result['topOut'])
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='俄羅斯方塊多行程自我對弈')
+    parser.add_argument('--games', type=int, default=100, help='遊戲局數')
+    parser.add_argument('--seed-start', type=int, default=0, help='第一局的種子')
+    parser.add_argument('--workers', type=int, default=None, help='工作行程數（預設為 CPU 核心數）')
+    parser.add_argument('--max-pieces', type=int, default=DEFAULT_MAX_PIECES,
+                        help='每局最多放置的方塊數')
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='random',
+                        help='遊玩策略')
+    parser.add_argument('--generator', choices=sorted(GENERATORS), default='uniform',
+                        help='方塊產生器')
+    parser.add_argument('--output', help='將每局結果寫入 JSON 檔案')
+    args = parser.parse_args()
+
+    seeds = range(args.seed_start, args.seed_start + args.games)
+    start_time = time.perf_counter()
+    results = runSelfPlay(seeds, policy=POLICIES[args.policy],
+                          max_pieces=args.max_pieces, workers=args.workers,
+                          generator=args.generator)
+    elapsed = time.perf_counter() - start_time
+
+    summary = summarize(results)
+    summary['seconds'] = elapsed
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""遊戲記錄的延遲、原子寫入
+
+RecordStore.save() 只記下最新的記錄，等 delay 秒內沒有新的記錄後才在背景
+執行緒寫入檔案：創新高分時幾乎每次消行都會更新記錄，這樣連續的更新只寫
+一次，也不會在 GUI 執行緒上做磁碟 I/O。遊戲結束與關閉視窗時呼叫 flush()
+立即寫入。
+
+寫入時先寫到同一目錄下的暫存檔並 fsync，再以 os.replace() 取代原檔，
+寫到一半當機或斷電時原本的記錄檔仍然完整。每筆記錄有遞增的序號，背景
+與 GUI 執行緒同時寫入時，較舊的記錄不會覆蓋已經寫入的較新記錄。
+
+    records = RecordStore('tetris_record.json')
+    record = records.load() or {}
+    records.save({'high_score': 1200})
+    records.flush()
+"""
+import json
+import os
+import stat
+import tempfile
+import threading
+
+DEFAULT_DELAY = 2.0  # 最後一次 save() 之後多久寫入，秒
+
+# 目前的 umask（只能以設定的方式讀取，在匯入時讀一次，避免與其他執行緒競爭）
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def writeJsonAtomic(path, data):
+    """以暫存檔加 os.replace() 寫入 JSON，失敗時原檔不變並拋出 OSError
+
+    mkstemp() 建立的暫存檔權限為 0600，取代前改成原檔的權限（原檔不存在時
+    依 umask 使用一般新檔案的權限）。
+    """
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path),
+                                     suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class RecordStore:
+    """合併短時間內的多次更新，在背景執行緒以原子方式寫入 JSON 記錄檔"""
+
+    def __init__(self, path, delay=DEFAULT_DELAY):
+        self.path = path
+        self.delay = delay
+        self.pending = None  # 尚未寫入的最新記錄
+        self.sequence = 0  # 最新記錄的序號
+        self.pendingSequence = 0  # pending 的序號
+        self.written = 0  # 已寫入檔案的記錄序號
+        self.timer = None
+        self.lock = threading.Lock()  # 保護 pending、序號與 timer
+        self.writeLock = threading.Lock()  # 同一時間只有一個執行緒寫檔，保護 written
+
+    def load(self):
+        """讀取記錄檔，檔案不存在時回傳 None（其他錯誤直接拋出）"""
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, record):
+        """排程寫入記錄：delay 秒內沒有新的記錄時在背景寫入"""
+        with self.lock:
+            self.sequence += 1
+            self.pending = dict(record)
+            self.pendingSequence = self.sequence
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.delay, self.flushInBackground)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self):
+        """立即寫入尚未寫入的記錄，寫入失敗時保留記錄並拋出 OSError
+
+        取出記錄後才取得寫檔鎖，另一個執行緒可能已經寫入更新的記錄：
+        序號不比已寫入的新時略過。
+        """
+        with self.lock:
+            record = self.pending
+            sequence = self.pendingSequence
+            self.pending = None
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if record is None:
+            return
+
+        try:
+            with self.writeLock:
+                if sequence <= self.written:
+                    return
+                writeJsonAtomic(self.path, record)
+                self.written = sequence
+        except OSError:
+            with self.lock:
+                if self.pending is None:
+                    self.pending = record  # 下次 flush() 再試
+                    self.pendingSequence = sequence
+            raise
+
+    def flushInBackground(self):
+        """計時器到期時在背景執行緒寫入（錯誤只印出，記錄留到下次 flush()）"""
+        try:
+            self.flush()
+        except OSError as e:
+            print(f"保存遊戲記錄時發生錯誤: {e}")
@@ -1,12 +1,26 @@
 import sys
-import random
 import json
 import os
+import platform
+import time
+from itertools import islice
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QFrame, QGridLayout, 
                             QPushButton, QLabel, QDesktopWidget, QVBoxLayout, 
-                            QHBoxLayout, QWidget, QMessageBox)
-from PyQt5.QtCore import Qt, QBasicTimer, pyqtSignal
-from PyQt5.QtGui import QPainter, QColor, QBrush
+                            QHBoxLayout, QWidget, QMessageBox, QShortcut)
+from PyQt5.QtCore import (Qt, QBasicTimer, QElapsedTimer, QRect, pyqtSignal,
+                          QT_VERSION_STR)
+from PyQt5.QtGui import QPainter, QColor, QBrush, QPixmap, QRegion, QKeySequence
+
+from tetris_engine import (TetrisEngine, BitBoard, EMPTY_PIECE, SHAPE_CELLS,
+                           SHAPE_BOUNDS, ACTION_LEFT, ACTION_RIGHT, ACTION_DOWN,
+                           ACTION_ROTATE_CW, ACTION_ROTATE_CCW, ACTION_DROP,
+                           ACTION_HOLD)
+from tetris_ai import TetrisAI
+from tetris_input import InputHandler
+from tetris_replay import Replay, ReplayRecorder, ReplayPlayer, ReplayError
+from tetris_metrics import MetricsRecorder
+from tetris_profiling import Profiler, sinkForPath
+from tetris_storage import RecordStore
 
 # 顏色定義
 COLORS = [
@@ -25,111 +39,123 @@ BACKGROUND_COLOR = QColor(0x121212)  # 更深的背景色
 GRID_LINE_COLOR = QColor(0x303030)  # 網格線顏色
 BORDER_COLOR = QColor(0x4D4D4D)  # 邊界顏色
 
-# 方塊形狀定義
-SHAPES = [
-    [[0, 0, 0, 0],  # 空白
-     [0, 0, 0, 0],
-     [0, 0, 0, 0],
-     [0, 0, 0, 0]],
+# 預覽區（下一個方塊、儲存方塊）的方塊大小
+PREVIEW_SQUARE_SIZE = 18
 
-    [[0, 0, 0, 0],  # Z形方塊
-     [0, 1, 1, 0],
-     [0, 0, 1, 1],
-     [0, 0, 0, 0]],
+# 效能資訊覆蓋層顯示的指標（單位皆為毫秒）
+METRIC_LABELS = (
+    ('paint', '繪製時間'),
+    ('gravityJitter', '重力誤差'),
+    ('keyToPaint', '按鍵延遲'),
+    ('eventLoopLag', '事件迴圈'),
+)
 
-    [[0, 0, 0, 0],  # S形方塊
-     [0, 0, 2, 2],
-     [0, 2, 2, 0],
-     [0, 0, 0, 0]],
 
-    [[0, 0, 0, 0],  # J形方塊
-     [0, 3, 0, 0],
-     [0, 3, 3, 3],
-     [0, 0, 0, 0]],
+def paintBoardTile(painter, shape, size):
+    """在 (0, 0) 繪製遊戲區域的單個方塊"""
+    color = QColor(COLORS[shape])
+    square_width = size - 2
+    square_height = size - 2
+    
+    # 填充方塊主體
+    painter.fillRect(1, 1, square_width, square_height, color)
+    
+    # 繪製高光邊緣（左上）
+    painter.setPen(color.lighter(150))
+    painter.drawLine(0, 0, square_width, 0)
+    painter.drawLine(0, 0, 0, square_height)
+    
+    # 繪製陰影邊緣（右下）
+    painter.setPen(color.darker(150))
+    painter.drawLine(1, square_height, square_width + 1, square_height)
+    painter.drawLine(square_width + 1, square_height, square_width + 1, 0)
+    
+    # 繪製內部陰影效果
+    pen = painter.pen()
+    pen.setColor(color.darker(120))
+    pen.setWidth(1)
+    painter.setPen(pen)
+    painter.drawLine(4, square_height - 4, square_width - 4, square_height - 4)
+    painter.drawLine(square_width - 4, square_height - 4, square_width - 4, 4)
 
-    [[0, 0, 0, 0],  # O形方塊
-     [0, 4, 4, 0],
-     [0, 4, 4, 0],
-     [0, 0, 0, 0]],
 
-    [[0, 0, 0, 0],  # T形方塊
-     [0, 0, 5, 0],
-     [0, 5, 5, 5],
-     [0, 0, 0, 0]],
+def paintGhostTile(painter, shape, size):
+    """在 (0, 0) 繪製幽靈方塊的單個方塊（半透明輪廓）"""
+    color = QColor(COLORS[shape])
+    color.setAlpha(80)  # 設置透明度
+    
+    # 繪製半透明填充
+    painter.fillRect(1, 1, size - 2, size - 2, color)
+    
+    # 繪製輪廓
+    pen = painter.pen()
+    pen.setColor(color.lighter(150))
+    pen.setWidth(1)
+    painter.setPen(pen)
+    painter.drawRect(1, 1, size - 2, size - 2)
 
-    [[0, 0, 0, 0],  # I形方塊
-     [0, 0, 0, 0],
-     [6, 6, 6, 6],
-     [0, 0, 0, 0]],
 
-    [[0, 0, 0, 0],  # L形方塊
-     [0, 0, 0, 7],
-     [0, 7, 7, 7],
-     [0, 0, 0, 0]]
-]
+def paintPreviewTile(painter, shape, size):
+    """在 (0, 0) 繪製預覽區的單個方塊"""
+    color = QColor(COLORS[shape])
+    edge = size - 2
+    
+    painter.fillRect(1, 1, edge, edge, color)
+    
+    painter.setPen(color.lighter())
+    painter.drawLine(0, edge, 0, 0)
+    painter.drawLine(0, 0, edge, 0)
+    
+    painter.setPen(color.darker())
+    painter.drawLine(1, edge, edge, edge)
+    painter.drawLine(edge, edge, edge, 1)
 
-# Super Rotation System (SRS) 牆踢數據
-# 每種方塊的旋轉測試點，除了 O 形方塊
-# 格式: [順時針旋轉測試點, 逆時針旋轉測試點]
-# 每個旋轉測試點包含 5 個可能的位置偏移 (x, y)
-SRS_WALL_KICKS = {
-    # JLSTZ 形方塊的牆踢數據
-    'JLSTZ': [
-        # 0>>1, 1>>2, 2>>3, 3>>0 (順時針旋轉)
-        [
-            [(0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2)],  # 0>>1
-            [(0, 0), (1, 0), (1, 1), (0, -2), (1, -2)],    # 1>>2
-            [(0, 0), (1, 0), (1, -1), (0, 2), (1, 2)],     # 2>>3
-            [(0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2)]  # 3>>0
-        ],
-        # 0>>3, 3>>2, 2>>1, 1>>0 (逆時針旋轉)
-        [
-            [(0, 0), (1, 0), (1, -1), (0, 2), (1, 2)],     # 0>>3
-            [(0, 0), (1, 0), (1, 1), (0, -2), (1, -2)],    # 3>>2
-            [(0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2)],  # 2>>1
-            [(0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2)]  # 1>>0
-        ]
-    ],
-    # I 形方塊的牆踢數據
-    'I': [
-        # 0>>1, 1>>2, 2>>3, 3>>0 (順時針旋轉)
-        [
-            [(0, 0), (-2, 0), (1, 0), (-2, 1), (1, -2)],   # 0>>1
-            [(0, 0), (-1, 0), (2, 0), (-1, -2), (2, 1)],   # 1>>2
-            [(0, 0), (2, 0), (-1, 0), (2, -1), (-1, 2)],   # 2>>3
-            [(0, 0), (1, 0), (-2, 0), (1, 2), (-2, -1)]    # 3>>0
-        ],
-        # 0>>3, 3>>2, 2>>1, 1>>0 (逆時針旋轉)
-        [
-            [(0, 0), (-1, 0), (2, 0), (-1, -2), (2, 1)],   # 0>>3
-            [(0, 0), (2, 0), (-1, 0), (2, -1), (-1, 2)],   # 3>>2
-            [(0, 0), (1, 0), (-2, 0), (1, 2), (-2, -1)],   # 2>>1
-            [(0, 0), (-2, 0), (1, 0), (-2, 1), (1, -2)]    # 1>>0
-        ]
-    ],
-    # O 形方塊不需要牆踢
-    'O': [
-        [[(0, 0)], [(0, 0)], [(0, 0)], [(0, 0)]],
-        [[(0, 0)], [(0, 0)], [(0, 0)], [(0, 0)]]
-    ]
-}
 
-# 方塊類型映射
-SHAPE_TYPES = {
-    1: 'JLSTZ',  # Z
-    2: 'JLSTZ',  # S
-    3: 'JLSTZ',  # J
-    4: 'O',      # O
-    5: 'JLSTZ',  # T
-    6: 'I',      # I
-    7: 'JLSTZ'   # L
-}
+class TileCache:
+    """預先繪製的方塊圖塊快取，三個顯示區域共用
+    
+    以 (樣式, 形狀, 大小, 裝置像素比) 為鍵，每種方塊只繪製一次，
+    之後每一格都只需要一次 drawPixmap。遊戲區域改變大小時呼叫 clear()。
+    """
+    
+    PAINTERS = {
+        'board': paintBoardTile,
+        'ghost': paintGhostTile,
+        'preview': paintPreviewTile,
+    }
+    
+    def __init__(self):
+        self.tiles = {}
+    
+    def clear(self):
+        """清空快取"""
+        self.tiles.clear()
+    
+    def tile(self, style, shape, size, ratio=1.0):
+        """取得方塊圖塊，第一次使用時才繪製"""
+        key = (style, shape, size, ratio)
+        pixmap = self.tiles.get(key)
+        if pixmap is None:
+            # 以實際像素大小繪製，高 DPI 螢幕上也保持清晰
+            pixmap = QPixmap(round(size * ratio), round(size * ratio))
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            self.PAINTERS[style](painter, shape, size)
+            painter.end()
+            self.tiles[key] = pixmap
+        return pixmap
+
+
+# 所有顯示區域共用的方塊圖塊快取
+TILE_CACHE = TileCache()
+
 
 class TetrisBoard(QFrame):
-    """俄羅斯方塊的主遊戲區域"""
+    """俄羅斯方塊的主遊戲區域（包裝 TetrisEngine 並負責繪製）"""
     
     # 發送信號到父視窗，表示需要更新下一個方塊顯示
-    nextPieceSignal = pyqtSignal(list)
+    nextPieceSignal = pyqtSignal(object)  # 引擎的預覽佇列（deque）
     # 發送分數更新信號
     scoreChangedSignal = pyqtSignal(int)
     # 發送遊戲狀態變更信號 (開始/結束)
@@ -137,35 +163,84 @@ class TetrisBoard(QFrame):
     # 發送難度變更信號
     levelChangedSignal = pyqtSignal(int)
     # 發送儲存方塊變更信號
-    holdPieceSignal = pyqtSignal(dict)
+    holdPieceSignal = pyqtSignal(object)  # 儲存的方塊（Piece）
+    
+    BOARD_WIDTH = TetrisEngine.BOARD_WIDTH
+    BOARD_HEIGHT = TetrisEngine.BOARD_HEIGHT  # 上面兩行為緩衝區，不顯示
+    INITIAL_SPEED = TetrisEngine.INITIAL_SPEED  # 初始速度，毫秒
+    AI_INTERVAL = 50  # 自動遊玩時每個方塊的間隔，毫秒
+    PIECE_GENERATOR = '7bag'  # 方塊產生器（見 tetris_randomizer.GENERATORS）
+    DEFAULT_REFRESH_RATE = 60  # 無法取得螢幕更新率時使用，Hz
+    MAX_CATCH_UP_FRAMES = 5  # 每次計時器事件最多補跑的模擬幀數，落後更多時直接丟棄
+    REPLAY_FILE = 'tetris_replay.trpl'  # 最近一局遊戲的錄影
+    MAX_PLAYBACK_SPEED = 64  # 重播的最高倍速
+    SEEK_FRAMES = 300  # 重播時左右鍵每次跳轉的幀數（5 秒）
     
-    BOARD_WIDTH = 10
-    BOARD_HEIGHT = 22  # 上面兩行為緩衝區，不顯示
-    INITIAL_SPEED = 500  # 初始速度，毫秒
+    # 鍵盤按鍵與引擎動作的對應
+    KEY_ACTIONS = {
+        Qt.Key_Left: ACTION_LEFT,
+        Qt.Key_Right: ACTION_RIGHT,
+        Qt.Key_Down: ACTION_DOWN,
+        Qt.Key_Up: ACTION_ROTATE_CW,      # 順時針旋轉
+        Qt.Key_Z: ACTION_ROTATE_CCW,      # 逆時針旋轉
+        Qt.Key_Space: ACTION_DROP,
+        Qt.Key_Shift: ACTION_HOLD,        # 儲存或交換方塊
+    }
     
     def __init__(self, parent):
         super().__init__(parent)
         
         # 初始化所有屬性
+        # timer 以螢幕更新率觸發：推進固定時間步的模擬並重繪（最多每次更新一次）
         self.timer = QBasicTimer()
+        self.frameClock = QElapsedTimer()
+        self.frameLag = 0.0  # 尚未模擬的累積時間，毫秒
+        self.needsRefresh = False
         self.landingTimer = QBasicTimer()
-        self.isStarted = False
         self.isPaused = False
-        self.score = 0
-        self.level = 1
-        self.linesCleared = 0
-        self.board = []
-        self.curPiece = {'shape': 0, 'x': 0, 'y': 0, 'rotation': 0}
-        self.nextPieces = []
         self.board_left = 0
         self.board_top = 0
         self.square_size = 0
-        self.speed = self.INITIAL_SPEED
         self.shakeOffset = 0  # 添加振動偏移屬性
         
-        # 儲存方塊相關屬性
-        self.holdPiece = {'shape': 0, 'rotation': 0}  # 儲存的方塊
-        self.hasSwapped = False  # 是否已經在本次下落中交換過方塊
+        # 快取的繪製圖層：背景（邊界、網格線）與已落下的方塊
+        self.backgroundPixmap = None
+        self.backgroundKey = None
+        self.stackPixmap = None
+        self.stackKey = None
+        
+        # 局部重繪：上次繪製的方塊區域與未振動時的遊戲區域範圍
+        self.paintedRegion = QRegion()
+        self.boardArea = QRect()
+        
+        # 自動遊玩相關屬性
+        self.ai = TetrisAI()
+        self.aiTimer = QBasicTimer()
+        self.aiEnabled = False
+        
+        # 遊戲狀態與規則由引擎負責，使用整數行遮罩的遊戲區域以加速碰撞檢查，
+        # 方塊以 7-bag 產生
+        self.engine = TetrisEngine(board_class=BitBoard, generator=self.PIECE_GENERATOR)
+        self.engine.connect('nextPieceChanged', self.nextPieceSignal.emit)
+        self.engine.connect('scoreChanged', self.scoreChangedSignal.emit)
+        self.engine.connect('statusChanged', self.onStatusChanged)
+        self.engine.connect('levelChanged', self.onLevelChanged)
+        self.engine.connect('holdPieceChanged', self.holdPieceSignal.emit)
+        self.engine.connect('pieceLocked', self.addLandingEffect)
+        
+        # 按鍵的自動重複（DAS/ARR）、加速下落與鎖定延遲由遊戲時鐘驅動
+        self.input = InputHandler(self.engine)
+        
+        # 錄影：每局遊戲都會錄製，結束時寫入 REPLAY_FILE；player 不為 None 時正在重播
+        self.recorder = None
+        self.player = None
+        self.playbackSpeed = 1
+        
+        # 效能指標：TetrisWindow 開啟效能資訊時設定為 MetricsRecorder，None 時不記錄
+        self.metrics = None
+        self.keyPressTime = None  # 尚未繪製的第一個按鍵輸入的時間
+        self.gravityTime = None  # 目前方塊上次重力下落的時間
+        self.gravityPieces = 0  # 上次記錄時引擎已產生的方塊數（判斷是否換了方塊）
         
         # 設定遊戲區域大小
         self.setFrameStyle(QFrame.Panel | QFrame.Sunken)
@@ -177,59 +252,125 @@ class TetrisBoard(QFrame):
             print(f"初始化遊戲區域時發生錯誤: {e}")
             # 在實際應用中，可以顯示錯誤對話框或記錄到日誌
     
+    # 以下屬性直接讀取引擎狀態，方便視窗與繪製程式使用
+    @property
+    def isStarted(self):
+        return self.engine.isStarted
+    
+    @property
+    def isReplaying(self):
+        return self.player is not None
+    
+    @property
+    def score(self):
+        return self.engine.score
+    
+    @property
+    def level(self):
+        return self.engine.level
+    
+    @property
+    def linesCleared(self):
+        return self.engine.linesCleared
+    
+    @property
+    def speed(self):
+        return self.engine.speed
+    
+    @property
+    def board(self):
+        return self.engine.board
+    
+    @property
+    def curPiece(self):
+        return self.engine.curPiece
+    
+    @property
+    def nextPieces(self):
+        return self.engine.nextPieces
+    
+    @property
+    def holdPiece(self):
+        return self.engine.holdPiece
+    
     def initBoard(self):
         """初始化遊戲區域"""
-        self.isStarted = False
         self.isPaused = False
-        self.score = 0
-        self.level = 1
-        self.linesCleared = 0
-        self.speed = self.INITIAL_SPEED
-        
-        self.clearBoard()
-        
-        # 初始化當前和下一個方塊
-        self.curPiece = self.getNewPiece()
-        self.nextPieces = [self.getNewPiece() for _ in range(3)]
-        self.nextPieceSignal.emit(self.nextPieces)
-        
-        # 初始化儲存方塊
-        self.holdPiece = {'shape': 0, 'rotation': 0}
-        self.hasSwapped = False
-        self.holdPieceSignal.emit(self.holdPiece)
-        
-    def clearBoard(self):
-        """清空遊戲區域"""
-        self.board = [[0 for _ in range(self.BOARD_WIDTH)] 
-                      for _ in range(self.BOARD_HEIGHT)]
-    
-    def getNewPiece(self):
-        """生成一個新的隨機方塊"""
-        shape = random.randint(1, 7)
-        return {'shape': shape, 'x': 3, 'y': 0, 'rotation': 0}
+        self.engine.initBoard()
     
     def start(self):
         """開始遊戲"""
-        if self.isPaused:
+        if self.isPaused and self.engine.isStarted:
             self.isPaused = False
-            self.timer.start(self.speed, self)
+            self.startFrameTimer()
             self.statusChangedSignal.emit(True)
             return
         
-        self.isStarted = True
-        self.clearBoard()
-        self.score = 0
-        self.scoreChangedSignal.emit(self.score)
+        self.stopReplay()
+        self.input.releaseAll()
         
-        # 初始化當前和預覽方塊
-        self.curPiece = self.getNewPiece()
-        self.nextPieces = [self.getNewPiece() for _ in range(3)]
-        self.nextPieceSignal.emit(self.nextPieces)
+        # 每局使用新的種子，與按鍵一起錄影即可完整重現這局遊戲
+        self.engine.reseed()
+        self.recorder = ReplayRecorder(self.engine, self.input)
+        self.engine.start()
+        self.startFrameTimer()
+        self.update()
+    
+    def startReplay(self, replay, speed=1):
+        """在遊戲區域中重播錄影（speed 為 1 到 MAX_PLAYBACK_SPEED 倍速）"""
+        self.stopReplay()
+        self.isPaused = False
+        if self.aiEnabled:
+            self.toggleAI()
+        if self.recorder is not None:
+            # 中止的遊戲不保存錄影
+            self.recorder.finish()
+            self.recorder = None
+        
+        self.setPlaybackSpeed(speed)
+        self.player = ReplayPlayer(replay, self.engine, self.input)
+        self.startFrameTimer()
+        self.update()
+    
+    def stopReplay(self):
+        """停止重播（錄影尚未結束時視為遊戲結束）"""
+        if self.player is None:
+            return
+        
+        # 暫停中停止重播時一併解除暫停，下次開始遊戲時才會開新的一局
+        self.isPaused = False
+        if self.engine.isStarted:
+            # 與遊戲結束相同的流程，視窗收到狀態信號時仍可由 isReplaying 判斷這是重播
+            self.engine.isStarted = False
+            self.engine.emit('statusChanged', False)
+        self.player.close()
+        self.player = None
+    
+    def seekReplay(self, frame):
+        """重播時跳到指定的幀（可往回跳，從最近的關鍵幀開始模擬）"""
+        if self.player is None:
+            return
         
-        self.timer.start(self.speed, self)
-        self.statusChangedSignal.emit(True)
+        self.player.seek(max(0, frame))
+        if not self.player.finished and not self.isPaused and not self.timer.isActive():
+            # 播放到結尾後往回跳：重新開始播放
+            self.startFrameTimer()
+        self.needsRefresh = False
         self.update()
     
+    def setPlaybackSpeed(self, speed):
+        """設定重播倍速"""
+        self.playbackSpeed = max(1, min(self.MAX_PLAYBACK_SPEED, int(speed)))
+    
+    def saveReplay(self):
+        """結束錄製並寫入錄影檔"""
+        replay = self.recorder.finish()
+        self.recorder = None
+        try:
+            replay.save(self.REPLAY_FILE)
+        except OSError as e:
+            print(f"保存錄影時發生錯誤: {e}")
+    
     def pause(self):
         """暫停遊戲"""
         if not self.isStarted:
@@ -239,14 +380,114 @@ class TetrisBoard(QFrame):
         
         if self.isPaused:
             self.timer.stop()
+            if not self.isReplaying:
+                self.input.releaseAll()
         else:
-            self.timer.start(self.speed, self)
+            self.startFrameTimer()
         
         self.update()
         self.statusChangedSignal.emit(not self.isPaused)
     
+    def onStatusChanged(self, isStarted):
+        """引擎遊戲狀態變更（開始/結束）"""
+        if not isStarted:
+            # 畫面計時器停止後不會再重繪，直接更新整個遊戲區域
+            self.timer.stop()
+            self.needsRefresh = False
+            self.update()
+            if self.recorder is not None:
+                self.saveReplay()
+        self.statusChangedSignal.emit(isStarted)
+    
+    def onLevelChanged(self, level):
+        """引擎級別變更（重力由引擎依級別調整，計時器不需要重新啟動）"""
+        self.levelChangedSignal.emit(level)
+    
+    def startFrameTimer(self):
+        """以螢幕更新率啟動畫面計時器，並重設模擬時鐘"""
+        screen = QApplication.primaryScreen()
+        rate = screen.refreshRate() if screen else 0
+        interval = max(1, round(1000 / (rate or self.DEFAULT_REFRESH_RATE)))
+        
+        self.frameLag = 0.0
+        self.frameClock.start()
+        self.gravityTime = None  # 暫停或重播期間的時間不計入重力誤差
+        self.timer.start(interval, Qt.PreciseTimer, self)
+    
+    def gameFrame(self):
+        """畫面計時器：依實際經過的時間推進固定時間步的模擬，再重繪一次
+        
+        模擬永遠以引擎的 FRAME_MS 為步長，與計時器間隔、計時器誤差和
+        輸入事件無關；重繪只在狀態改變時進行，且每次畫面更新最多一次。
+        重播時每個時間步推進 playbackSpeed 幀。
+        """
+        self.frameLag += self.frameClock.restart()
+        
+        frames = 0
+        while self.frameLag >= self.engine.FRAME_MS:
+            if frames == self.MAX_CATCH_UP_FRAMES:
+                # 落後太多（例如視窗被拖曳時），丟棄剩餘時間而不是越追越慢
+                self.frameLag = 0.0
+                break
+            self.frameLag -= self.engine.FRAME_MS
+            frames += 1
+            if self.player is not None:
+                self.replayFrames()
+                continue
+            
+            piece = self.curPiece
+            if self.input.frame():
+                self.needsRefresh = True
+                if self.metrics is not None:
+                    self.recordGravity(piece)
+        
+        if self.needsRefresh:
+            self.needsRefresh = False
+            self.refresh()
+    
+    def replayFrames(self):
+        """重播一個時間步（playbackSpeed 幀），播放到結尾時停在最後一幀"""
+        for _ in range(self.playbackSpeed):
+            if self.player.finished:
+                # 保留重播狀態，仍可往回跳或按 Esc 結束
+                self.timer.stop()
+                return
+            if self.player.frame():
+                self.needsRefresh = True
+    
+    def recordGravity(self, piece):
+        """記錄重力下落的計時誤差：同一個方塊兩次下落的實際間隔與 speed 的差距（毫秒）
+        
+        piece 為這一幀之前的方塊。換了新方塊或加速下落時重新開始計時；
+        左右移動與旋轉不算重力下落。
+        """
+        current = self.curPiece
+        pieces = self.engine.piecesDrawn
+        if pieces != self.gravityPieces or self.input.softDropping:
+            self.gravityPieces = pieces
+            self.gravityTime = None
+            return
+        if current.y <= piece.y or current.rotation != piece.rotation:
+            return
+        
+        now = time.perf_counter()
+        if self.gravityTime is not None:
+            expected = self.speed * (current.y - piece.y)
+            self.metrics.record('gravityJitter',
+                                abs((now - self.gravityTime) * 1000 - expected))
+        self.gravityTime = now
+    
+    def recordPaint(self, start):
+        """記錄這次繪製的時間，以及第一個尚未繪製的按鍵輸入到繪製完成的延遲"""
+        now = time.perf_counter()
+        self.metrics.record('paint', (now - start) * 1000)
+        if self.keyPressTime is not None:
+            self.metrics.record('keyToPaint', (now - self.keyPressTime) * 1000)
+            self.keyPressTime = None
+    
     def paintEvent(self, event):
-        """繪製遊戲區域"""
+        """繪製遊戲區域（背景與已落下方塊使用快取的圖層，只有移動中的方塊每次重畫）"""
+        paint_start = time.perf_counter() if self.metrics is not None else None
         painter = QPainter(self)
         rect = self.contentsRect()
         
@@ -261,12 +502,62 @@ class TetrisBoard(QFrame):
         board_left = rect.left() + (rect.width() - board_width) // 2
         board_top = rect.top() + (rect.height() - board_height) // 2
         
+        # 繪製背景、邊界與網格線（靜態圖層）
+        background = self.backgroundLayer(rect, square_size)
+        if self.shakeOffset:
+            # 振動時背景圖層整體平移，露出的部分以背景色填滿
+            painter.save()
+            painter.setClipRect(rect)
+            painter.fillRect(rect, BACKGROUND_COLOR)
+            painter.drawPixmap(rect.left() + self.shakeOffset, rect.top(), background)
+            painter.restore()
+        else:
+            painter.drawPixmap(rect.left(), rect.top(), background)
+        
+        self.boardArea = QRect(board_left, board_top, board_width, board_height)
+        
         # 應用振動偏移
-        if hasattr(self, 'shakeOffset'):
-            board_left += self.shakeOffset
+        board_left += self.shakeOffset
+        
+        # 繪製已落下的方塊（遊戲區域改變時才重新繪製的圖層）
+        painter.drawPixmap(board_left, board_top, self.stackLayer(square_size))
+        
+        # 繪製幽靈方塊（當前方塊落到底部的預覽）
+        if self.isStarted and not self.isPaused and self.curPiece.shape:
+            self.drawGhostPiece(painter, board_left, board_top)
+        
+        # 繪製當前正在下落的方塊
+        if self.curPiece.shape:
+            self.drawPiece(painter, board_left, board_top)
+            
+        # 儲存遊戲區域的位置信息，以便其他方法使用
+        self.board_left = board_left
+        self.board_top = board_top
+        self.paintedRegion = self.pieceRegion()
+        
+        if paint_start is not None:
+            painter.end()
+            self.recordPaint(paint_start)
+    
+    def backgroundLayer(self, rect, square_size):
+        """取得背景、邊界與網格線的圖層，只在大小改變時重新繪製"""
+        ratio = self.devicePixelRatioF()
+        key = (rect.width(), rect.height(), square_size, ratio)
+        if self.backgroundKey == key:
+            return self.backgroundPixmap
+        
+        pixmap = QPixmap(round(rect.width() * ratio), round(rect.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        painter = QPainter(pixmap)
+        
+        # 圖層座標以 contentsRect 左上角為原點
+        board_width = square_size * self.BOARD_WIDTH
+        board_height = square_size * (self.BOARD_HEIGHT - 2)
+        board_left = (rect.width() - board_width) // 2
+        board_top = (rect.height() - board_height) // 2
         
         # 繪製背景
-        painter.fillRect(rect, BACKGROUND_COLOR)
+        painter.fillRect(0, 0, rect.width(), rect.height(), BACKGROUND_COLOR)
         
         # 繪製邊界
         pen = painter.pen()
@@ -293,80 +584,59 @@ class TetrisBoard(QFrame):
             if y >= board_top and y <= board_top + board_height:
                 painter.drawLine(board_left, y, board_left + board_width, y)
         
-        # 繪製已落下的方塊
-        for i in range(self.BOARD_HEIGHT - 2):  # 不繪製上面兩行緩衝區
-            for j in range(self.BOARD_WIDTH):
-                shape = self.board[i + 2][j]
-                
-                if shape == 0:
-                    continue
-                
-                # 繪製方塊
-                self.drawSquare(painter, board_left + j * square_size,
-                              board_top + i * square_size, shape)
+        painter.end()
+        self.backgroundPixmap = pixmap
+        self.backgroundKey = key
+        return pixmap
+    
+    def stackLayer(self, square_size):
+        """取得已落下方塊的圖層，只在遊戲區域內容或大小改變時重新繪製"""
+        ratio = self.devicePixelRatioF()
+        key = (self.board.version, square_size, ratio)
+        if self.stackKey == key:
+            return self.stackPixmap
         
-        # 繪製幽靈方塊（當前方塊落到底部的預覽）
-        if self.isStarted and not self.isPaused and self.curPiece['shape']:
-            self.drawGhostPiece(painter, board_left, board_top)
+        board_width = square_size * self.BOARD_WIDTH
+        board_height = square_size * (self.BOARD_HEIGHT - 2)
+        pixmap = QPixmap(max(1, round(board_width * ratio)), max(1, round(board_height * ratio)))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
         
-        # 繪製當前正在下落的方塊
-        if self.curPiece['shape']:
-            self.drawPiece(painter, board_left, board_top)
-            
-        # 儲存遊戲區域的位置信息，以便其他方法使用
-        self.board_left = board_left
-        self.board_top = board_top
+        for i in range(self.BOARD_HEIGHT - 2):  # 不繪製上面兩行緩衝區
+            row = self.board[i + 2]
+            for j in range(self.BOARD_WIDTH):
+                shape = row[j]
+                if shape:
+                    self.drawSquare(painter, j * square_size, i * square_size, shape)
+        
+        painter.end()
+        self.stackPixmap = pixmap
+        self.stackKey = key
+        return pixmap
+    
+    def resizeEvent(self, event):
+        """遊戲區域大小改變時，舊大小的方塊圖塊不再使用"""
+        TILE_CACHE.clear()
+        super().resizeEvent(event)
     
     def drawPiece(self, painter, x, y):
         """繪製當前下落的方塊"""
-        shape_matrix = self.rotatedShape()
-        
-        for i in range(4):
-            for j in range(4):
-                if shape_matrix[i][j] == 0:
-                    continue
-                
-                # 使用正確的 y 偏移計算
-                row = self.curPiece['y'] + i
-                if row >= 2:  # 只繪製可見區域的方塊（非緩衝區）
-                    self.drawSquare(painter, 
-                                    x + (self.curPiece['x'] + j) * self.squareWidth(),
-                                    y + (row - 2) * self.squareHeight(),
-                                    shape_matrix[i][j])
+        shape = self.curPiece.shape
+        
+        for i, j in SHAPE_CELLS[shape][self.curPiece.rotation]:
+            # 使用正確的 y 偏移計算
+            row = self.curPiece.y + i
+            if row >= 2:  # 只繪製可見區域的方塊（非緩衝區）
+                self.drawSquare(painter, 
+                                x + (self.curPiece.x + j) * self.squareWidth(),
+                                y + (row - 2) * self.squareHeight(),
+                                shape)
     
     def drawSquare(self, painter, x, y, shape):
-        """繪製單個方塊"""
-        color = QColor(COLORS[shape])
-        square_width = self.squareWidth() - 2
-        square_height = self.squareHeight() - 2
-        
-        # 填充方塊主體
-        painter.fillRect(x + 1, y + 1, square_width, square_height, color)
-        
-        # 繪製高光邊緣（左上）
-        painter.setPen(color.lighter(150))
-        painter.drawLine(x, y, x + square_width, y)
-        painter.drawLine(x, y, x, y + square_height)
-        
-        # 繪製陰影邊緣（右下）
-        painter.setPen(color.darker(150))
-        painter.drawLine(x + 1, y + square_height,
-                       x + square_width + 1, y + square_height)
-        painter.drawLine(x + square_width + 1, 
-                       y + square_height,
-                       x + square_width + 1, y)
-                       
-        # 繪製內部陰影效果
-        gradient = color.darker(120)
-        pen = painter.pen()
-        pen.setColor(gradient)
-        pen.setWidth(1)
-        painter.setPen(pen)
-        painter.drawLine(x + 4, y + square_height - 4,
-                      x + square_width - 4, y + square_height - 4)
-        painter.drawLine(x + square_width - 4, 
-                      y + square_height - 4,
-                      x + square_width - 4, y + 4)
+        """繪製單個方塊（使用快取的圖塊）"""
+        painter.drawPixmap(x, y, TILE_CACHE.tile('board', shape, self.squareWidth(),
+                                                 self.devicePixelRatioF()))
     
     def squareWidth(self):
         """計算每個小方塊的寬度"""
@@ -382,199 +652,158 @@ class TetrisBoard(QFrame):
     def timerEvent(self, event):
         """計時器事件，處理方塊下落和振動效果"""
         if event.timerId() == self.timer.timerId():
-            # 主遊戲計時器 - 方塊下落
-            if self.tryMove({'y': self.curPiece['y'] + 1}):
-                pass
-            else:
-                self.pieceDropped()
+            # 畫面計時器 - 推進模擬（方塊下落）並重繪
+            self.gameFrame()
         elif hasattr(self, 'landingTimer') and event.timerId() == self.landingTimer.timerId():
             # 落地振動效果計時器
             self.landingEffectEvent()
+        elif event.timerId() == self.aiTimer.timerId():
+            # 自動遊玩計時器
+            self.aiMove()
         else:
             super().timerEvent(event)
     
     def keyPressEvent(self, event):
         """鍵盤事件處理"""
-        if not self.isStarted or self.curPiece['shape'] == 0:
-            super().keyPressEvent(event)
+        key = event.key()
+        
+        if self.isReplaying:
+            # 重播時不接受遊戲輸入：+/- 調整倍速，左右鍵往回/往前跳，Esc 停止重播
+            if key == Qt.Key_P:
+                self.pause()
+            elif key in (Qt.Key_Plus, Qt.Key_Equal):
+                self.setPlaybackSpeed(self.playbackSpeed * 2)
+            elif key == Qt.Key_Minus:
+                self.setPlaybackSpeed(self.playbackSpeed // 2)
+            elif key == Qt.Key_Left:
+                self.seekReplay(self.engine.frameCount - self.SEEK_FRAMES)
+            elif key == Qt.Key_Right:
+                self.seekReplay(self.engine.frameCount + self.SEEK_FRAMES)
+            elif key == Qt.Key_Escape:
+                self.stopReplay()
             return
         
-        key = event.key()
+        if not self.isStarted or self.curPiece.shape == 0:
+            super().keyPressEvent(event)
+            return
         
         if key == Qt.Key_P:
             self.pause()
             return
         
+        if key == Qt.Key_A:
+            self.toggleAI()
+            return
+        
         if self.isPaused:
             return
         
-        if key == Qt.Key_Left:
-            self.tryMove({'x': self.curPiece['x'] - 1})
-        elif key == Qt.Key_Right:
-            self.tryMove({'x': self.curPiece['x'] + 1})
-        elif key == Qt.Key_Down:
-            self.tryMove({'y': self.curPiece['y'] + 1})
-        elif key == Qt.Key_Up:
-            # 順時針旋轉
-            self.tryMove({'rotation': (self.curPiece['rotation'] + 1) % 4})
-        elif key == Qt.Key_Z:
-            # 逆時針旋轉
-            self.tryMove({'rotation': (self.curPiece['rotation'] + 3) % 4})
-        elif key == Qt.Key_Space:
-            self.dropDown()
-        elif key == Qt.Key_Shift:
-            # 儲存或交換方塊
-            self.swapHoldPiece()
-        else:
+        action = self.KEY_ACTIONS.get(key)
+        if action is None:
             super().keyPressEvent(event)
+            return
+        
+        # 按住時的重複移動由 InputHandler 依遊戲時鐘處理，忽略系統的按鍵重複
+        if event.isAutoRepeat():
+            return
+        
+        # 輸入立即套用到引擎，重繪留到下一次畫面更新
+        if self.input.press(action):
+            self.needsRefresh = True
+            if self.metrics is not None and self.keyPressTime is None:
+                self.keyPressTime = time.perf_counter()
     
-    def rotatedShape(self):
-        """旋轉方塊"""
-        shape_matrix = SHAPES[self.curPiece['shape']]
+    def keyReleaseEvent(self, event):
+        """放開按鍵，停止自動重複或加速下落"""
+        action = self.KEY_ACTIONS.get(event.key())
+        if action is None or event.isAutoRepeat():
+            super().keyReleaseEvent(event)
+            return
         
-        # 根據旋轉次數旋轉方塊
-        for _ in range(self.curPiece['rotation']):
-            shape_matrix = self.rotateMatrix(shape_matrix)
-            
-        return shape_matrix
-    
-    def rotateMatrix(self, matrix):
-        """順時針旋轉矩陣 90 度"""
-        # 創建一個新的旋轉後的矩陣
-        rotated = [[0 for _ in range(4)] for _ in range(4)]
-        
-        # 順時針旋轉矩陣
-        for i in range(4):
-            for j in range(4):
-                rotated[j][3-i] = matrix[i][j]
-                
-        return rotated
-    
-    def tryMove(self, new_pos):
-        """嘗試移動方塊"""
-        new_x = new_pos.get('x', self.curPiece['x'])
-        new_y = new_pos.get('y', self.curPiece['y'])
-        new_rotation = new_pos.get('rotation', self.curPiece['rotation'])
-        
-        # 檢查是否是旋轉操作
-        is_rotation = new_rotation != self.curPiece['rotation']
-        
-        # 保存當前狀態
-        old_x = self.curPiece['x']
-        old_y = self.curPiece['y']
-        old_rotation = self.curPiece['rotation']
-        
-        # 如果是旋轉操作，使用 SRS 系統
-        if is_rotation and self.curPiece['shape'] > 0:
-            # 確定旋轉方向（順時針或逆時針）
-            clockwise = (new_rotation - old_rotation) % 4 == 1 or (old_rotation == 3 and new_rotation == 0)
-            direction = 0 if clockwise else 1
-            
-            # 獲取方塊類型
-            shape_type = SHAPE_TYPES[self.curPiece['shape']]
-            
-            # 獲取對應的牆踢數據
-            kick_data = SRS_WALL_KICKS[shape_type][direction][old_rotation]
-            
-            # 嘗試每個可能的牆踢位置
-            for kick_x, kick_y in kick_data:
-                self.curPiece['x'] = new_x + kick_x
-                self.curPiece['y'] = new_y + kick_y
-                self.curPiece['rotation'] = new_rotation
-                
-                shape_matrix = self.rotatedShape()
-                if self.checkPosition(shape_matrix):
-                    # 找到有效位置，更新並返回
-                    self.update()
-                    return True
-            
-            # 所有牆踢位置都無效，恢復原始狀態
-            self.curPiece['x'] = old_x
-            self.curPiece['y'] = old_y
-            self.curPiece['rotation'] = old_rotation
-            return False
-        else:
-            # 非旋轉操作，直接嘗試移動
-            self.curPiece['x'] = new_x
-            self.curPiece['y'] = new_y
-            self.curPiece['rotation'] = new_rotation
-            
-            shape_matrix = self.rotatedShape()
-            if self.checkPosition(shape_matrix):
-                self.update()
-                return True
-            
-            # 移動無效，恢復原始狀態
-            self.curPiece['x'] = old_x
-            self.curPiece['y'] = old_y
-            self.curPiece['rotation'] = old_rotation
-            return False
-    
-    def checkPosition(self, shape_matrix):
-        """檢查當前位置是否有效"""
-        for i in range(4):
-            for j in range(4):
-                if shape_matrix[i][j] == 0:
-                    continue
-                
-                x = self.curPiece['x'] + j
-                y = self.curPiece['y'] + i
-                
-                if x < 0 or x >= self.BOARD_WIDTH or y >= self.BOARD_HEIGHT:
-                    return False
-                
-                if y < 0:
-                    continue
-                
-                if self.board[y][x] != 0:
-                    return False
-        
-        return True
-    
-    def dropDown(self):
-        """方塊直接落到底部"""
-        drop_height = 0
-        
-        while self.tryMove({'y': self.curPiece['y'] + 1}):
-            drop_height += 1
-        
-        self.pieceDropped()
-    
-    def pieceDropped(self):
-        """方塊落到底部後，在底部固定並生成新方塊"""
-        # 將當前方塊的形狀添加到遊戲區域
-        shape_matrix = self.rotatedShape()
-        
-        for i in range(4):
-            for j in range(4):
-                if shape_matrix[i][j] == 0:
-                    continue
-                
-                x = self.curPiece['x'] + j
-                y = self.curPiece['y'] + i
-                
-                if y < 0:
-                    continue
-                
-                self.board[y][x] = shape_matrix[i][j]
-        
-        # 添加方塊落地振動效果
-        self.addLandingEffect()
-        
-        # 移除完整的行
-        has_full_lines = self.removeFullLines()
-        
-        # 生成新方塊
-        if not self.newPiece():
-            self.timer.stop()
-            self.isStarted = False
-            self.statusChangedSignal.emit(False)
+        if self.isReplaying:
+            return
+        
+        self.input.release(action)
+    
+    def focusOutEvent(self, event):
+        """失去焦點時放開所有按鍵，避免按鍵卡住"""
+        if not self.isReplaying:
+            self.input.releaseAll()
+        super().focusOutEvent(event)
+    
+    def toggleAI(self):
+        """切換自動遊玩"""
+        self.aiEnabled = not self.aiEnabled
+        
+        if self.aiEnabled:
+            self.aiTimer.start(self.AI_INTERVAL, self)
         else:
-            # 重置交換標誌，允許在新方塊下落時再次交換
-            self.hasSwapped = False
-            
-        # 確保遊戲區域更新
-        self.update()
+            self.aiTimer.stop()
+    
+    def aiMove(self):
+        """由自動玩家放置當前方塊"""
+        if not self.isStarted or self.isPaused or self.isReplaying:
+            return
+        
+        # 經由 InputHandler 輸入，自動遊玩的動作也會被錄影
+        for action in self.ai.bestMove(self.engine):
+            self.input.tap(action)
+        self.needsRefresh = True
+    
+    def rotatedShape(self):
+        """取得當前方塊旋轉後的形狀"""
+        return self.engine.rotatedShape()
+    
+    def tryMove(self, piece):
+        """嘗試把當前方塊移到 piece（見 TetrisEngine.tryMove）"""
+        if self.engine.tryMove(piece):
+            self.refresh()
+            return True
+        return False
+    
+    def cellRect(self, row, col):
+        """遊戲區域中 (row, col) 格在元件上的矩形（使用上次繪製時的位置）"""
+        size = self.square_size
+        return QRect(self.board_left + col * size, self.board_top + (row - 2) * size,
+                     size, size)
+    
+    def pieceRegion(self):
+        """當前方塊與幽靈方塊在元件上佔用的區域"""
+        region = QRegion()
+        piece = self.curPiece
+        if not piece.shape or not self.square_size:
+            return region
+        
+        rows = [piece.y]
+        if self.isStarted and not self.isPaused:
+            rows.append(self.engine.ghostY())
+        
+        for top in rows:
+            for i, j in SHAPE_CELLS[piece.shape][piece.rotation]:
+                if top + i >= 2:  # 緩衝區不顯示
+                    region = region.united(self.cellRect(top + i, piece.x + j))
+        return region
+    
+    def refresh(self):
+        """重繪這次事件中改變的區域（每個事件只呼叫一次 update）
+        
+        一般移動只重繪上次繪製的方塊與幽靈方塊，加上目前的方塊與幽靈方塊。
+        方塊固定（包括消行）時會開始落地振動，整個遊戲區域都會移動，
+        因此還沒有繪製過或正在振動時重繪整個遊戲區域（不含周圍的空白）。
+        """
+        if not self.square_size or self.shakeOffset or self.landingTimer.isActive():
+            self.update(self.shakeRect())
+            return
+        
+        region = self.paintedRegion.united(self.pieceRegion())
+        if not region.isEmpty():
+            self.update(region)
+    
+    def shakeRect(self):
+        """振動時需要重繪的範圍：遊戲區域加上邊界與振動幅度"""
+        if self.boardArea.isEmpty():
+            return self.contentsRect()
+        return self.boardArea.adjusted(-4, -2, 4, 2)
     
     def addLandingEffect(self):
         """添加方塊落地時的振動效果"""
@@ -587,211 +816,35 @@ class TetrisBoard(QFrame):
         self.landingTimer = QBasicTimer()
         self.landingTimer.start(30, self)  # 30毫秒更新一次
         
-    def removeFullLines(self):
-        """直接移除已填滿的行，不使用閃爍效果"""
-        full_lines = []
-        
-        # 從底部向上檢查每一行，找出需要消除的行
-        for i in range(self.BOARD_HEIGHT - 1, -1, -1):
-            line_is_full = True
-            
-            for j in range(self.BOARD_WIDTH):
-                if self.board[i][j] == 0:
-                    line_is_full = False
-                    break
-            
-            if line_is_full:
-                full_lines.append(i)
-        
-        if full_lines:
-            # 直接移除行，不使用閃爍效果
-            self.doRemoveLines(full_lines)
-            # 強制更新顯示
-            self.update()
-            return True
-        else:
-            # 沒有滿行，繼續遊戲
-            return False
-    
-    def doRemoveLines(self, full_lines=None):
-        """實際移除已填滿的行"""
-        if full_lines is None or not full_lines:
-            return
-            
-        num_full_lines = len(full_lines)
-        
-        # 確保行索引是從大到小排序的（從底部到頂部）
-        full_lines.sort(reverse=True)
-        
-        # 創建一個新的遊戲區域，不包含滿行
-        new_board = [[0 for _ in range(self.BOARD_WIDTH)] for _ in range(self.BOARD_HEIGHT)]
-        
-        # 從底部開始，將非滿行複製到新的遊戲區域
-        new_row = self.BOARD_HEIGHT - 1
-        for old_row in range(self.BOARD_HEIGHT - 1, -1, -1):
-            if old_row in full_lines:
-                continue  # 跳過滿行
-            
-            # 複製這一行到新的遊戲區域
-            for j in range(self.BOARD_WIDTH):
-                new_board[new_row][j] = self.board[old_row][j]
-            
-            new_row -= 1
-        
-        # 更新遊戲區域
-        self.board = new_board
-        
-        # 計算得分：1行=100，2行=300，3行=600，4行=1000
-        scores = [0, 100, 300, 600, 1000]
-        self.score += scores[min(num_full_lines, 4)]
-        self.scoreChangedSignal.emit(self.score)
-        
-        # 更新消除的行數並檢查是否需要提高難度
-        self.linesCleared += num_full_lines
-        self.checkLevel()
-        
-        # 再次檢查是否還有滿行（以防有些行沒被正確識別）
-        for i in range(self.BOARD_HEIGHT - 1, -1, -1):
-            line_is_full = True
-            for j in range(self.BOARD_WIDTH):
-                if self.board[i][j] == 0:
-                    line_is_full = False
-                    break
-            
-            if line_is_full:
-                # 如果還有滿行，遞迴調用自己
-                print(f"發現額外的滿行: {i}，再次移除")
-                self.removeFullLines()
-                break
-        
-        # 強制重新繪製整個遊戲區域
-        self.update()
-    
-    def checkLevel(self):
-        """檢查並更新遊戲難度級別"""
-        # 每消除10行提高一個級別，最高10級
-        new_level = min(10, 1 + self.linesCleared // 10)
-        
-        if new_level > self.level:
-            self.level = new_level
-            # 隨著級別提高，速度增加（速度值減小）
-            self.speed = max(100, self.INITIAL_SPEED - (self.level - 1) * 50)
-            
-            # 如果遊戲正在進行，更新計時器速度
-            if self.isStarted and not self.isPaused:
-                self.timer.stop()
-                self.timer.start(self.speed, self)
-            
-            # 發送級別變更信號
-            self.levelChangedSignal.emit(self.level)
-    
     def drawGhostPiece(self, painter, x, y):
         """繪製幽靈方塊（預覽方塊落到底部的位置）"""
-        # 保存當前方塊位置
-        cur_x = self.curPiece['x']
-        cur_y = self.curPiece['y']
-        cur_shape = self.curPiece['shape']
-        cur_rotation = self.curPiece['rotation']
-        
-        # 獲取當前旋轉後的方塊形狀
-        shape_matrix = self.rotatedShape()
+        cur_x = self.curPiece.x
+        cur_y = self.curPiece.y
+        shape = self.curPiece.shape
         
         # 計算幽靈方塊位置（方塊直接落到底部的位置）
-        ghost_y = cur_y
-        
-        # 使用更高效的方法計算幽靈方塊位置
-        while True:
-            ghost_y += 1
-            valid = True
-            
-            # 直接檢查位置有效性，不修改當前方塊狀態
-            for i in range(4):
-                for j in range(4):
-                    if shape_matrix[i][j] == 0:
-                        continue
-                    
-                    new_x = cur_x + j
-                    new_y = ghost_y + i
-                    
-                    if new_x < 0 or new_x >= self.BOARD_WIDTH or new_y >= self.BOARD_HEIGHT:
-                        valid = False
-                        break
-                    
-                    if new_y >= 0 and self.board[new_y][new_x] != 0:
-                        valid = False
-                        break
-                
-                if not valid:
-                    break
-            
-            if not valid:
-                ghost_y -= 1
-                break
+        ghost_y = self.engine.ghostY()
         
         # 如果幽靈方塊與當前方塊位置相同，不繪製
         if ghost_y == cur_y:
             return
         
         # 繪製幽靈方塊（半透明）
-        for i in range(4):
-            for j in range(4):
-                if shape_matrix[i][j] == 0:
-                    continue
-                
-                # 使用正確的 y 偏移計算
-                row = ghost_y + i
-                if row >= 2:  # 只繪製可見區域的方塊（非緩衝區）
-                    # 使用半透明效果繪製幽靈方塊
-                    self.drawGhostSquare(painter, 
-                                       x + (cur_x + j) * self.squareWidth(),
-                                       y + (row - 2) * self.squareHeight(),
-                                       shape_matrix[i][j])
+        for i, j in SHAPE_CELLS[shape][self.curPiece.rotation]:
+            # 使用正確的 y 偏移計算
+            row = ghost_y + i
+            if row >= 2:  # 只繪製可見區域的方塊（非緩衝區）
+                # 使用半透明效果繪製幽靈方塊
+                self.drawGhostSquare(painter, 
+                                   x + (cur_x + j) * self.squareWidth(),
+                                   y + (row - 2) * self.squareHeight(),
+                                   shape)
     
     def drawGhostSquare(self, painter, x, y, shape):
-        """繪製幽靈方塊的單個方塊（半透明輪廓）"""
-        color = QColor(COLORS[shape])
-        color.setAlpha(80)  # 設置透明度
-        
-        square_width = self.squareWidth() - 2
-        square_height = self.squareHeight() - 2
-        
-        # 繪製半透明填充
-        painter.fillRect(x + 1, y + 1, square_width, square_height, color)
-        
-        # 繪製輪廓
-        pen = painter.pen()
-        pen.setColor(color.lighter(150))
-        pen.setWidth(1)
-        painter.setPen(pen)
-        painter.drawRect(x + 1, y + 1, square_width, square_height)
-        
-    def isValidPosition(self, shape, x, y, rotation):
-        """檢查指定位置是否有效（用於幽靈方塊計算）"""
-        # 保存當前狀態
-        old_shape = self.curPiece['shape']
-        old_x = self.curPiece['x']
-        old_y = self.curPiece['y']
-        old_rotation = self.curPiece['rotation']
-        
-        # 設置臨時狀態
-        self.curPiece['shape'] = shape
-        self.curPiece['x'] = x
-        self.curPiece['y'] = y
-        self.curPiece['rotation'] = rotation
-        
-        shape_matrix = self.rotatedShape()
-        
-        # 使用 checkPosition 檢查位置有效性
-        valid = self.checkPosition(shape_matrix)
+        """繪製幽靈方塊的單個方塊（半透明輪廓，使用快取的圖塊）"""
+        painter.drawPixmap(x, y, TILE_CACHE.tile('ghost', shape, self.squareWidth(),
+                                                 self.devicePixelRatioF()))
         
-        # 恢復原始狀態
-        self.curPiece['shape'] = old_shape
-        self.curPiece['x'] = old_x
-        self.curPiece['y'] = old_y
-        self.curPiece['rotation'] = old_rotation
-        
-        return valid
-    
     def landingEffectEvent(self):
         """處理落地振動效果"""
         self.landingEffectCount += 1
@@ -800,88 +853,27 @@ class TetrisBoard(QFrame):
         if self.landingEffectCount >= 6:
             self.landingTimer.stop()
             self.shakeOffset = 0  # 重置偏移
+            self.update(self.shakeRect())
             return
         
         # 計算振動偏移量
         self.shakeOffset = 2 if self.landingEffectCount % 2 == 1 else -2
         
-        # 更新顯示
-        self.update()
-    
-    def newPiece(self):
-        """生成新方塊"""
-        self.curPiece = self.nextPieces[0]
-        self.nextPieces.pop(0)
-        self.nextPieces.append(self.getNewPiece())
-        self.nextPieceSignal.emit(self.nextPieces)
-        
-        # 檢查遊戲是否結束
-        # 1. 檢查新方塊是否可以放置
-        if not self.tryMove({'x': 3, 'y': 0, 'rotation': 0}):
-            self.curPiece = {'shape': 0, 'x': 0, 'y': 0, 'rotation': 0}
-            return False
-            
-        # 2. 檢查頂部區域是否已有方塊（額外的遊戲結束檢查）
-        for j in range(self.BOARD_WIDTH):
-            if self.board[2][j] != 0:  # 檢查緩衝區下方第一行
-                self.curPiece = {'shape': 0, 'x': 0, 'y': 0, 'rotation': 0}
-                return False
-        
-        return True
-
-    def swapHoldPiece(self):
-        """儲存當前方塊或與已儲存的方塊交換"""
-        # 如果已經在本次下落中交換過，則不允許再次交換
-        if self.hasSwapped:
-            return
-        
-        # 保存當前方塊的形狀和旋轉狀態
-        current_shape = self.curPiece['shape']
-        current_rotation = self.curPiece['rotation']
-        
-        if self.holdPiece['shape'] == 0:
-            # 如果儲存區為空，則儲存當前方塊並生成新方塊
-            self.holdPiece = {'shape': current_shape, 'rotation': 0}  # 儲存時重置旋轉狀態
-            self.holdPieceSignal.emit(self.holdPiece)
-            
-            # 生成新方塊
-            self.curPiece = self.nextPieces[0]
-            self.nextPieces.pop(0)
-            self.nextPieces.append(self.getNewPiece())
-            self.nextPieceSignal.emit(self.nextPieces)
-        else:
-            # 如果儲存區有方塊，則交換
-            temp_shape = self.holdPiece['shape']
-            self.holdPiece = {'shape': current_shape, 'rotation': 0}  # 儲存時重置旋轉狀態
-            self.holdPieceSignal.emit(self.holdPiece)
-            
-            # 設置當前方塊為儲存的方塊
-            self.curPiece = {'shape': temp_shape, 'x': 3, 'y': 0, 'rotation': 0}
-        
-        # 檢查新位置是否有效
-        if not self.tryMove({'x': 3, 'y': 0, 'rotation': 0}):
-            # 如果新位置無效，遊戲結束
-            self.timer.stop()
-            self.isStarted = False
-            self.statusChangedSignal.emit(False)
-            return
-        
-        # 標記已經交換過
-        self.hasSwapped = True
-        
-        # 更新顯示
-        self.update()
+        # 更新顯示（只重繪遊戲區域）
+        self.update(self.shakeRect())
 
 
 class NextPieceDisplay(QFrame):
     """顯示下一個方塊的視窗"""
     
+    PREVIEW_COUNT = 3  # 顯示的預覽方塊數（引擎的預覽佇列可以更長）
+    
     def __init__(self, parent):
         super().__init__(parent)
         
         self.setFrameStyle(QFrame.Panel | QFrame.Sunken)
         self.setFixedSize(180, 350)  # 調整預覽區的大小
-        self.nextPieces = [{'shape': 0}, {'shape': 0}, {'shape': 0}]
+        self.nextPieces = [EMPTY_PIECE] * self.PREVIEW_COUNT
     
     def updateNextPieces(self, next_pieces):
         """更新下一個方塊"""
@@ -918,7 +910,7 @@ class NextPieceDisplay(QFrame):
                        rect.right() - 5, rect.top() + 30)
         
         # 分別繪製三個預覽方塊，每個都有邊框
-        for i, piece in enumerate(self.nextPieces):
+        for i, piece in enumerate(islice(self.nextPieces, self.PREVIEW_COUNT)):
             piece_top = rect.top() + 40 + i * 100  # 減少方塊間距
             
             # 繪製方塊區域背景和邊框
@@ -929,56 +921,32 @@ class NextPieceDisplay(QFrame):
             # 根據方塊形狀調整中心位置
             shape_width = 0
             shape_height = 0
-            if piece['shape'] > 0:
-                shape_matrix = SHAPES[piece['shape']]
-                # 計算實際形狀的寬度和高度
-                min_x, max_x, min_y, max_y = 4, 0, 4, 0
-                for i in range(4):
-                    for j in range(4):
-                        if shape_matrix[i][j] > 0:
-                            min_x = min(min_x, j)
-                            max_x = max(max_x, j)
-                            min_y = min(min_y, i)
-                            max_y = max(max_y, i)
-                
+            if piece.shape > 0:
+                # 從預先計算的邊界框取得實際形狀的寬度和高度
+                min_x, min_y, max_x, max_y = SHAPE_BOUNDS[piece.shape][0]
                 shape_width = max_x - min_x + 1
                 shape_height = max_y - min_y + 1
             
-            # 計算居中位置，一個方塊單元格大小為18
-            square_size = 18
+            # 計算居中位置，一個方塊單元格大小為 PREVIEW_SQUARE_SIZE
+            square_size = PREVIEW_SQUARE_SIZE
             x_offset = rect.left() + 45 + (box_size - shape_width * square_size) // 2
             y_offset = piece_top + (box_size - shape_height * square_size) // 2
             
-            self.drawPiece(painter, x_offset, y_offset, piece['shape'])
+            self.drawPiece(painter, x_offset, y_offset, piece.shape)
     
     def drawPiece(self, painter, x, y, shape):
         """繪製方塊"""
         if shape == 0:
             return
             
-        shape_matrix = SHAPES[shape]
-        
-        for i in range(4):
-            for j in range(4):
-                if shape_matrix[i][j] == 0:
-                    continue
-                
-                self.drawSquare(painter, x + j * 18, y + i * 18, 
-                                shape_matrix[i][j])
+        for i, j in SHAPE_CELLS[shape][0]:
+            self.drawSquare(painter, x + j * PREVIEW_SQUARE_SIZE,
+                            y + i * PREVIEW_SQUARE_SIZE, shape)
     
     def drawSquare(self, painter, x, y, shape):
-        """繪製單個方塊"""
-        color = QColor(COLORS[shape])
-        
-        painter.fillRect(x + 1, y + 1, 16, 16, color)
-        
-        painter.setPen(color.lighter())
-        painter.drawLine(x, y + 16, x, y)
-        painter.drawLine(x, y, x + 16, y)
-        
-        painter.setPen(color.darker())
-        painter.drawLine(x + 1, y + 16, x + 16, y + 16)
-        painter.drawLine(x + 16, y + 16, x + 16, y + 1)
+        """繪製單個方塊（使用快取的圖塊）"""
+        painter.drawPixmap(x, y, TILE_CACHE.tile('preview', shape, PREVIEW_SQUARE_SIZE,
+                                                 self.devicePixelRatioF()))
 
 
 class HoldPieceDisplay(QFrame):
@@ -989,7 +957,7 @@ class HoldPieceDisplay(QFrame):
         
         self.setFrameStyle(QFrame.Panel | QFrame.Sunken)
         self.setFixedSize(180, 150)  # 調整儲存區的大小
-        self.holdPiece = {'shape': 0, 'rotation': 0}
+        self.holdPiece = EMPTY_PIECE
     
     def updateHoldPiece(self, hold_piece):
         """更新儲存的方塊"""
@@ -1031,70 +999,68 @@ class HoldPieceDisplay(QFrame):
         painter.drawRect(rect.left() + 45, rect.top() + 40, box_size, box_size)
         
         # 如果有儲存的方塊，繪製它
-        if self.holdPiece['shape'] > 0:
-            shape_matrix = SHAPES[self.holdPiece['shape']]
-            
-            # 計算實際形狀的寬度和高度
-            min_x, max_x, min_y, max_y = 4, 0, 4, 0
-            for i in range(4):
-                for j in range(4):
-                    if shape_matrix[i][j] > 0:
-                        min_x = min(min_x, j)
-                        max_x = max(max_x, j)
-                        min_y = min(min_y, i)
-                        max_y = max(max_y, i)
+        if self.holdPiece.shape > 0:
+            # 從預先計算的邊界框取得實際形狀的寬度和高度
+            min_x, min_y, max_x, max_y = SHAPE_BOUNDS[self.holdPiece.shape][0]
             
             shape_width = max_x - min_x + 1
             shape_height = max_y - min_y + 1
             
-            # 計算居中位置，一個方塊單元格大小為18
-            square_size = 18
+            # 計算居中位置，一個方塊單元格大小為 PREVIEW_SQUARE_SIZE
+            square_size = PREVIEW_SQUARE_SIZE
             x_offset = rect.left() + 45 + (box_size - shape_width * square_size) // 2
             y_offset = rect.top() + 40 + (box_size - shape_height * square_size) // 2
             
-            self.drawPiece(painter, x_offset, y_offset, self.holdPiece['shape'])
+            self.drawPiece(painter, x_offset, y_offset, self.holdPiece.shape)
     
     def drawPiece(self, painter, x, y, shape):
         """繪製方塊"""
         if shape == 0:
             return
             
-        shape_matrix = SHAPES[shape]
-        
-        for i in range(4):
-            for j in range(4):
-                if shape_matrix[i][j] == 0:
-                    continue
-                
-                self.drawSquare(painter, x + j * 18, y + i * 18, 
-                                shape_matrix[i][j])
+        for i, j in SHAPE_CELLS[shape][0]:
+            self.drawSquare(painter, x + j * PREVIEW_SQUARE_SIZE,
+                            y + i * PREVIEW_SQUARE_SIZE, shape)
     
     def drawSquare(self, painter, x, y, shape):
-        """繪製單個方塊"""
-        color = QColor(COLORS[shape])
-        
-        painter.fillRect(x + 1, y + 1, 16, 16, color)
-        
-        painter.setPen(color.lighter())
-        painter.drawLine(x, y + 16, x, y)
-        painter.drawLine(x, y, x + 16, y)
-        
-        painter.setPen(color.darker())
-        painter.drawLine(x + 1, y + 16, x + 16, y + 16)
-        painter.drawLine(x + 16, y + 16, x + 16, y + 1)
+        """繪製單個方塊（使用快取的圖塊）"""
+        painter.drawPixmap(x, y, TILE_CACHE.tile('preview', shape, PREVIEW_SQUARE_SIZE,
+                                                 self.devicePixelRatioF()))
 
 
 class TetrisWindow(QMainWindow):
     """俄羅斯方塊遊戲視窗"""
     
+    METRICS_FILE = 'tetris_metrics.json'  # 關閉視窗時寫入的效能指標
+    METRICS_ENV = 'TETRIS_METRICS'  # 設定此環境變數時一啟動就記錄效能指標
+    METRICS_INTERVAL = 250  # 更新效能資訊與量測事件迴圈延遲的間隔，毫秒
+    PROFILE_ENV = 'TETRIS_PROFILE'  # 設定為檔名時掛上引擎各階段的效能掛鉤
+    RECORD_FILE = 'tetris_record.json'  # 遊戲記錄（最高分）
+    
     def __init__(self):
         super().__init__()
         
-        # 初始化遊戲記錄
+        # 初始化遊戲記錄（延遲在背景寫入，遊戲結束與關閉視窗時立即寫入）
         self.highScore = 0
+        self.records = RecordStore(self.RECORD_FILE)
         self.loadGameRecord()
         
+        # 效能指標（第一次按 F3 開啟效能資訊時建立）
+        self.metrics = None
+        self.metricsTimer = QBasicTimer()
+        self.metricsTime = 0.0
+        
+        # 引擎各階段的效能掛鉤（只有設定 PROFILE_ENV 時建立）
+        self.profiler = None
+        
         self.initUI()
+        
+        if os.environ.get(self.METRICS_ENV):
+            self.toggleMetrics()
+        
+        profile_path = os.environ.get(self.PROFILE_ENV)
+        if profile_path:
+            self.startProfiling(profile_path)
     
     def initUI(self):
         """初始化UI"""
@@ -1161,6 +1127,21 @@ class TetrisWindow(QMainWindow):
         self.pauseOverlay.setText("遊戲暫停")
         self.pauseOverlay.hide()
         
+        # 效能資訊覆蓋層（F3 切換）
+        self.metricsOverlay = QLabel(self.board)
+        self.metricsOverlay.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.metricsOverlay.setStyleSheet("""
+            background-color: rgba(0, 0, 0, 0.6);
+            color: #55FF55;
+            font-family: monospace;
+            font-size: 10px;
+            border: none;
+            padding: 4px;
+        """)
+        self.metricsOverlay.move(8, 8)
+        self.metricsOverlay.hide()
+        QShortcut(QKeySequence(Qt.Key_F3), self, self.toggleMetrics)
+        
         # 設定視窗
         self.setWindowTitle('俄羅斯方塊')
         self.resize(600, 600)  # 調整視窗初始大小
@@ -1237,6 +1218,12 @@ class TetrisWindow(QMainWindow):
             }
         """)
         
+        # 重播按鈕
+        self.replayButton = QPushButton('播放錄影', self)
+        self.replayButton.setFocusPolicy(Qt.NoFocus)
+        self.replayButton.clicked.connect(self.playReplay)
+        self.replayButton.setMinimumHeight(30)
+        
         # 分數和狀態顯示框
         infoFrame = QFrame()
         infoFrame.setFrameStyle(QFrame.StyledPanel | QFrame.Sunken)
@@ -1267,7 +1254,10 @@ class TetrisWindow(QMainWindow):
             "↓ : 加速下落\n"
             "空白鍵 : 直接落下\n"
             "Shift : 儲存/交換方塊\n"
-            "P : 暫停遊戲"
+            "P : 暫停遊戲\n"
+            "A : 自動遊玩 開/關\n"
+            "F3 : 效能資訊 開/關\n"
+            "重播時 +/- : 倍速, ← → : 跳轉, Esc : 停止"
         )
         controlsLabel.setStyleSheet("color: #AAAAAA; font-size: 10px; margin-top: 5px;")  # 調整字體大小
         
@@ -1283,6 +1273,7 @@ class TetrisWindow(QMainWindow):
         layout = QVBoxLayout()
         layout.addWidget(self.startButton)
         layout.addWidget(self.pauseButton)
+        layout.addWidget(self.replayButton)
         layout.addWidget(infoFrame)
         layout.addWidget(controlsLabel)
         layout.addStretch()
@@ -1295,6 +1286,23 @@ class TetrisWindow(QMainWindow):
         self.gameOverOverlay.hide()
         self.pauseOverlay.hide()
     
+    def playReplay(self):
+        """重播最近一局遊戲的錄影"""
+        try:
+            replay = Replay.load(self.board.REPLAY_FILE)
+        except FileNotFoundError:
+            QMessageBox.information(self, '播放錄影', '還沒有錄影，請先完成一局遊戲')
+            return
+        except (OSError, ReplayError) as e:
+            print(f"讀取錄影時發生錯誤: {e}")
+            QMessageBox.warning(self, '錯誤', '無法讀取錄影檔')
+            return
+        
+        self.board.startReplay(replay)
+        self.gameOverOverlay.hide()
+        self.pauseOverlay.hide()
+        self.statusLabel.setText('重播中')
+    
     def pauseGame(self):
         """暫停遊戲"""
         self.board.pause()
@@ -1306,12 +1314,80 @@ class TetrisWindow(QMainWindow):
         else:
             self.pauseOverlay.hide()
     
+    def toggleMetrics(self):
+        """切換效能資訊覆蓋層與效能指標記錄（關閉時保留已記錄的數據）"""
+        if self.board.metrics is not None:
+            self.board.metrics = None
+            self.metricsTimer.stop()
+            self.metricsOverlay.hide()
+            return
+        
+        if self.metrics is None:
+            self.metrics = MetricsRecorder()
+        self.board.metrics = self.metrics
+        self.metricsTime = time.perf_counter()
+        self.metricsTimer.start(self.METRICS_INTERVAL, self)
+        self.updateMetricsOverlay()
+        self.metricsOverlay.show()
+    
+    def timerEvent(self, event):
+        """效能資訊計時器：量測事件迴圈延遲（計時器實際間隔超過設定的時間）並更新顯示"""
+        if event.timerId() != self.metricsTimer.timerId():
+            super().timerEvent(event)
+            return
+        
+        now = time.perf_counter()
+        lag = (now - self.metricsTime) * 1000 - self.METRICS_INTERVAL
+        self.metricsTime = now
+        self.metrics.record('eventLoopLag', max(0.0, lag))
+        self.updateMetricsOverlay()
+    
+    def updateMetricsOverlay(self):
+        """更新效能資訊覆蓋層的文字"""
+        keys = ('p50', 'p95', 'p99')
+        # 標籤為 4 個全形字（8 個半形寬），每欄數值 6 個字元寬
+        lines = [' ' * 10 + '  '.join(f"{key:>6}" for key in keys) + '  ms']
+        for name, label in METRIC_LABELS:
+            stats = self.metrics.stats(name)
+            values = stats.percentiles() if stats is not None else {}
+            lines.append(f"{label}  " + '  '.join(
+                f"{values.get(key, 0.0):6.2f}" for key in keys))
+        self.metricsOverlay.setText('\n'.join(lines))
+        self.metricsOverlay.adjustSize()
+    
+    def saveMetrics(self):
+        """將效能指標寫入 METRICS_FILE（附上環境資訊，方便比對玩家的回報）"""
+        screen = QApplication.primaryScreen()
+        extra = {
+            'python': platform.python_version(),
+            'qt': QT_VERSION_STR,
+            'platform': QApplication.platformName(),
+            'system': platform.platform(),
+            'refreshRate': screen.refreshRate() if screen else None,
+            'squareSize': self.board.square_size,
+            'speed': self.board.speed,
+        }
+        try:
+            self.metrics.dump(self.METRICS_FILE, extra)
+        except OSError as e:
+            print(f"保存效能指標時發生錯誤: {e}")
+    
+    def startProfiling(self, path):
+        """在遊戲區域的按鍵處理與引擎各階段掛上效能掛鉤，結果寫入 path"""
+        try:
+            self.profiler = Profiler(sinkForPath(path))
+        except OSError as e:
+            print(f"建立效能剖析檔案時發生錯誤: {e}")
+            return
+        self.profiler.attach(self.board, ('keyPressEvent',))
+        self.profiler.attach(self.board.engine)
+    
     def updateScore(self, score):
         """更新分數顯示"""
         self.scoreLabel.setText(f'分數: {score}')
         
-        # 檢查是否創造新的最高分
-        if score > self.highScore:
+        # 檢查是否創造新的最高分（重播不計）
+        if score > self.highScore and not self.board.isReplaying:
             self.highScore = score
             self.highScoreLabel.setText(f'最高分: {self.highScore}')
             self.saveGameRecord()
@@ -1323,12 +1399,16 @@ class TetrisWindow(QMainWindow):
     def updateStatus(self, isStarted):
         """更新遊戲狀態顯示"""
         if isStarted:
-            self.statusLabel.setText('遊戲進行中')
+            self.statusLabel.setText('重播中' if self.board.isReplaying else '遊戲進行中')
             self.gameOverOverlay.hide()
+        elif self.board.isReplaying:
+            self.statusLabel.setText('重播結束')
+            self.pauseOverlay.hide()
         else:
             self.statusLabel.setText('遊戲結束')
             self.updateGameOverOverlay()
             self.gameOverOverlay.show()
+            self.flushGameRecord()
             
             # 檢查是否創造新的最高分
             if self.board.score > 0:
@@ -1374,18 +1454,12 @@ class TetrisWindow(QMainWindow):
     def loadGameRecord(self):
         """載入遊戲記錄"""
         try:
-            # 檢查記錄文件是否存在
-            if os.path.exists('tetris_record.json'):
-                with open('tetris_record.json', 'r') as f:
-                    record = json.load(f)
-                    self.highScore = record.get('high_score', 0)
+            record = self.records.load()
+            if record is not None:
+                self.highScore = record.get('high_score', 0)
             else:
                 # 創建新記錄文件
                 self.saveGameRecord()
-        except FileNotFoundError:
-            print("記錄文件不存在，將創建新文件")
-            self.highScore = 0
-            self.saveGameRecord()
         except PermissionError:
             print("無權限讀取記錄文件")
             QMessageBox.warning(self, '錯誤', '無權限讀取遊戲記錄文件')
@@ -1399,13 +1473,15 @@ class TetrisWindow(QMainWindow):
             self.highScore = 0
     
     def saveGameRecord(self):
-        """保存遊戲記錄"""
+        """保存遊戲記錄（合併短時間內的多次更新，在背景寫入）"""
+        self.records.save({
+            'high_score': self.highScore
+        })
+    
+    def flushGameRecord(self):
+        """立即寫入尚未保存的遊戲記錄"""
         try:
-            record = {
-                'high_score': self.highScore
-            }
-            with open('tetris_record.json', 'w') as f:
-                json.dump(record, f)
+            self.records.flush()
         except PermissionError:
             print("無權限寫入記錄文件")
             QMessageBox.warning(self, '錯誤', '無權限保存遊戲記錄')
@@ -1420,6 +1496,19 @@ class TetrisWindow(QMainWindow):
         """視窗關閉事件"""
         # 保存遊戲記錄
         self.saveGameRecord()
+        self.flushGameRecord()
+        
+        # 開啟過效能資訊時保存效能指標
+        if self.metrics is not None:
+            self.saveMetrics()
+        
+        # 掛上效能掛鉤時寫出結果
+        if self.profiler is not None:
+            try:
+                self.profiler.close()
+            except OSError as e:
+                print(f"保存效能剖析結果時發生錯誤: {e}")
+            self.profiler = None
         event.accept()
 
 